@@ -0,0 +1,30 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class ReadReplicaRouter:
+    """
+    Send reads to the read-only `replica` alias and writes to `default`.
+
+    Both aliases open the same SQLite file. In WAL mode readers see the last
+    committed data and never wait for the writer. Reads inside a transaction
+    on `default` stay there so they see that transaction's own writes.
+    """
+    read_alias = 'replica'
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return self.read_alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
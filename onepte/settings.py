@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -67,6 +68,7 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'pte_exam.middleware.RequestTimingMiddleware',  # Only active with REQUEST_TIMING_ENABLED
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,6 +79,25 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request SQL/serializer/render/total timing as Server-Timing headers and log lines
+REQUEST_TIMING_ENABLED = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'pte_exam': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 ROOT_URLCONF = 'onepte.urls'
 
 TEMPLATES = [
@@ -108,6 +129,61 @@ DATABASES = {
     }
 }
 
+# SQLite production profile, enabled with ONEPTE_SQLITE_PRODUCTION=1.
+# The writer runs in WAL mode with a busy timeout and takes the write lock
+# when a transaction begins. Reads go to a read-only connection to the same
+# file, so readers never queue behind the writer.
+SQLITE_PRODUCTION = os.environ.get('ONEPTE_SQLITE_PRODUCTION') == '1'
+
+SQLITE_PRODUCTION_OPTIONS = {
+    'timeout': 20,  # Busy timeout in seconds
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+}
+
+SQLITE_READ_OPTIONS = {
+    'timeout': 20,
+    'init_command': 'PRAGMA query_only=ON',
+}
+
+if SQLITE_PRODUCTION:
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'OPTIONS': SQLITE_READ_OPTIONS,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['onepte.routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Question payloads, ETags, answer keys and next-question id sets are
+# invalidated by bumping version keys in this cache, so every process serving
+# the API, and every management command such as import_questions, must share
+# it. Versions are seeded, and seen sets locked, with cache.add(), which must
+# be atomic. The default is a bounded local-memory cache, which is only
+# correct for a single process: set ONEPTE_REDIS_URL for any deployment with
+# several workers, a separate scoring worker or management commands that
+# change questions.
+if os.environ.get('ONEPTE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['ONEPTE_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'onepte',
+            'OPTIONS': {'MAX_ENTRIES': 20_000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -150,14 +226,52 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-import os
-
 # Path where uploaded media files will be stored
 MEDIA_URL = '/media/'
 
 # Absolute filesystem path to the directory where media files are stored
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Number of questions kept in each process's in-memory answer key index
+ANSWER_KEY_INDEX_SIZE = 2048
+
+# SST scoring queue, processed by `python manage.py run_scoring_worker`
+SCORING_QUEUE = {
+    'WORKERS': 4,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 2,
+    'STALE_AFTER_SECONDS': 300,
+}
+
+# Admission control on answer submissions, see pte_exam/admission.py. Buckets
+# and in-flight counts are kept per process.
+ADMISSION_CONTROL = {
+    'USER_RATE': 0.5,
+    'USER_BURST': 10,
+    'GLOBAL_RATE': 200.0,
+    'GLOBAL_BURST': 400,
+    'USER_IN_FLIGHT': 2,
+    'GLOBAL_IN_FLIGHT': 32,
+    'MAX_SST_BACKLOG': 2000,
+    'BACKLOG_RETRY_AFTER': 30,
+}
+
+# SST scoring engine, see pte_exam/scoring.py. DICTIONARY is a word list with
+# one word per line; without it, spelling only checks the reference transcript.
+SST_SCORING = {
+    'ENGINE': 'pte_exam.scoring.SSTScorer',
+    'DICTIONARY': None,  # Path of a word list, e.g. '/usr/share/dict/words'
+}
+
+# Timed mock tests, see pte_exam/mock_tests.py
+MOCK_TEST = {
+    'DEFAULT_MIX': {'SST': 1, 'RO': 2, 'RMMCQ': 2},
+    'MAX_QUESTIONS': 40,
+    'QUESTION_TIME_LIMITS': {'RO': 150, 'RMMCQ': 120},
+    'GRACE_SECONDS': 5,
+}
+
 # Background task queue system
 # # Broker URL (Redis in this example)
 # CELERY_BROKER_URL = 'redis://localhost:6379/0'
@@ -1,4 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Case, Max, When
+from django.utils.functional import cached_property
+from . import search
 from .models import *
 
 # admin.site.register(Question)
@@ -9,6 +15,49 @@ from .models import *
 # admin.site.register(ReadingMultipleChoiceQuestion)
 # admin.site.register(RMMCQOption)
 
+# Changelists of the answer tables never count more than this many rows
+ADMIN_COUNT_LIMIT = 100_000
+# Best full-text matches listed by a question search, in relevance order
+ADMIN_SEARCH_LIMIT = 1000
+
+
+def estimate_row_count(queryset):
+    """
+    Cheap estimate of a table's row count: the planner statistics on
+    PostgreSQL, otherwise the highest primary key.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+    return model._default_manager.using(queryset.db).aggregate(max_pk=Max('pk'))['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large tables. An unfiltered changelist shows an
+    estimated count, and a filtered one counts at most ADMIN_COUNT_LIMIT rows,
+    instead of running an exact COUNT(*) over the whole table.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset)
+            if estimate > ADMIN_COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:ADMIN_COUNT_LIMIT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # Skip the second, unfiltered COUNT(*)
+
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
@@ -16,15 +65,44 @@ class QuestionAdmin(admin.ModelAdmin):
     list_filter = ('question_type',)
     search_fields = ('title',)
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search titles and content through the full-text index when there is
+        one. The best ADMIN_SEARCH_LIMIT matches are listed by relevance,
+        unless a column is sorted.
+        """
+        if not search.is_available() or search.to_match_query(search_term) is None:
+            return super().get_search_results(request, queryset, search_term)
+        ids = [question_id for question_id, _ in search.search_questions(search_term, limit=ADMIN_SEARCH_LIMIT)]
+        request.search_truncated = len(ids) == ADMIN_SEARCH_LIMIT
+        queryset = queryset.filter(id__in=ids)
+        if ids and ORDER_VAR not in request.GET:
+            queryset = queryset.order_by(Case(*[When(id=question_id, then=rank) for rank, question_id in enumerate(ids)]))
+        return queryset, False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        # The changelist is rendered after this, so the message shows on it
+        if getattr(request, 'search_truncated', False):
+            self.message_user(
+                request,
+                f"Only the {ADMIN_SEARCH_LIMIT} best matches are listed; refine the search to find others.",
+                messages.WARNING,
+            )
+        return response
+
 
 class SSTAudioFileInline(admin.TabularInline):
     model = SSTAudioFile
     extra = 1  # Number of empty forms to display by default
+    readonly_fields = ('size', 'duration', 'sha256')  # Computed on upload
 
 
 @admin.register(SummarizeSpokenText)
 class SummarizeSpokenTextAdmin(admin.ModelAdmin):
     list_display = ('question', 'answer_time_limit')
+    list_select_related = ('question',)
+    search_fields = ('question__title',)
     inlines = [SSTAudioFileInline]
 
 
@@ -36,6 +114,8 @@ class ReorderParagraphInline(admin.TabularInline):
 @admin.register(ReorderParagraphQuestion)
 class ReorderParagraphQuestionAdmin(admin.ModelAdmin):
     list_display = ('question',)
+    list_select_related = ('question',)
+    search_fields = ('question__title',)
     inlines = [ReorderParagraphInline]
 
 
@@ -47,36 +127,49 @@ class RMMCQOptionInline(admin.TabularInline):
 @admin.register(ReadingMultipleChoiceQuestion)
 class ReadingMultipleChoiceQuestionAdmin(admin.ModelAdmin):
     list_display = ('question',)
+    list_select_related = ('question',)
+    search_fields = ('question__title',)
     inlines = [RMMCQOptionInline]
 
 
+@admin.register(RMMCQOption)
+class RMMCQOptionAdmin(admin.ModelAdmin):
+    # Backs the selected_options autocomplete of RMMCQAnswerAdmin
+    list_display = ('content', 'rmmcq_question', 'is_correct')
+    list_select_related = ('rmmcq_question__question',)
+    search_fields = ('content', 'rmmcq_question__question__title')
+
+
 @admin.register(Answer)
-class AnswerAdmin(admin.ModelAdmin):
-    list_display = ('user', 'question', 'created_at')
-    list_filter = ('created_at',)
+class AnswerAdmin(LargeTableAdmin):
+    list_display = ('user', 'question', 'question_type', 'score_status', 'created_at')
+    list_select_related = ('user', 'question')
+    list_filter = ('question_type', 'score_status', 'created_at')
+    date_hierarchy = 'created_at'
     search_fields = ('user__username', 'question__title')
+    autocomplete_fields = ('user', 'question')
 
 
-@admin.register(SSTAnswer)
-class SSTAnswerAdmin(admin.ModelAdmin):
+class TypedAnswerAdmin(LargeTableAdmin):
     list_display = ('answer', 'question', 'total_score', 'answer__created_at')
+    # Everything the answer and question __str__ read
+    list_select_related = ('answer__user', 'answer__question', 'question__question')
     search_fields = ('answer__user__username', 'question__question__title')
-    readonly_fields = ('content_score', 'form_score', 'grammar_score', 'vocabulary_score', 'spelling_score', 'total_score')
+    readonly_fields = ('total_score',)
     list_filter = ('answer__created_at',)
+    autocomplete_fields = ('answer', 'question')
+
+
+@admin.register(SSTAnswer)
+class SSTAnswerAdmin(TypedAnswerAdmin):
+    readonly_fields = ('content_score', 'form_score', 'grammar_score', 'vocabulary_score', 'spelling_score', 'total_score')
 
 
 @admin.register(ROAnswer)
-class ROAnswerAdmin(admin.ModelAdmin):
-    list_display = ('answer', 'question', 'total_score', 'answer__created_at')
-    search_fields = ('answer__user__username', 'question__question__title')
-    readonly_fields = ('total_score',)
-    list_filter = ('answer__created_at',)
+class ROAnswerAdmin(TypedAnswerAdmin):
+    pass
 
 
 @admin.register(RMMCQAnswer)
-class RMMCQAnswerAdmin(admin.ModelAdmin):
-    list_display = ('answer', 'question', 'total_score', 'answer__created_at')
-    search_fields = ('answer__user__username', 'question__question__title')
-    readonly_fields = ('total_score',)
-    filter_horizontal = ('selected_options',)  # For better UI when selecting options
-    list_filter = ('answer__created_at',)
\ No newline at end of file
+class RMMCQAnswerAdmin(TypedAnswerAdmin):
+    autocomplete_fields = ('answer', 'question', 'selected_options')
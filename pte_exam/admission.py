@@ -0,0 +1,179 @@
+"""
+Admission control for answer submissions.
+
+Each process keeps, in memory, a token bucket per user and one shared by
+everyone, plus counts of the submissions in flight. A submission is let in
+only while there are tokens and room in flight. SST submissions are also
+shed while the scoring queue is more than MAX_SST_BACKLOG jobs behind, so
+a spike degrades into quick rejections instead of lock contention.
+
+A user over their own limits gets 429 Too Many Requests; a submission
+rejected by the global limits or the backlog gets 503 Service Unavailable.
+Both carry a Retry-After header.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+
+from .tasks import get_queue_depth
+
+ADMISSION_DEFAULTS = {
+    'ENABLED': True,
+    'USER_RATE': 0.5,  # Submissions per second refilled into each user's bucket
+    'USER_BURST': 10,  # Size of each user's bucket
+    'GLOBAL_RATE': 200.0,  # Submissions per second refilled into the shared bucket
+    'GLOBAL_BURST': 400,  # Size of the shared bucket
+    'USER_IN_FLIGHT': 2,  # Concurrent submissions of one user
+    'GLOBAL_IN_FLIGHT': 32,  # Concurrent submissions in this process
+    'MAX_SST_BACKLOG': 2000,  # Queued and running scoring jobs before SST is shed
+    'BACKLOG_RETRY_AFTER': 30,  # Retry-After, in seconds, while SST is shed
+    'BACKLOG_CHECK_INTERVAL': 1.0,  # Seconds the queue depth is reused for
+    'MAX_TRACKED_USERS': 10000,  # User buckets kept; the least recent are dropped
+}
+
+
+def get_admission_setting(name):
+    return getattr(settings, 'ADMISSION_CONTROL', {}).get(name, ADMISSION_DEFAULTS[name])
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many submissions right now, please try again later.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait, detail=None):
+        super().__init__(detail)
+        # Sent as Retry-After by rest_framework's exception handler
+        self.wait = wait
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def wait_time(self, now, cost):
+        """
+        Refill the bucket and return the seconds until `cost` tokens are available.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            return 0
+        return math.ceil((cost - self.tokens) / self.rate) if self.rate > 0 else None
+
+    def take(self, cost):
+        self.tokens -= cost
+
+
+class AdmissionController:
+    """
+    Process-local token buckets, in-flight counts and SST backlog depth.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.user_buckets = OrderedDict()
+        self.global_bucket = None
+        self.user_in_flight = {}
+        self.in_flight = 0
+        self.backlog = None
+        self.backlog_checked = 0
+
+    def get_user_bucket(self, user_id, now):
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            bucket = self.user_buckets[user_id] = TokenBucket(
+                get_admission_setting('USER_RATE'), get_admission_setting('USER_BURST'), now
+            )
+            while len(self.user_buckets) > get_admission_setting('MAX_TRACKED_USERS'):
+                self.user_buckets.popitem(last=False)
+        else:
+            self.user_buckets.move_to_end(user_id)
+        return bucket
+
+    @contextmanager
+    def admit(self, user_id, cost=1):
+        """
+        Hold a place in flight for a submission of `cost` answers, or raise
+        Throttled (429) or ServiceOverloaded (503).
+        """
+        if not get_admission_setting('ENABLED'):
+            yield
+            return
+        now = time.monotonic()
+        with self.lock:
+            user_bucket = self.get_user_bucket(user_id, now)
+            if self.global_bucket is None:
+                self.global_bucket = TokenBucket(
+                    get_admission_setting('GLOBAL_RATE'), get_admission_setting('GLOBAL_BURST'), now
+                )
+            # A batch larger than a bucket waits for a full bucket
+            user_cost = min(cost, user_bucket.burst)
+            global_cost = min(cost, self.global_bucket.burst)
+
+            if self.user_in_flight.get(user_id, 0) >= get_admission_setting('USER_IN_FLIGHT'):
+                raise Throttled(wait=1, detail='Your previous submission is still being processed.')
+            wait = user_bucket.wait_time(now, user_cost)
+            if wait != 0:
+                raise Throttled(wait=wait)
+            if self.in_flight >= get_admission_setting('GLOBAL_IN_FLIGHT'):
+                raise ServiceOverloaded(wait=1)
+            wait = self.global_bucket.wait_time(now, global_cost)
+            if wait != 0:
+                raise ServiceOverloaded(wait=wait)
+
+            user_bucket.take(user_cost)
+            self.global_bucket.take(global_cost)
+            self.user_in_flight[user_id] = self.user_in_flight.get(user_id, 0) + 1
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                if self.user_in_flight[user_id] > 1:
+                    self.user_in_flight[user_id] -= 1
+                else:
+                    del self.user_in_flight[user_id]
+
+    def get_sst_backlog(self):
+        """
+        Return the number of queued and running scoring jobs, re-counted at
+        most once per BACKLOG_CHECK_INTERVAL.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if self.backlog is not None and now - self.backlog_checked < get_admission_setting('BACKLOG_CHECK_INTERVAL'):
+                return self.backlog
+        depth = get_queue_depth()
+        with self.lock:
+            self.backlog = depth['queued'] + depth['running']
+            self.backlog_checked = now
+            return self.backlog
+
+    def check_sst_backlog(self):
+        """
+        Raise ServiceOverloaded while SST scoring is too far behind to take more work.
+        """
+        if get_admission_setting('ENABLED') and self.get_sst_backlog() > get_admission_setting('MAX_SST_BACKLOG'):
+            raise ServiceOverloaded(
+                wait=get_admission_setting('BACKLOG_RETRY_AFTER'),
+                detail='Summarize Spoken Text scoring is behind; please submit again later.',
+            )
+
+
+admission = AdmissionController()
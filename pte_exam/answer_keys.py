@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .cache import get_question_version
+from .models import Question, ReorderParagraph
+
+ANSWER_KEY_INDEX_DEFAULT_SIZE = 2048
+
+
+class AnswerKey:
+    """
+    Everything needed to validate and score an answer to one question:
+    the RO next-order chain or the RMMCQ correct/valid option sets.
+    """
+    __slots__ = ('question_id', 'question_type', 'has_details', 'next_correct_order',
+                 'correct_option_ids', 'valid_option_ids', 'version')
+
+    def __init__(self, question, version):
+        self.question_id = question.id
+        self.question_type = question.question_type
+        self.version = version
+        self.next_correct_order = ()
+        self.correct_option_ids = frozenset()
+        self.valid_option_ids = frozenset()
+
+        details = question.get_details()
+        self.has_details = details is not None
+        if details is None:
+            return
+        if question.question_type == 'RO':
+            # correct_next_order of each paragraph, in paragraph id order
+            self.next_correct_order = tuple(p.correct_next_order for p in details.paragraphs.all())
+        elif question.question_type == 'RMMCQ':
+            options = details.options.all()
+            self.correct_option_ids = frozenset(o.id for o in options if o.is_correct)
+            self.valid_option_ids = frozenset(o.id for o in options)
+
+    @property
+    def paragraph_count(self):
+        return len(self.next_correct_order)
+
+
+class AnswerKeyIndex:
+    """
+    Process-local LRU index of answer keys, keyed by question id.
+
+    Entries carry the question's content version (see cache.py). Once a
+    change commits, signals drop the entry in this process, and the version
+    check catches changes made by other processes. That needs the shared
+    cache configured in settings.CACHES; a per-process cache hides them.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_maxsize(self):
+        return self.maxsize or getattr(settings, 'ANSWER_KEY_INDEX_SIZE', ANSWER_KEY_INDEX_DEFAULT_SIZE)
+
+    def get(self, question_id):
+        """
+        Return the answer key of a question, or None if the question does not exist.
+        """
+        return self.get_many([question_id]).get(question_id)
+
+    def get_many(self, question_ids):
+        """
+        Return a {question_id: AnswerKey} dict, loading every miss in one pass.
+        """
+        keys = {}
+        versions = {question_id: get_question_version(question_id) for question_id in set(question_ids)}
+        with self.lock:
+            for question_id, version in versions.items():
+                key = self.entries.get(question_id)
+                if key is not None and key.version == version:
+                    self.entries.move_to_end(question_id)
+                    keys[question_id] = key
+
+        missing = [question_id for question_id in versions if question_id not in keys]
+        if missing:
+            questions = Question.objects.filter(id__in=missing).select_related(
+                'reorder_paragraph_details', 'rmmcq_details'
+            ).prefetch_related(
+                Prefetch('reorder_paragraph_details__paragraphs', queryset=ReorderParagraph.objects.order_by('id')),
+                'rmmcq_details__options',
+            )
+            for question in questions:
+                keys[question.id] = self.add(question, versions[question.id])
+        return keys
+
+    def add(self, question, version):
+        """
+        Index a question whose details, paragraphs and options are already
+        loaded. `version` must be read before the question was loaded.
+        """
+        key = AnswerKey(question, version)
+        with self.lock:
+            self.entries[question.id] = key
+            self.entries.move_to_end(question.id)
+            while len(self.entries) > self.get_maxsize():
+                self.entries.popitem(last=False)
+        return key
+
+    def invalidate(self, question_id):
+        with self.lock:
+            self.entries.pop(question_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+answer_keys = AnswerKeyIndex()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PteExamConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pte_exam'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,188 @@
+"""
+Async versions of the read-only endpoints, built on Django's async ORM.
+Served under /api/async/ so ASGI deployments (onepte.asgi) do not hold a
+worker thread while a request waits on the database. The responses match
+their DRF counterparts in views.py.
+"""
+import math
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import condition, require_GET
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .cache import (
+    QUESTION_DETAIL_CACHE_TIMEOUT,
+    aget_question_type_version,
+    aget_question_version,
+    question_detail_cache_key,
+    version_to_datetime,
+)
+from .models import Question, ScoreHistogramBucket
+from .serializers import QuestionDetailSerializer, QuestionSerializer
+from .views import (
+    PracticeHistoryView,
+    QuestionDetailView,
+    get_history_entry,
+    get_history_queryset,
+    make_question_detail_etag,
+    make_question_list_etag,
+    question_list_types,
+)
+
+QUESTION_PAGE_SIZE = 10
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def error_response(detail, status):
+    return json_response({"detail": detail}, status=status)
+
+
+async def authenticate(request):
+    """
+    Return the user of a Bearer token or of the session, or None.
+    Raises InvalidToken for a bad Bearer token.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        user = await request.auser()
+        return user if user.is_authenticated else None
+
+    token = authentication.get_validated_token(raw_token)
+    user = await User.objects.filter(**{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]}).afirst()
+    return user if user and user.is_active else None
+
+
+async def paginate(request, queryset, page_size, max_page_size=None):
+    """
+    Page-number pagination matching rest_framework's PageNumberPagination.
+    Returns (items, links) or raises ValueError for an invalid page.
+    """
+    if max_page_size and request.GET.get('page_size'):
+        try:
+            page_size = min(max(int(request.GET['page_size']), 1), max_page_size)
+        except ValueError:
+            pass
+
+    count = await queryset.acount()
+    num_pages = max(1, math.ceil(count / page_size))
+    page = request.GET.get('page', 1)
+    page = num_pages if page == 'last' else int(page)
+    if not 1 <= page <= num_pages:
+        raise ValueError(page)
+
+    offset = (page - 1) * page_size
+    items = [item async for item in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page < num_pages else None
+    if page == 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return items, {"count": count, "next": next_url, "previous": previous_url}
+
+
+def async_condition(conditions_func):
+    """
+    condition() for async views. conditions_func is a coroutine returning the
+    (etag, last_modified) of the resource; condition() would call the version
+    lookups synchronously on the event loop.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag, last_modified = await conditions_func(request, *args, **kwargs)
+            conditional_view = condition(
+                etag_func=lambda *args, **kwargs: etag,
+                last_modified_func=lambda *args, **kwargs: last_modified,
+            )(view)
+            return await conditional_view(request, *args, **kwargs)
+        return inner
+    return decorator
+
+
+async def question_list_conditions(request, *args, **kwargs):
+    versions = [await aget_question_type_version(question_type) for question_type in question_list_types(request)]
+    return make_question_list_etag(request, versions), version_to_datetime(max(versions))
+
+
+async def question_detail_conditions(request, pk, *args, **kwargs):
+    version = await aget_question_version(pk)
+    return make_question_detail_etag(request, pk, version), version_to_datetime(version)
+
+
+@require_GET
+@async_condition(question_list_conditions)
+async def question_list(request):
+    queryset = Question.objects.order_by('id')
+    question_type = request.GET.get('question_type', None)
+    if question_type is not None:
+        queryset = queryset.filter(question_type=question_type)
+
+    try:
+        questions, links = await paginate(request, queryset, QUESTION_PAGE_SIZE)
+    except ValueError:
+        return error_response("Invalid page.", 404)
+    return json_response({**links, "results": QuestionSerializer(questions, many=True).data})
+
+
+@require_GET
+@async_condition(question_detail_conditions)
+async def question_detail(request, pk):
+    cache_key = question_detail_cache_key(pk, await aget_question_version(pk))
+    data = await cache.aget(cache_key)
+    if data is None:
+        question = await QuestionDetailView.queryset.filter(id=pk).afirst()
+        if question is None:
+            return error_response("Question not found", 404)
+        # Everything the serializer reads was prefetched above
+        data = QuestionDetailSerializer(question).data
+        await cache.aset(cache_key, data, QUESTION_DETAIL_CACHE_TIMEOUT)
+    return json_response(data)
+
+
+@require_GET
+async def practice_history(request):
+    try:
+        user = await authenticate(request)
+    except (InvalidToken, TokenError) as e:
+        return error_response(str(e), 401)
+    if user is None:
+        return error_response("Authentication credentials were not provided.", 401)
+
+    answers = get_history_queryset(user, request.GET.get('question_type', None))
+    if request.GET.get('pagination') == 'cursor' or 'cursor' in request.GET:
+        # Same cursors and links as PracticeHistoryView.get_paginator()
+        paginator = PracticeHistoryView.CustomCursorPagination()
+        try:
+            rows = paginator.filter_queryset(answers, request)
+        except NotFound as e:
+            return error_response(str(e.detail), 404)
+        answers = paginator.paginate_rows([answer async for answer in rows])
+        percentiles = await ScoreHistogramBucket.aget_percentiles(answers)
+        return json_response(paginator.get_paginated_data(
+            [get_history_entry(answer, percentiles) for answer in answers]
+        ))
+
+    pagination = PracticeHistoryView.CustomPagination
+    try:
+        answers, links = await paginate(request, answers, pagination.page_size, pagination.max_page_size)
+    except ValueError:
+        return error_response("Invalid page.", 404)
+    percentiles = await ScoreHistogramBucket.aget_percentiles(answers)
+    return json_response({**links, "results": [get_history_entry(answer, percentiles) for answer in answers]})
@@ -0,0 +1,145 @@
+"""
+Audio file metadata and byte-range helpers for SST audio files.
+
+Metadata (size, SHA-256 and duration) is computed once when a file is saved.
+Duration is read from the file headers: WAV through the `wave` module and
+MP3 from the first frame header (with its Xing/Info frame count if present).
+Other formats get no duration.
+"""
+import hashlib
+import re
+import wave
+
+CHUNK_SIZE = 64 * 1024
+
+# MPEG audio Layer III tables, indexed by the header's version bits
+MP3_BITRATES = {
+    'mpeg1': (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    'mpeg2': (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {
+    3: ('mpeg1', (44100, 48000, 32000)),
+    2: ('mpeg2', (22050, 24000, 16000)),
+    0: ('mpeg2.5', (11025, 12000, 8000)),
+}
+
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def inspect_audio(f):
+    """
+    Return {'size', 'sha256', 'duration'} of an open file. `duration` is in
+    seconds, or None when the format is not recognised.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in f.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    f.seek(0)
+    return {'size': size, 'sha256': digest.hexdigest(), 'duration': get_duration(f, size)}
+
+
+def get_duration(f, size):
+    header = f.read(10)
+    f.seek(0)
+    try:
+        if header[:4] == b'RIFF':
+            with wave.open(f, 'rb') as audio:
+                return round(audio.getnframes() / audio.getframerate(), 3)
+        return get_mp3_duration(f, size)
+    except (EOFError, IndexError, wave.Error, ZeroDivisionError):
+        # A malformed header has no duration rather than failing the upload
+        return None
+    finally:
+        f.seek(0)
+
+
+def get_mp3_duration(f, size):
+    offset = 0
+    header = f.read(10)
+    if header[:3] == b'ID3':
+        if len(header) < 10:
+            return None  # Truncated tag header
+        # Skip the ID3v2 tag: a syncsafe size, plus a footer if flagged
+        offset = 10 + ((header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9])
+        if header[5] & 0x10:
+            offset += 10
+    f.seek(offset)
+    frame = f.read(4 + 32 + 12)
+    if len(frame) < 4 or frame[0] != 0xFF or frame[1] & 0xE0 != 0xE0:
+        return None
+
+    version_bits = (frame[1] >> 3) & 0x03
+    layer_bits = (frame[1] >> 1) & 0x03
+    bitrate_index = frame[2] >> 4
+    sample_rate_index = (frame[2] >> 2) & 0x03
+    if version_bits not in MP3_SAMPLE_RATES or layer_bits != 1 or sample_rate_index == 3 or bitrate_index == 15:
+        return None  # Reserved values, or not Layer III
+    version, sample_rates = MP3_SAMPLE_RATES[version_bits]
+    sample_rate = sample_rates[sample_rate_index]
+    samples_per_frame = 1152 if version == 'mpeg1' else 576
+
+    # A Xing/Info frame gives the exact frame count of VBR files
+    mono = frame[3] >> 6 == 3
+    if version == 'mpeg1':
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    tag = frame[4 + side_info:4 + side_info + 12]
+    # A truncated frame falls back to the bitrate estimate
+    if len(tag) == 12 and tag[:4] in (b'Xing', b'Info') and tag[7] & 0x01:
+        frames = int.from_bytes(tag[8:12], 'big')
+        return round(frames * samples_per_frame / sample_rate, 3)
+
+    bitrate = MP3_BITRATES['mpeg1' if version == 'mpeg1' else 'mpeg2'][bitrate_index]
+    if not bitrate:
+        return None
+    return round((size - offset) * 8 / (bitrate * 1000), 3)
+
+
+def parse_range(header, size):
+    """
+    Parse a single `bytes=start-end` Range header against a file size.
+
+    Returns an inclusive (start, end) tuple, None when the header should be
+    ignored (absent, malformed, ending before it starts or multiple ranges),
+    or raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last `end` bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        # Syntactically invalid, so ignored and the full body served (RFC 9110)
+        return None
+    if start >= size:
+        raise ValueError(header)
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+def read_range(f, start, end):
+    """
+    Yield the bytes from `start` to `end` (inclusive) of an open file, then close it.
+    """
+    try:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
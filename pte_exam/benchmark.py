@@ -0,0 +1,542 @@
+"""
+Endpoint latency benchmarks. Seeds a dataset of a given scale and drives the
+API through the DRF test client, recording latency and SQL query counts.
+Run with `python manage.py benchmark`, or `python manage.py
+benchmark_concurrency` to compare the WSGI and ASGI read paths under load.
+`python manage.py stress_sqlite` runs concurrent writers against a SQLite
+file with and without the production profile (see settings).
+"""
+import asyncio
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.db.models import Sum
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .models import *
+from .tasks import ScoringWorker
+
+RO_PARAGRAPHS = 4
+RMMCQ_OPTIONS = 4
+BATCH_SIZE = 1000
+
+# Seeded payloads and the cold-cache scenario stay out of the live cache
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pte-exam-benchmark',
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    }
+}
+
+
+def bulk_create(model, objs):
+    return model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+
+
+def seed_dataset(questions=300, users=20, answers_per_user=200, seed=0):
+    """
+    Create `questions` questions split evenly across the question types, and
+    `users` users with `answers_per_user` scored answers each.
+    """
+    rng = random.Random(seed)
+
+    question_types = [question_type for question_type, _ in Question.QUESTION_TYPES]
+    question_objs = bulk_create(Question, [
+        Question(title=f"Benchmark question {i}", question_type=question_types[i % len(question_types)])
+        for i in range(questions)
+    ])
+
+    sst_details = bulk_create(SummarizeSpokenText, [
+        SummarizeSpokenText(question=q, answer_time_limit=600) for q in question_objs if q.question_type == 'SST'
+    ])
+    bulk_create(SSTAudioFile, [
+        SSTAudioFile(sst_question=sst, file=f"audio_files/benchmark_{sst.question_id}.mp3", speaker_name="Speaker")
+        for sst in sst_details
+    ])
+
+    ro_details = bulk_create(ReorderParagraphQuestion, [
+        ReorderParagraphQuestion(question=q) for q in question_objs if q.question_type == 'RO'
+    ])
+    bulk_create(ReorderParagraph, [
+        ReorderParagraph(
+            reorder_question=ro,
+            content=f"Paragraph {order} of question {ro.question_id}",
+            correct_next_order=order + 1 if order < RO_PARAGRAPHS else None,
+        )
+        for ro in ro_details
+        for order in range(1, RO_PARAGRAPHS + 1)
+    ])
+
+    rmmcq_details = bulk_create(ReadingMultipleChoiceQuestion, [
+        ReadingMultipleChoiceQuestion(question=q, passage=f"Passage of question {q.id}")
+        for q in question_objs if q.question_type == 'RMMCQ'
+    ])
+    options = bulk_create(RMMCQOption, [
+        RMMCQOption(rmmcq_question=rmmcq, content=f"Option {i}", is_correct=i < 2)
+        for rmmcq in rmmcq_details
+        for i in range(RMMCQ_OPTIONS)
+    ])
+    # Option ids keyed by Question id
+    rmmcq_question_ids = {rmmcq.id: rmmcq.question_id for rmmcq in rmmcq_details}
+    options_by_question = {}
+    for option in options:
+        options_by_question.setdefault(rmmcq_question_ids[option.rmmcq_question_id], []).append(option.id)
+
+    details_by_question = {d.question_id: d for d in [*sst_details, *ro_details, *rmmcq_details]}
+
+    user_objs = bulk_create(User, [User(username=f"benchmark-user-{i}") for i in range(users)])
+    answers = []
+    for user in user_objs:
+        for _ in range(answers_per_user):
+            question = rng.choice(question_objs)
+            max_score = {'SST': 10, 'RO': RO_PARAGRAPHS - 1, 'RMMCQ': 2}[question.question_type]
+            answers.append(Answer(
+                user=user, question=question, question_type=question.question_type,
+                total_score=rng.randint(0, max_score), max_score=max_score, score_status='scored',
+            ))
+    bulk_create(Answer, answers)
+
+    typed_answers = []
+    for answer in answers:
+        details = details_by_question[answer.question_id]
+        if answer.question_type == 'SST':
+            typed_answers.append(SSTAnswer(answer=answer, question=details, text="Summary", total_score=answer.total_score))
+        elif answer.question_type == 'RO':
+            order = rng.sample(range(1, RO_PARAGRAPHS + 1), RO_PARAGRAPHS)
+            typed_answers.append(ROAnswer(answer=answer, question=details, paragraph_order=order, total_score=answer.total_score))
+        else:
+            typed_answers.append(RMMCQAnswer(answer=answer, question=details, total_score=answer.total_score))
+    for model in (SSTAnswer, ROAnswer, RMMCQAnswer):
+        bulk_create(model, [typed for typed in typed_answers if isinstance(typed, model)])
+
+    Through = RMMCQAnswer.selected_options.through
+    bulk_create(Through, [
+        Through(rmmcqanswer_id=typed.id, rmmcqoption_id=option_id)
+        for typed in typed_answers if isinstance(typed, RMMCQAnswer)
+        for option_id in rng.sample(options_by_question[typed.question.question_id], 2)
+    ])
+
+    return {
+        'questions': question_objs,
+        'users': user_objs,
+        'options_by_question': options_by_question,
+    }
+
+
+def make_submission(question, options_by_question, rng):
+    """
+    Return a valid `answer` payload for a seeded question.
+    """
+    if question.question_type == 'SST':
+        return "A summary of the lecture."
+    if question.question_type == 'RO':
+        return rng.sample(range(1, RO_PARAGRAPHS + 1), RO_PARAGRAPHS)
+    return rng.sample(options_by_question[question.id], 2)
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, query_counts):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'queries_mean': round(sum(query_counts) / len(query_counts), 2),
+        'queries_max': max(query_counts),
+    }
+
+
+def measure(client, requests, make_request, before=None):
+    """
+    Time `requests` calls of `make_request(client, i)`, counting SQL queries.
+    `before(i)` runs untimed before each call.
+    """
+    latencies, query_counts = [], []
+    for i in range(requests):
+        if before:
+            before(i)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = make_request(client, i)
+            latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f"Benchmark request failed with {response.status_code}: {response.content[:200]}")
+        query_counts.append(len(queries))
+    return summarize(latencies, query_counts)
+
+
+def run_benchmarks(dataset, requests=200, seed=0):
+    """
+    Drive each endpoint `requests` times against a seeded dataset and return
+    a {scenario: summary} dict.
+    """
+    rng = random.Random(seed)
+    questions = dataset['questions']
+    options_by_question = dataset['options_by_question']
+    user = dataset['users'][0]
+
+    client = APIClient()
+    client.force_authenticate(user)
+    list_url = reverse('question-list')
+    history_url = reverse('practice-history')
+    submit_url = reverse('submit-answer')
+    question_pages = max(1, math.ceil(len(questions) / 10))
+    history_pages = max(1, math.ceil(user.answers.count() / 10))
+
+    def submit(client, i):
+        question = rng.choice(questions)
+        data = {'question_id': question.id, 'answer': make_submission(question, options_by_question, rng)}
+        return client.post(submit_url, data, format='json')
+
+    def deep_history_cursor():
+        response = client.get(history_url, {'pagination': 'cursor', 'page_size': 50})
+        for _ in range(min(history_pages // 5, 20)):
+            if not response.data['next']:
+                break
+            response = client.get(response.data['next'])
+        return response.data['next'] or response.data['previous'] or history_url
+
+    deep_cursor_url = deep_history_cursor()
+    scenarios = {
+        'question_list': lambda client, i: client.get(list_url, {'page': rng.randint(1, question_pages)}),
+        'question_list_by_type': lambda client, i: client.get(
+            list_url, {'question_type': rng.choice(['SST', 'RO', 'RMMCQ'])}
+        ),
+        'question_detail': lambda client, i: client.get(reverse('question-detail', args=[rng.choice(questions).id])),
+        'practice_history': lambda client, i: client.get(history_url),
+        'practice_history_deep_page': lambda client, i: client.get(history_url, {'page': history_pages}),
+        'practice_history_cursor_deep': lambda client, i: client.get(deep_cursor_url),
+    }
+
+    results = {}
+    for name, make_request in scenarios.items():
+        results[name] = measure(client, requests, make_request)
+    results['question_detail_cold'] = measure(
+        client, requests, scenarios['question_detail'], before=lambda i: cache.clear()
+    )
+    # Last, as it adds to the user's history. One user submitting as fast as
+    # it can would only measure admission control rejecting it.
+    with override_settings(ADMISSION_CONTROL={'ENABLED': False}):
+        results['submit_answer'] = measure(client, requests, submit)
+    return results
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run the enclosed block against a throwaway test database and an empty
+    local memory cache of its own.
+    """
+    with override_settings(CACHES=BENCHMARK_CACHES):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        cache.clear()
+        try:
+            yield
+        finally:
+            cache.clear()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def concurrency_paths(dataset, rng):
+    question_id = rng.choice(dataset['questions']).id
+    return {
+        'wsgi': [
+            reverse('question-list'),
+            reverse('question-detail', args=[question_id]),
+            reverse('practice-history'),
+        ],
+        'asgi': [
+            reverse('async-question-list'),
+            reverse('async-question-detail', args=[question_id]),
+            reverse('async-practice-history'),
+        ],
+    }
+
+
+def summarize_concurrency(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def run_wsgi_concurrency(paths, cookies, concurrency, requests, threads):
+    """
+    Send `requests` requests through the WSGI handler, `concurrency` at a
+    time, served by a pool of `threads` worker threads like a threaded WSGI
+    server. Latency includes the time spent waiting for a free thread.
+    """
+    def call(path, submitted_at):
+        client = Client()
+        client.cookies = cookies
+        try:
+            response = client.get(path)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{path} failed with {response.status_code}")
+            return time.perf_counter() - submitted_at
+        finally:
+            connection.close()
+
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for wave in range(0, requests, concurrency):
+            submitted_at = time.perf_counter()
+            futures = [
+                pool.submit(call, paths[i % len(paths)], submitted_at)
+                for i in range(wave, min(wave + concurrency, requests))
+            ]
+            latencies.extend(future.result() for future in futures)
+    return summarize_concurrency(latencies, time.perf_counter() - start)
+
+
+async def run_asgi_concurrency(paths, cookies, concurrency, requests):
+    """
+    Send `requests` requests through the ASGI handler, `concurrency` at a time
+    on one event loop.
+    """
+    async def call(path, submitted_at):
+        client = AsyncClient()
+        client.cookies = cookies
+        response = await client.get(path)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{path} failed with {response.status_code}")
+        return time.perf_counter() - submitted_at
+
+    latencies = []
+    start = time.perf_counter()
+    for wave in range(0, requests, concurrency):
+        submitted_at = time.perf_counter()
+        latencies.extend(await asyncio.gather(*[
+            call(paths[i % len(paths)], submitted_at)
+            for i in range(wave, min(wave + concurrency, requests))
+        ]))
+    return summarize_concurrency(latencies, time.perf_counter() - start)
+
+
+def run_concurrency_benchmarks(dataset, concurrency_levels=(1, 10, 50), requests=200, wsgi_threads=8, seed=0):
+    """
+    Compare the sync WSGI views with the async ASGI views at each concurrency
+    level. Returns {level: {'wsgi': summary, 'asgi': summary}}.
+    """
+    paths = concurrency_paths(dataset, random.Random(seed))
+    client = Client()
+    client.force_login(dataset['users'][0])
+
+    results = {}
+    for level in concurrency_levels:
+        results[str(level)] = {
+            'wsgi': run_wsgi_concurrency(paths['wsgi'], client.cookies, level, requests, wsgi_threads),
+            'asgi': asyncio.run(run_asgi_concurrency(paths['asgi'], client.cookies, level, requests)),
+        }
+    return results
+
+
+@contextmanager
+def sqlite_stress_database(production):
+    """
+    Run the enclosed block against a throwaway SQLite file. With
+    `production`, the file is opened with the production profile options
+    and reads are routed to a read-only `replica` connection to it.
+    """
+    default = connections[DEFAULT_DB_ALIAS]
+    saved_options = default.settings_dict['OPTIONS']
+    saved_test_name = default.settings_dict['TEST'].get('NAME')
+    saved_replica = connections.settings.get('replica')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stress.sqlite3')
+        default.close()
+        default.settings_dict['OPTIONS'] = dict(settings.SQLITE_PRODUCTION_OPTIONS) if production else {}
+        default.settings_dict['TEST']['NAME'] = path
+        routers = []
+        if production:
+            connections.settings['replica'] = {
+                **default.settings_dict,
+                'NAME': f"file:{path}?mode=ro",
+                'OPTIONS': dict(settings.SQLITE_READ_OPTIONS),
+            }
+            routers = ['onepte.routers.ReadReplicaRouter']
+        try:
+            with benchmark_database(), override_settings(DATABASE_ROUTERS=routers):
+                yield
+        finally:
+            connections.close_all()
+            if 'replica' in connections.settings:
+                del connections['replica']
+            if saved_replica is not None:
+                connections.settings['replica'] = saved_replica
+            else:
+                connections.settings.pop('replica', None)
+            default.settings_dict['OPTIONS'] = saved_options
+            default.settings_dict['TEST']['NAME'] = saved_test_name
+
+
+class StressScoringWorker(ScoringWorker):
+    """
+    Reports every failed job attempt, which run_job() catches and requeues.
+    """
+
+    def __init__(self, on_failure, **kwargs):
+        super().__init__(**kwargs)
+        self.on_failure = on_failure
+
+    def run_one(self, job):
+        job = super().run_one(job)
+        if job.status != 'done':
+            self.on_failure(job.last_error)
+        return job
+
+
+def run_write_stress(dataset, writers=8, readers=4, submissions=50, scoring_workers=2, drain_timeout=60, seed=0):
+    """
+    Submit answers from `writers` threads while a scoring worker drains the
+    SST queue and `readers` threads page through practice history. Once the
+    writers finish, the worker keeps scoring for up to `drain_timeout`
+    seconds until no job is left queued or running.
+
+    Returns throughput, latency percentiles and the errors raised, keyed by
+    kind. `locked` counts "database is locked" errors, including failed
+    scoring job attempts; `scoring_job` counts other failed attempts and
+    `jobs_pending` the jobs the worker did not finish.
+    """
+    questions = dataset['questions']
+    options_by_question = dataset['options_by_question']
+    users = dataset['users']
+    submit_url = reverse('submit-answer')
+    history_url = reverse('practice-history')
+
+    errors = Counter()
+    errors_lock = threading.Lock()
+    writers_done = threading.Event()
+
+    def record_error(kind, message):
+        with errors_lock:
+            errors['locked' if 'locked' in message else kind] += 1
+
+    def write(i):
+        rng = random.Random(seed + i)
+        client = APIClient()
+        client.force_authenticate(users[i % len(users)])
+        latencies = []
+        try:
+            for _ in range(submissions):
+                question = rng.choice(questions)
+                data = {'question_id': question.id, 'answer': make_submission(question, options_by_question, rng)}
+                start = time.perf_counter()
+                try:
+                    response = client.post(submit_url, data, format='json')
+                except OperationalError as e:
+                    record_error(type(e).__name__, str(e))
+                    continue
+                if response.status_code >= 400:
+                    raise RuntimeError(f"Submission failed with {response.status_code}: {response.content[:200]}")
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+        return latencies
+
+    def read(i):
+        client = APIClient()
+        client.force_authenticate(users[i % len(users)])
+        latencies = []
+        try:
+            while not writers_done.is_set():
+                start = time.perf_counter()
+                try:
+                    client.get(history_url)
+                except OperationalError as e:
+                    record_error(type(e).__name__, str(e))
+                    continue
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+        return latencies
+
+    def unfinished_jobs():
+        return ScoringJob.objects.filter(status__in=['queued', 'running']).exists()
+
+    def score():
+        worker = StressScoringWorker(
+            lambda message: record_error('scoring_job', message), workers=scoring_workers, poll_interval=0.01,
+        )
+        deadline = None
+        try:
+            while True:
+                if deadline is None and writers_done.is_set():
+                    deadline = time.perf_counter() + drain_timeout
+                try:
+                    worker.run(once=True)
+                    if deadline is not None and (time.perf_counter() > deadline or not unfinished_jobs()):
+                        return
+                except OperationalError as e:
+                    record_error(type(e).__name__, str(e))
+                # Retried jobs wait out their backoff here
+                time.sleep(0.01)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    # Measures database contention, so submissions are never shed
+    with override_settings(ADMISSION_CONTROL={'ENABLED': False}), \
+            ThreadPoolExecutor(max_workers=writers + readers + 1) as pool:
+        scorer = pool.submit(score)
+        reader_futures = [pool.submit(read, i) for i in range(readers)]
+        writer_futures = [pool.submit(write, i) for i in range(writers)]
+        write_latencies = [latency for future in writer_futures for latency in future.result()]
+        writers_done.set()
+        read_latencies = [latency for future in reader_futures for latency in future.result()]
+        scorer.result()
+    elapsed = time.perf_counter() - start
+
+    jobs = ScoringJob.objects.all()
+    done = jobs.filter(status='done').count()
+    pending = jobs.exclude(status='done').count()
+    if pending:
+        errors['jobs_pending'] = pending
+    return {
+        'submit': summarize_concurrency(write_latencies, elapsed) if write_latencies else None,
+        'read': summarize_concurrency(read_latencies, elapsed) if read_latencies else None,
+        'jobs_done': done,
+        'jobs_pending': pending,
+        # Every attempt except the one that scored a done job failed
+        'scoring_failures': (jobs.aggregate(attempts=Sum('attempts'))['attempts'] or 0) - done,
+        'errors': dict(errors),
+    }
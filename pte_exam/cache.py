@@ -0,0 +1,118 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+# Serialized question detail payloads are cached under versioned keys. Saving
+# or deleting any part of a question bumps its version once the change commits,
+# so stale payloads are never read again and simply expire.
+#
+# Versions are nanosecond timestamps that only move forward, so a version
+# also tells when the content last changed (see version_to_datetime).
+QUESTION_DETAIL_CACHE_TIMEOUT = 60 * 60 * 24
+QUESTION_VERSION_KEY = "question-version:{question_id}"
+QUESTION_TYPE_VERSION_KEY = "question-type-version:{question_type}"
+QUESTION_DETAIL_KEY = "question-detail:{question_id}:v{version}"
+
+# Ids of the answerable questions of a type, versioned like the question lists
+QUESTION_IDS_KEY = "question-ids:{question_type}:v{version}"
+QUESTION_IDS_CACHE_TIMEOUT = 60 * 60 * 24
+# Ids of the questions of a type a user has answered, rebuilt from Answer on a
+# miss. Submissions add to the set under a per-user lock taken with
+# cache.add(); one that cannot get the lock bumps the version instead.
+SEEN_QUESTIONS_VERSION_KEY = "seen-questions-version:{user_id}:{question_type}"
+SEEN_QUESTIONS_KEY = "seen-questions:{user_id}:{question_type}:v{version}"
+SEEN_QUESTIONS_LOCK_KEY = "seen-questions-lock:{user_id}:{question_type}"
+SEEN_QUESTIONS_CACHE_TIMEOUT = 60 * 60 * 24
+SEEN_QUESTIONS_LOCK_TIMEOUT = 10
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+async def aget_version(key):
+    """
+    get_version() for async views, through the cache's async API.
+    """
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def bump_version(key):
+    version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def version_to_datetime(version):
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+
+def get_question_version(question_id):
+    """
+    Return the current version of a question's content.
+    """
+    return get_version(QUESTION_VERSION_KEY.format(question_id=question_id))
+
+
+async def aget_question_version(question_id):
+    return await aget_version(QUESTION_VERSION_KEY.format(question_id=question_id))
+
+
+def bump_question_version(question_id):
+    """
+    Invalidate every cached payload of a question.
+    """
+    return bump_version(QUESTION_VERSION_KEY.format(question_id=question_id))
+
+
+def get_question_type_version(question_type):
+    """
+    Return the current version of the list of questions of a type.
+    """
+    return get_version(QUESTION_TYPE_VERSION_KEY.format(question_type=question_type))
+
+
+async def aget_question_type_version(question_type):
+    return await aget_version(QUESTION_TYPE_VERSION_KEY.format(question_type=question_type))
+
+
+def bump_question_type_version(question_type):
+    return bump_version(QUESTION_TYPE_VERSION_KEY.format(question_type=question_type))
+
+
+def question_detail_cache_key(question_id, version=None):
+    if version is None:
+        version = get_question_version(question_id)
+    return QUESTION_DETAIL_KEY.format(question_id=question_id, version=version)
+
+
+def question_ids_cache_key(question_type):
+    return QUESTION_IDS_KEY.format(question_type=question_type, version=get_question_type_version(question_type))
+
+
+def seen_questions_cache_key(user_id, question_type):
+    version = get_version(SEEN_QUESTIONS_VERSION_KEY.format(user_id=user_id, question_type=question_type))
+    return SEEN_QUESTIONS_KEY.format(user_id=user_id, question_type=question_type, version=version)
+
+
+def seen_questions_lock_key(user_id, question_type):
+    return SEEN_QUESTIONS_LOCK_KEY.format(user_id=user_id, question_type=question_type)
+
+
+def bump_seen_questions_version(user_id, question_type):
+    """
+    Invalidate a user's cached seen set of a question type.
+    """
+    return bump_version(SEEN_QUESTIONS_VERSION_KEY.format(user_id=user_id, question_type=question_type))
@@ -0,0 +1,120 @@
+"""
+Streaming export of answers and their scores as JSONL or CSV, used by
+`python manage.py export_answers` and the admin-only /api/export/answers/
+endpoint.
+
+Rows are read with one joined query through `.iterator(chunk_size=...)` and
+written as they arrive, so memory use does not depend on the number of rows.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Answer, Question
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('jsonl', 'csv')
+
+# Exported column: Answer lookup
+EXPORT_COLUMNS = {
+    'answer_id': 'id',
+    'user_id': 'user_id',
+    'username': 'user__username',
+    'question_id': 'question_id',
+    'question_title': 'question__title',
+    'question_type': 'question_type',
+    'submitted_at': 'created_at',
+    'score_status': 'score_status',
+    'total_score': 'total_score',
+    'max_score': 'max_score',
+    'sst_content_score': 'sst_answer_details__content_score',
+    'sst_form_score': 'sst_answer_details__form_score',
+    'sst_grammar_score': 'sst_answer_details__grammar_score',
+    'sst_vocabulary_score': 'sst_answer_details__vocabulary_score',
+    'sst_spelling_score': 'sst_answer_details__spelling_score',
+}
+
+
+def parse_export_datetime(value, end=False):
+    """
+    Parse an ISO date or datetime. A date `end` covers that whole day.
+    Raises ValueError for anything else.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD or an ISO datetime")
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def get_export_queryset(start=None, end=None, question_type=None, user_id=None):
+    """
+    Answers submitted in [start, end), optionally of one question type and
+    user, as dicts of EXPORT_COLUMNS lookups in id order. `start` and `end`
+    are ISO strings (see parse_export_datetime). Raises ValueError for an
+    invalid filter.
+    """
+    answers = Answer.objects.all()
+    if start:
+        answers = answers.filter(created_at__gte=parse_export_datetime(start))
+    if end:
+        answers = answers.filter(created_at__lt=parse_export_datetime(end, end=True))
+    if question_type:
+        if question_type not in Question.DETAILS_RELATED_NAMES:
+            raise ValueError(f"Invalid question type {question_type!r}")
+        answers = answers.filter(question_type=question_type)
+    if user_id:
+        try:
+            answers = answers.filter(user_id=int(user_id))
+        except ValueError:
+            raise ValueError(f"Invalid user id {user_id!r}")
+    return answers.order_by('id').values(*EXPORT_COLUMNS.values())
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one {column: value} dict per answer, fetching `chunk_size` rows at a time.
+    """
+    columns = list(EXPORT_COLUMNS.items())
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield {column: row[lookup] for column, lookup in columns}
+
+
+def render_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+class Echo:
+    """
+    File-like object whose write() returns the line, for streaming csv.writer output.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        values = row.values()
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in values])
+
+
+RENDERERS = {'jsonl': render_jsonl, 'csv': render_csv}
+
+
+def render_export(queryset, format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the export of `queryset` as lines of the given format.
+    """
+    return RENDERERS[format](export_rows(queryset, chunk_size))
@@ -0,0 +1,267 @@
+"""
+Bulk question import from a JSONL or CSV content bank, used by
+`python manage.py import_questions`.
+
+Rows are validated one at a time and inserted in chunks, each chunk in one
+transaction of bulk_create calls, so memory use does not grow with the size
+of the file. A malformed row is rejected on its own.
+
+JSONL rows are objects such as:
+
+    {"type": "SST", "title": "...", "answer_time_limit": 600, "transcript": "...",
+     "audios": [{"file": "audio_files/lecture.mp3", "speaker_name": "..."}]}
+    {"type": "RO", "title": "...", "paragraphs": ["First", "Second", "Third"]}
+    {"type": "RMMCQ", "title": "...", "passage": "...",
+     "options": [{"content": "...", "is_correct": true}, {"content": "..."}]}
+
+RO paragraphs are listed in their correct order, or as objects with
+`content` and an explicit `correct_next_order` (1-based, null for the last).
+RMMCQ `is_correct` must be a JSON boolean.
+
+CSV files have the columns type, title, answer_time_limit, transcript,
+audios, speakers, paragraphs, passage and options. List columns are separated by
+`|`, and correct options are prefixed with `*`.
+"""
+import csv
+import json
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .audio import inspect_audio
+from .cache import bump_question_type_version
+from .models import *
+from .search import index_questions
+
+CSV_LIST_SEPARATOR = '|'
+CORRECT_OPTION_MARKER = '*'
+CSV_COLUMNS = (
+    'type', 'title', 'answer_time_limit', 'transcript', 'audios', 'speakers', 'paragraphs', 'passage', 'options',
+)
+CSV_REQUIRED_COLUMNS = ('type', 'title')
+TITLE_MAX_LENGTH = Question._meta.get_field('title').max_length
+
+
+def read_rows(f, format):
+    """
+    Return an iterator of (line_number, row) pairs: raw lines for JSONL,
+    dicts for CSV. A CSV header is read and checked right away, raising
+    ValueError if it lacks a required column.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"CSV header is missing the columns {', '.join(missing)}; expected {', '.join(CSV_COLUMNS)}")
+        return ((reader.line_num, row) for row in reader)
+    return ((line_number, line) for line_number, line in enumerate(f, 1) if line.strip())
+
+
+def split_list(value):
+    return [item.strip() for item in (value or '').split(CSV_LIST_SEPARATOR) if item.strip()]
+
+
+def csv_row_to_data(row):
+    """
+    Convert a CSV row to the JSONL shape.
+    """
+    data = {'type': row.get('type'), 'title': row.get('title')}
+    if row.get('answer_time_limit'):
+        data['answer_time_limit'] = row['answer_time_limit']
+    data['transcript'] = row.get('transcript') or ''
+    files, speakers = split_list(row.get('audios')), split_list(row.get('speakers'))
+    if len(speakers) not in (0, len(files)):
+        raise ValueError("audios and speakers must have the same number of entries")
+    data['audios'] = [
+        {'file': file, 'speaker_name': speakers[i] if speakers else ''} for i, file in enumerate(files)
+    ]
+    data['paragraphs'] = split_list(row.get('paragraphs'))
+    data['passage'] = row.get('passage')
+    data['options'] = [
+        {'content': option.removeprefix(CORRECT_OPTION_MARKER).strip(), 'is_correct': option.startswith(CORRECT_OPTION_MARKER)}
+        for option in split_list(row.get('options'))
+    ]
+    return data
+
+
+def require_text(data, field, max_length=None):
+    value = data.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{field} is required")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value.strip()
+
+
+def require_list(data, field, min_length):
+    value = data.get(field)
+    if not isinstance(value, list) or len(value) < min_length:
+        raise ValueError(f"{field} must be a list of at least {min_length} entries")
+    return value
+
+
+def parse_paragraphs(paragraphs):
+    """
+    Return [(content, correct_next_order)], checking that an explicit chain
+    visits every paragraph once.
+    """
+    if all(isinstance(paragraph, str) for paragraph in paragraphs):
+        count = len(paragraphs)
+        return [
+            (require_text({'paragraph': p}, 'paragraph'), order + 1 if order < count else None)
+            for order, p in enumerate(paragraphs, 1)
+        ]
+    if not all(isinstance(paragraph, dict) for paragraph in paragraphs):
+        raise ValueError("paragraphs must all be strings or all be objects")
+
+    parsed = [(require_text(p, 'content'), p.get('correct_next_order')) for p in paragraphs]
+    count = len(parsed)
+    next_orders = [next_order for _, next_order in parsed]
+    if next_orders.count(None) != 1:
+        raise ValueError("exactly one paragraph must have no correct_next_order")
+    if any(
+        next_order is not None and (type(next_order) is not int or not 1 <= next_order <= count)
+        for next_order in next_orders
+    ):
+        raise ValueError(f"correct_next_order must be between 1 and {count}")
+    heads = set(range(1, count + 1)) - set(next_orders)
+    if len(heads) != 1:
+        raise ValueError("paragraphs do not form a single chain")
+    order, seen = heads.pop(), set()
+    while order is not None and order not in seen:
+        seen.add(order)
+        order = next_orders[order - 1]
+    if len(seen) != count:
+        raise ValueError("paragraphs do not form a single chain")
+    return parsed
+
+
+def parse_audio(audio, check_files=True):
+    """
+    Return an unsaved SSTAudioFile, with its metadata read from storage.
+    """
+    if not isinstance(audio, dict):
+        raise ValueError("audios entries must be objects")
+    path = require_text(audio, 'file')
+    audio_file = SSTAudioFile(file=path, speaker_name=require_text(audio, 'speaker_name', 255))
+    if check_files:
+        try:
+            with default_storage.open(path, 'rb') as f:
+                metadata = inspect_audio(f)
+        except FileNotFoundError:
+            raise ValueError(f"audio file {path} not found")
+        except Exception as e:
+            # An unreadable or malformed file rejects its row, not the import
+            raise ValueError(f"cannot read audio file {path}: {e!r}")
+        audio_file.size, audio_file.sha256, audio_file.duration = (
+            metadata['size'], metadata['sha256'], metadata['duration'],
+        )
+    return audio_file
+
+
+def parse_is_correct(option):
+    # A string such as "false" would be truthy, so only real booleans are accepted
+    is_correct = option.get('is_correct', False)
+    if not isinstance(is_correct, bool):
+        raise ValueError("is_correct must be true or false")
+    return is_correct
+
+
+def parse_row(row, format, check_files=True):
+    """
+    Validate a row and return a dict of the question's fields and content.
+    Raises ValueError with a message for a malformed row.
+    """
+    if format == 'csv':
+        data = csv_row_to_data(row)
+    else:
+        try:
+            data = json.loads(row)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}")
+        if not isinstance(data, dict):
+            raise ValueError("row must be a JSON object")
+
+    question_type = data.get('type')
+    if not isinstance(question_type, str) or question_type not in Question.DETAILS_RELATED_NAMES:
+        raise ValueError(f"type must be one of {', '.join(Question.DETAILS_RELATED_NAMES)}")
+    question = {'type': question_type, 'title': require_text(data, 'title', TITLE_MAX_LENGTH)}
+
+    if question_type == 'SST':
+        try:
+            answer_time_limit = int(data.get('answer_time_limit'))
+        except (TypeError, ValueError):
+            answer_time_limit = 0
+        if answer_time_limit <= 0:
+            raise ValueError("answer_time_limit must be a positive number of seconds")
+        question['answer_time_limit'] = answer_time_limit
+        transcript = data.get('transcript') or ''
+        if not isinstance(transcript, str):
+            raise ValueError("transcript must be text")
+        question['transcript'] = transcript.strip()
+        question['audios'] = [parse_audio(audio, check_files) for audio in require_list(data, 'audios', 1)]
+    elif question_type == 'RO':
+        question['paragraphs'] = parse_paragraphs(require_list(data, 'paragraphs', 2))
+    else:
+        question['passage'] = require_text(data, 'passage')
+        options = require_list(data, 'options', 2)
+        if not all(isinstance(option, dict) for option in options):
+            raise ValueError("options entries must be objects")
+        question['options'] = [(require_text(option, 'content'), parse_is_correct(option)) for option in options]
+        if not any(is_correct for _, is_correct in question['options']):
+            raise ValueError("at least one option must be correct")
+    return question
+
+
+def insert_questions(questions):
+    """
+    Insert a chunk of parsed questions and their content in one transaction.
+    """
+    with transaction.atomic():
+        question_objs = Question.objects.bulk_create([
+            Question(title=question['title'], question_type=question['type']) for question in questions
+        ])
+        by_type = {}
+        for obj, question in zip(question_objs, questions):
+            by_type.setdefault(question['type'], []).append((obj, question))
+
+        sst = by_type.get('SST', [])
+        sst_details = SummarizeSpokenText.objects.bulk_create([
+            SummarizeSpokenText(
+                question=obj, answer_time_limit=question['answer_time_limit'], transcript=question['transcript'],
+            )
+            for obj, question in sst
+        ])
+        audio_files = []
+        for details, (_, question) in zip(sst_details, sst):
+            for audio_file in question['audios']:
+                audio_file.sst_question = details
+                audio_files.append(audio_file)
+        SSTAudioFile.objects.bulk_create(audio_files)
+
+        ro = by_type.get('RO', [])
+        ro_details = ReorderParagraphQuestion.objects.bulk_create([
+            ReorderParagraphQuestion(question=obj) for obj, _ in ro
+        ])
+        ReorderParagraph.objects.bulk_create([
+            ReorderParagraph(reorder_question=details, content=content, correct_next_order=next_order)
+            for details, (_, question) in zip(ro_details, ro)
+            for content, next_order in question['paragraphs']
+        ])
+
+        rmmcq = by_type.get('RMMCQ', [])
+        rmmcq_details = ReadingMultipleChoiceQuestion.objects.bulk_create([
+            ReadingMultipleChoiceQuestion(question=obj, passage=question['passage']) for obj, question in rmmcq
+        ])
+        RMMCQOption.objects.bulk_create([
+            RMMCQOption(rmmcq_question=details, content=content, is_correct=is_correct)
+            for details, (_, question) in zip(rmmcq_details, rmmcq)
+            for content, is_correct in question['options']
+        ])
+        index_questions([obj.id for obj in question_objs])
+
+    # bulk_create sends no signals, so the chunk is indexed and the cached
+    # question lists are invalidated here
+    for question_type in by_type:
+        bump_question_type_version(question_type)
+    return question_objs
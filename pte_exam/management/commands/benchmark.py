@@ -0,0 +1,73 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from pte_exam.benchmark import benchmark_database, run_benchmarks, seed_dataset
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database at the given scale and report p50/p95/p99 "
+        "latency and SQL query counts for the API endpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=300, help="Number of questions to seed.")
+        parser.add_argument("--users", type=int, default=20, help="Number of users to seed.")
+        parser.add_argument("--answers-per-user", type=int, default=200, help="Scored answers seeded per user.")
+        parser.add_argument("--requests", type=int, default=200, help="Requests timed per endpoint.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the dataset and requests.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        scale = {
+            "questions": options["questions"],
+            "users": options["users"],
+            "answers_per_user": options["answers_per_user"],
+        }
+
+        with benchmark_database():
+            self.stdout.write(f"Seeding {scale} ...")
+            dataset = seed_dataset(seed=options["seed"], **scale)
+            results = run_benchmarks(dataset, requests=options["requests"], seed=options["seed"])
+
+        report = {
+            "meta": {
+                "commit": get_git_commit(),
+                "timestamp": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "requests": options["requests"],
+                "seed": options["seed"],
+                **scale,
+            },
+            "results": results,
+        }
+
+        self.stdout.write(f"{'endpoint':32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:32} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+                f"{result['p99_ms']:9.2f} {result['queries_mean']:8.1f}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,69 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from pte_exam.benchmark import benchmark_database, run_concurrency_benchmarks, seed_dataset
+from pte_exam.management.commands.benchmark import get_git_commit
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync (WSGI) and async (ASGI) question list, question detail and "
+        "practice history views at increasing numbers of concurrent requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=300, help="Number of questions to seed.")
+        parser.add_argument("--users", type=int, default=5, help="Number of users to seed.")
+        parser.add_argument("--answers-per-user", type=int, default=200, help="Scored answers seeded per user.")
+        parser.add_argument("--concurrency", default="1,10,50,100", help="Comma-separated concurrency levels.")
+        parser.add_argument("--requests", type=int, default=300, help="Requests sent per concurrency level.")
+        parser.add_argument("--wsgi-threads", type=int, default=8, help="Worker threads of the emulated WSGI server.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the dataset.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        scale = {
+            "questions": options["questions"],
+            "users": options["users"],
+            "answers_per_user": options["answers_per_user"],
+        }
+        levels = [int(level) for level in options["concurrency"].split(",")]
+
+        with benchmark_database():
+            self.stdout.write(f"Seeding {scale} ...")
+            dataset = seed_dataset(seed=options["seed"], **scale)
+            results = run_concurrency_benchmarks(
+                dataset, levels, requests=options["requests"],
+                wsgi_threads=options["wsgi_threads"], seed=options["seed"],
+            )
+
+        self.stdout.write(f"{'concurrency':>11} {'path':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for level, paths in results.items():
+            for path, result in paths.items():
+                self.stdout.write(
+                    f"{level:>11} {path:>5} {result['throughput_rps']:9.1f} {result['p50_ms']:9.2f} "
+                    f"{result['p95_ms']:9.2f} {result['p99_ms']:9.2f}"
+                )
+
+        if options["output"]:
+            report = {
+                "meta": {
+                    "commit": get_git_commit(),
+                    "timestamp": timezone.now().isoformat(),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "database": connection.vendor,
+                    "requests": options["requests"],
+                    "wsgi_threads": options["wsgi_threads"],
+                    **scale,
+                },
+                "results": results,
+            }
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,45 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pte_exam.exporter import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, get_export_queryset, render_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream answers and their scores as JSONL or CSV, optionally filtered by "
+        "submission date, question type and user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl", help="Output format.")
+        parser.add_argument("--output", help="File to write. Defaults to stdout.")
+        parser.add_argument("--start", help="Only answers submitted at or after this ISO date or datetime.")
+        parser.add_argument("--end", help="Only answers submitted before this ISO datetime, or on or before this date.")
+        parser.add_argument("--question-type", help="Only answers to questions of this type (SST, RO or RMMCQ).")
+        parser.add_argument("--user", help="Only answers of this user id.")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        try:
+            answers = get_export_queryset(
+                start=options["start"], end=options["end"],
+                question_type=options["question_type"], user_id=options["user"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = open(options["output"], "w", newline="", encoding="utf-8") if options["output"] else sys.stdout
+        start = time.perf_counter()
+        lines = 0
+        try:
+            for line in render_export(answers, options["format"], options["chunk_size"]):
+                output.write(line)
+                lines += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        rows = lines - 1 if options["format"] == "csv" else lines
+        self.stderr.write(f"Exported {rows} answers in {time.perf_counter() - start:.1f}s", style_func=self.style.SUCCESS)
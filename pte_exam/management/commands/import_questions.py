@@ -0,0 +1,83 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pte_exam.importer import insert_questions, parse_row, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import SST, RO and RMMCQ questions from a JSONL or CSV content bank, in chunked "
+        "bulk inserts. Malformed rows are reported and skipped. See pte_exam/importer.py "
+        "for the row format."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL or CSV file to import, or - for stdin.")
+        parser.add_argument("--format", choices=["jsonl", "csv"], help="File format. Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Questions inserted per transaction.")
+        parser.add_argument("--rejects", help="Write rejected rows, with their errors, as JSONL to this file.")
+        parser.add_argument("--skip-audio-check", action="store_true",
+                            help="Do not require SST audio files to exist in storage, nor read their metadata.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate the rows without inserting them.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        try:
+            f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        except OSError as e:
+            raise CommandError(f"Cannot open {path}: {e}")
+        try:
+            rows = read_rows(f, format)
+        except ValueError as e:
+            # A bad CSV header
+            if f is not sys.stdin:
+                f.close()
+            raise CommandError(str(e))
+        rejects = open(options["rejects"], "w", encoding="utf-8") if options["rejects"] else None
+
+        imported = rejected = 0
+        chunk = []
+        start = time.perf_counter()
+
+        def flush():
+            nonlocal imported
+            if not options["dry_run"]:
+                insert_questions(chunk)
+            imported += len(chunk)
+            chunk.clear()
+            rate = imported / max(time.perf_counter() - start, 1e-9)
+            self.stdout.write(f"Imported {imported} questions, rejected {rejected} rows ({rate:.0f} questions/s)")
+
+        try:
+            for line_number, row in rows:
+                try:
+                    chunk.append(parse_row(row, format, check_files=not options["skip_audio_check"]))
+                except ValueError as e:
+                    rejected += 1
+                    self.stderr.write(f"Line {line_number}: {e}")
+                    if rejects:
+                        rejects.write(json.dumps({"line": line_number, "error": str(e), "row": row}) + "\n")
+                    continue
+                if len(chunk) >= chunk_size:
+                    flush()
+            if chunk:
+                flush()
+        finally:
+            if f is not sys.stdin:
+                f.close()
+            if rejects:
+                rejects.close()
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. {verb} {imported} questions in {elapsed:.1f}s, rejected {rejected} rows."
+        ))
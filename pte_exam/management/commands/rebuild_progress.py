@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from pte_exam.models import Answer, UserProgress
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user progress statistics from scored answers, a chunk of users at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Number of users rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        user_ids = Answer.objects.order_by("user_id").values_list("user_id", flat=True).distinct()
+        rebuilt = 0
+        last_user_id = 0
+
+        while True:
+            chunk = list(user_ids.filter(user_id__gt=last_user_id)[:chunk_size])
+            if not chunk:
+                break
+            last_user_id = chunk[-1]
+
+            rows = (
+                Answer.objects.filter(user_id__in=chunk, score_status="scored")
+                .values("user_id", "question_type")
+                .annotate(
+                    answer_count=Count("id"),
+                    score_sum=Sum("total_score"),
+                    max_score_sum=Sum("max_score"),
+                    best_score=Max("total_score"),
+                )
+                .order_by()
+            )
+            now = timezone.now()
+            with transaction.atomic():
+                UserProgress.objects.filter(user_id__in=chunk).delete()
+                UserProgress.objects.bulk_create([UserProgress(updated_at=now, **row) for row in rows])
+
+            rebuilt += len(chunk)
+            self.stdout.write(f"Rebuilt progress for {rebuilt} users")
+
+        # Users whose answers were all deleted keep no statistics
+        UserProgress.objects.exclude(user__answers__isnull=False).delete()
+        self.stdout.write(self.style.SUCCESS(f"Done. Rebuilt progress for {rebuilt} users."))
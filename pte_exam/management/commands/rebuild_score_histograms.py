@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, When
+from django.core.management.base import BaseCommand
+
+from pte_exam.models import Answer, ScoreHistogramBucket
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-question and per-type score histograms from scored answers."
+
+    def handle(self, *args, **options):
+        # Same rounding as ScoreHistogramBucket.get_bucket(): integer division
+        answers = Answer.objects.filter(score_status="scored").annotate(
+            bucket=Case(When(max_score__gt=0, then=100 * F("total_score") / F("max_score")), default=0)
+        )
+        question_rows = answers.values("question_type", "question_id", "bucket").annotate(count=Count("id")).order_by()
+        type_rows = answers.values("question_type", "bucket").annotate(count=Count("id")).order_by()
+
+        with transaction.atomic():
+            ScoreHistogramBucket.objects.all().delete()
+            created = ScoreHistogramBucket.objects.bulk_create(
+                [ScoreHistogramBucket(**row) for row in question_rows.iterator()]
+                + [ScoreHistogramBucket(question=None, **row) for row in type_rows.iterator()],
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(f"Done. Rebuilt {len(created)} score histogram buckets."))
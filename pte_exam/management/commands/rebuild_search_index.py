@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from pte_exam.search import is_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text question search index from the question bank."
+
+    def handle(self, *args, **options):
+        if not is_available():
+            self.stdout.write("The search index is only kept on SQLite; nothing to rebuild.")
+            return
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Done. Indexed {indexed} questions."))
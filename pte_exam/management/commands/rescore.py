@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pte_exam.rescoring import RESCORE_CHUNK_SIZE, TYPED_ANSWER_MODELS, RescoreError, get_default_workers, rescore
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute stored RO, RMMCQ and SST scores in chunks on a pool of worker processes, "
+        "e.g. after an answer key is corrected."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type", dest="question_types", action="append", choices=list(TYPED_ANSWER_MODELS),
+            help="Question type to rescore; repeat for several (default: all).",
+        )
+        parser.add_argument(
+            "--question", dest="question_ids", type=int, action="append",
+            help="Only rescore answers to this question id; repeat for several.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE, help="Answers per transaction.")
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Number of worker processes; 1 rescores in this process (default: CPU count with a database "
+                 "that supports parallel writers, such as the SQLite production profile, otherwise 1).",
+        )
+        parser.add_argument(
+            "--checkpoint", default="rescore.checkpoint.json",
+            help="Progress file; an interrupted run resumes from it. Removed when the run completes.",
+        )
+
+    def handle(self, *args, **options):
+        question_types = options["question_types"] or list(TYPED_ANSWER_MODELS)
+        if options["workers"] is None:
+            options["workers"] = get_default_workers()
+        if options["chunk_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--chunk-size and --workers must be positive")
+
+        def report(question_type, rescored, changed, elapsed):
+            rate = rescored / elapsed if elapsed else 0
+            self.stdout.write(f"{question_type}: {rescored} answers rescored, {changed} changed ({rate:.0f} answers/s)")
+
+        try:
+            results = rescore(
+                question_types, chunk_size=options["chunk_size"], workers=options["workers"],
+                checkpoint=options["checkpoint"], question_ids=options["question_ids"], report=report,
+            )
+        except RescoreError as e:
+            raise CommandError(str(e))
+
+        for question_type, (rescored, changed, elapsed) in results.items():
+            rate = rescored / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{question_type}: rescored {rescored} answers in {elapsed:.1f}s ({rate:.0f} answers/s), "
+                f"{changed} scores changed."
+            ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from pte_exam.tasks import ScoringWorker, get_queue_depth
+
+
+class Command(BaseCommand):
+    help = "Score queued SST answers on a bounded pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, help="Number of worker threads (default: SCORING_QUEUE['WORKERS']).")
+        parser.add_argument("--poll-interval", type=float, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit once no job is due instead of polling.")
+
+    def handle(self, *args, **options):
+        worker = ScoringWorker(workers=options["workers"], poll_interval=options["poll_interval"])
+        self.stdout.write(f"Scoring worker started with {worker.workers} threads. Queue depth: {get_queue_depth()}")
+        try:
+            processed = worker.run(once=options["once"])
+        except KeyboardInterrupt:
+            worker.stop()
+            return
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} scoring jobs. Queue depth: {get_queue_depth()}"))
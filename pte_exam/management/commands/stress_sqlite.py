@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from pte_exam.benchmark import run_write_stress, seed_dataset, sqlite_stress_database
+
+PROFILES = ("default", "production")
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent answer submissions, SST scoring and history reads against a "
+        "throwaway SQLite file, with the default and the production SQLite profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", choices=[*PROFILES, "both"], default="both", help="SQLite profile to stress.")
+        parser.add_argument("--writers", type=int, default=8, help="Threads submitting answers.")
+        parser.add_argument("--readers", type=int, default=4, help="Threads reading practice history.")
+        parser.add_argument("--submissions", type=int, default=50, help="Answers submitted per writer thread.")
+        parser.add_argument("--scoring-workers", type=int, default=2, help="Threads of the SST scoring worker.")
+        parser.add_argument(
+            "--drain-timeout", type=int, default=60,
+            help="Seconds the scoring worker keeps draining the queue after the writers finish.",
+        )
+        parser.add_argument("--questions", type=int, default=60, help="Number of questions to seed.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        profiles = PROFILES if options["profile"] == "both" else (options["profile"],)
+        results = {}
+        for profile in profiles:
+            with sqlite_stress_database(production=profile == "production"):
+                dataset = seed_dataset(
+                    questions=options["questions"], users=options["writers"], answers_per_user=20, seed=options["seed"]
+                )
+                self.stdout.write(f"Stressing the {profile} profile ...")
+                results[profile] = run_write_stress(
+                    dataset, writers=options["writers"], readers=options["readers"],
+                    submissions=options["submissions"], scoring_workers=options["scoring_workers"],
+                    drain_timeout=options["drain_timeout"],
+                    seed=options["seed"],
+                )
+
+        self.stdout.write(
+            f"{'profile':>10} {'path':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for profile, result in results.items():
+            for path in ("submit", "read"):
+                summary = result[path]
+                if summary is None:
+                    self.stdout.write(f"{profile:>10} {path:>6} {'-':>9}")
+                    continue
+                self.stdout.write(
+                    f"{profile:>10} {path:>6} {summary['throughput_rps']:9.1f} {summary['p50_ms']:9.2f} "
+                    f"{summary['p95_ms']:9.2f} {summary['p99_ms']:9.2f}"
+                )
+            self.stdout.write(
+                f"{profile:>10} scoring jobs done {result['jobs_done']}, pending {result['jobs_pending']}, "
+                f"failed attempts {result['scoring_failures']}; errors {result['errors'] or 'none'}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
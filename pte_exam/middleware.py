@@ -0,0 +1,183 @@
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger('pte_exam.timing')
+
+# Seconds spent in top-level serializer `.data` calls during the current
+# request, or None outside an instrumented request
+serializer_time = contextvars.ContextVar('serializer_time', default=None)
+serializer_depth = contextvars.ContextVar('serializer_depth', default=0)
+
+SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+SQL_IN_LIST = re.compile(r"\bIN \((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording each statement, its params and duration.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, time.perf_counter() - start))
+
+    @property
+    def duration(self):
+        return sum(duration for _, _, duration in self.queries)
+
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape: literals and IN lists become placeholders.
+    """
+    sql = SQL_STRING.sub("?", sql)
+    sql = SQL_NUMBER.sub("?", sql)
+    return SQL_IN_LIST.sub("IN (...)", sql)
+
+
+def find_duplicate_queries(queries):
+    """
+    Return (duplicates, near_duplicates): statements run more than once with
+    the same params, and statement shapes run more than once with different
+    params, the signature of an N+1 loop. Each is a list of (sql, count).
+    """
+    exact = Counter((sql, repr(params)) for sql, params, _ in queries)
+    duplicates = [(sql, count) for (sql, _), count in exact.items() if count > 1]
+
+    shapes = Counter(normalize_sql(sql) for sql, _ in exact)
+    near_duplicates = [(shape, count) for shape, count in shapes.items() if count > 1]
+    return duplicates, near_duplicates
+
+
+def install_serializer_timing():
+    """
+    Time top-level `.data` calls of DRF serializers made while a request is
+    instrumented. Nested serializers are counted as part of their parent,
+    and calls outside an instrumented request only pay a context lookup.
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        original = cls.__dict__['data']
+        if getattr(original.fget, 'timed', False):
+            continue
+
+        def timed_data(self, original=original):
+            total = serializer_time.get()
+            if total is None:
+                return original.fget(self)
+            depth = serializer_depth.get()
+            serializer_depth.set(depth + 1)
+            start = time.perf_counter()
+            try:
+                return original.fget(self)
+            finally:
+                serializer_depth.set(depth)
+                if depth == 0:
+                    total[0] += time.perf_counter() - start
+
+        timed_data.timed = True
+        cls.data = property(timed_data)
+
+
+class RequestTimingMiddleware:
+    """
+    Opt-in per-request instrumentation, enabled with REQUEST_TIMING_ENABLED.
+
+    Records the SQL query count and time, serializer time, view time, render
+    time and total time of each request. Emits them as a Server-Timing header
+    and a JSON log line on the `pte_exam.timing` logger, and warns about
+    repeated queries. Serializer time is spent in `.data` calls, view time
+    from process_view() until the view returns its response, render time
+    turning a DRF response's data into its body, and total time in everything
+    after this middleware, which comes first: the other middleware, the view
+    and rendering.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        install_serializer_timing()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        token = serializer_time.set([0.0])
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+            end = time.perf_counter()
+            total_time = end - start
+            serializer_seconds = serializer_time.get()[0]
+        finally:
+            serializer_time.reset(token)
+        render_time = getattr(request, 'render_time', 0.0)
+        # No view ran if URL resolution failed or a middleware answered early
+        view_start = getattr(request, 'view_start', None)
+        view_time = getattr(request, 'view_end', end) - view_start if view_start is not None else 0.0
+
+        duplicates, near_duplicates = find_duplicate_queries(recorder.queries)
+        timing = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": len(recorder.queries),
+            "db_ms": round(recorder.duration * 1000, 3),
+            "serializer_ms": round(serializer_seconds * 1000, 3),
+            "view_ms": round(view_time * 1000, 3),
+            "render_ms": round(render_time * 1000, 3),
+            "total_ms": round(total_time * 1000, 3),
+            "duplicate_queries": sum(count - 1 for _, count in duplicates),
+            "similar_queries": sum(count - 1 for _, count in near_duplicates),
+        }
+
+        server_timing = [
+            f'db;dur={timing["db_ms"]};desc="{timing["queries"]} queries"',
+            f'serializer;dur={timing["serializer_ms"]}',
+            f'view;dur={timing["view_ms"]}',
+            f'render;dur={timing["render_ms"]}',
+            f'total;dur={timing["total_ms"]}',
+        ]
+        if duplicates or near_duplicates:
+            server_timing.append(
+                f'dup;desc="{timing["duplicate_queries"]} duplicate, {timing["similar_queries"]} similar queries"'
+            )
+        response['Server-Timing'] = ", ".join(server_timing)
+
+        logger.info(json.dumps(timing))
+        if duplicates or near_duplicates:
+            logger.warning(json.dumps({
+                "path": request.path,
+                "duplicates": [{"sql": sql, "count": count} for sql, count in duplicates],
+                "similar": [{"sql": sql, "count": count} for sql, count in near_duplicates],
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Render now to time it; Django skips rendering an already rendered response
+        start = time.perf_counter()
+        request.view_end = start
+        response.render()
+        request.render_time = time.perf_counter() - start
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0006_alter_rmmcqanswer_answer_alter_roanswer_answer_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['user', 'created_at'], name='answer_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Func, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def typed_score(model):
+    return Subquery(model.objects.filter(answer_id=OuterRef('id')).values('total_score')[:1])
+
+
+def count_rows(queryset):
+    return Coalesce(Subquery(queryset.annotate(count=Func('id', function='COUNT')).values('count')), 0)
+
+
+def backfill_score_summary(apps, schema_editor):
+    Answer = apps.get_model('pte_exam', 'Answer')
+    Question = apps.get_model('pte_exam', 'Question')
+    SSTAnswer = apps.get_model('pte_exam', 'SSTAnswer')
+    ROAnswer = apps.get_model('pte_exam', 'ROAnswer')
+    RMMCQAnswer = apps.get_model('pte_exam', 'RMMCQAnswer')
+    ReorderParagraph = apps.get_model('pte_exam', 'ReorderParagraph')
+    RMMCQOption = apps.get_model('pte_exam', 'RMMCQOption')
+
+    Answer.objects.update(
+        question_type=Subquery(Question.objects.filter(id=OuterRef('question_id')).values('question_type')[:1])
+    )
+
+    # One UPDATE per question type instead of one per answer
+    Answer.objects.filter(question_type='SST', sst_answer_details__isnull=False).update(
+        total_score=typed_score(SSTAnswer), max_score=10, score_status='scored'
+    )
+    Answer.objects.filter(question_type='RO', ro_answer_details__isnull=False).update(
+        total_score=typed_score(ROAnswer),
+        # Submitted orders list every paragraph of the question
+        max_score=count_rows(ReorderParagraph.objects.filter(reorder_question__question_id=OuterRef('question_id'))) - 1,
+        score_status='scored',
+    )
+    Answer.objects.filter(question_type='RMMCQ', rmmcq_answer_details__isnull=False).update(
+        total_score=typed_score(RMMCQAnswer),
+        max_score=count_rows(RMMCQOption.objects.filter(rmmcq_question__question_id=OuterRef('question_id'), is_correct=True)),
+        score_status='scored',
+    )
+
+    # An SST answer still at 0 may be one the old scoring thread never
+    # finished; it stays pending until `manage.py rescore --type SST`.
+    Answer.objects.filter(question_type='SST', score_status='scored', total_score=0).update(score_status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0007_answer_user_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='max_score',
+            field=models.IntegerField(default=0, help_text='Maximum score of the typed answer.'),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='question_type',
+            field=models.CharField(blank=True, choices=[('SST', 'Summarize Spoken Text'), ('RO', 'Re-Order Paragraph'), ('RMMCQ', 'Reading Multiple Choice (Multiple)')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='score_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('scored', 'Scored')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='total_score',
+            field=models.IntegerField(default=0, help_text='Total score of the typed answer.'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['user', 'question_type', 'created_at'], name='answer_user_type_created_idx'),
+        ),
+        migrations.RunPython(backfill_score_summary, migrations.RunPython.noop),
+    ]
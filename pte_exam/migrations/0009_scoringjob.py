@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0008_answer_score_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of times the job has been claimed.')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='The job is not claimed before this time.')),
+                ('locked_by', models.CharField(blank=True, help_text='Token of the worker that claimed the job.', max_length=64)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sst_answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_job', to='pte_exam.sstanswer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='scoringjob_status_run_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_progress(apps, schema_editor):
+    # Same statistics as `manage.py rebuild_progress`; answers scored from now
+    # on are added as their scores are recorded.
+    Answer = apps.get_model('pte_exam', 'Answer')
+    UserProgress = apps.get_model('pte_exam', 'UserProgress')
+    rows = (
+        Answer.objects.filter(score_status='scored')
+        .values('user_id', 'question_type')
+        .annotate(
+            answer_count=Count('id'),
+            score_sum=Sum('total_score'),
+            max_score_sum=Sum('max_score'),
+            best_score=Max('total_score'),
+        )
+        .order_by()
+    )
+    now = django.utils.timezone.now()
+    UserProgress.objects.bulk_create(
+        (UserProgress(updated_at=now, **row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0009_scoringjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(choices=[('SST', 'Summarize Spoken Text'), ('RO', 'Re-Order Paragraph'), ('RMMCQ', 'Reading Multiple Choice (Multiple)')], max_length=10)),
+                ('answer_count', models.PositiveIntegerField(default=0, help_text='Number of scored answers.')),
+                ('score_sum', models.IntegerField(default=0, help_text="Sum of the answers' total scores.")),
+                ('max_score_sum', models.IntegerField(default=0, help_text="Sum of the answers' maximum scores.")),
+                ('best_score', models.IntegerField(default=0, help_text='Best total score of a single answer.')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'question_type'), name='unique_user_progress')],
+            },
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+from pte_exam.audio import inspect_audio
+
+
+def backfill_audio_metadata(apps, schema_editor):
+    SSTAudioFile = apps.get_model('pte_exam', 'SSTAudioFile')
+    for audio_file in SSTAudioFile.objects.exclude(file='').iterator():
+        try:
+            with audio_file.file.open('rb') as f:
+                metadata = inspect_audio(f)
+        except FileNotFoundError:
+            continue
+        SSTAudioFile.objects.filter(id=audio_file.id).update(**metadata)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0010_userprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sstaudiofile',
+            name='duration',
+            field=models.FloatField(blank=True, editable=False, help_text='Duration in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='sstaudiofile',
+            name='sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='sstaudiofile',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Size in bytes', null=True),
+        ),
+        migrations.RunPython(backfill_audio_metadata, migrations.RunPython.noop),
+    ]
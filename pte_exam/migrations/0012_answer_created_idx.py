@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0011_sstaudiofile_metadata'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['created_at'], name='answer_created_idx'),
+        ),
+    ]
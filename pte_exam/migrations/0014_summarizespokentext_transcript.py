@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0013_mocktest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summarizespokentext',
+            name='transcript',
+            field=models.TextField(blank=True, help_text='Reference transcript of the audio, used for scoring.'),
+        ),
+    ]
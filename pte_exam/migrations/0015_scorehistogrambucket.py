@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, F, When
+
+
+def backfill_histograms(apps, schema_editor):
+    # Same buckets as `manage.py rebuild_score_histograms`; answers scored from
+    # now on are counted as their scores are recorded.
+    Answer = apps.get_model('pte_exam', 'Answer')
+    ScoreHistogramBucket = apps.get_model('pte_exam', 'ScoreHistogramBucket')
+    answers = Answer.objects.filter(score_status='scored').annotate(
+        bucket=Case(When(max_score__gt=0, then=100 * F('total_score') / F('max_score')), default=0)
+    )
+    question_rows = answers.values('question_type', 'question_id', 'bucket').annotate(count=Count('id')).order_by()
+    type_rows = answers.values('question_type', 'bucket').annotate(count=Count('id')).order_by()
+    ScoreHistogramBucket.objects.bulk_create(
+        [ScoreHistogramBucket(**row) for row in question_rows.iterator()]
+        + [ScoreHistogramBucket(question=None, **row) for row in type_rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0014_summarizespokentext_transcript'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistogramBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(choices=[('SST', 'Summarize Spoken Text'), ('RO', 'Re-Order Paragraph'), ('RMMCQ', 'Reading Multiple Choice (Multiple)')], max_length=10)),
+                ('bucket', models.PositiveSmallIntegerField(help_text='Score as a percentage of the maximum score, rounded down.')),
+                ('count', models.IntegerField(default=0)),
+                ('question', models.ForeignKey(blank=True, help_text='Empty for the question type histogram.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='pte_exam.question')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('question__isnull', False)), fields=('question', 'bucket'), name='unique_question_score_bucket'), models.UniqueConstraint(condition=models.Q(('question__isnull', True)), fields=('question_type', 'bucket'), name='unique_type_score_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:30
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other databases fall back to icontains lookups
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE pte_exam_question_search USING fts5("
+        "question_type UNINDEXED, title, content, tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        """
+        INSERT INTO pte_exam_question_search (rowid, question_type, title, content)
+        SELECT q.id, q.question_type, q.title,
+            coalesce(sst.transcript, '') || char(10)
+            || coalesce((SELECT group_concat(p.content, char(10)) FROM pte_exam_reorderparagraph p
+                         WHERE p.reorder_question_id = ro.id), '') || char(10)
+            || coalesce(rmmcq.passage, '') || char(10)
+            || coalesce((SELECT group_concat(o.content, char(10)) FROM pte_exam_rmmcqoption o
+                         WHERE o.rmmcq_question_id = rmmcq.id), '')
+        FROM pte_exam_question q
+        LEFT JOIN pte_exam_summarizespokentext sst ON sst.question_id = q.id
+        LEFT JOIN pte_exam_reorderparagraphquestion ro ON ro.question_id = q.id
+        LEFT JOIN pte_exam_readingmultiplechoicequestion rmmcq ON rmmcq.question_id = q.id
+        """
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE pte_exam_question_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pte_exam', '0015_scorehistogrambucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
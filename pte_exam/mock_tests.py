@@ -0,0 +1,193 @@
+"""
+Timed mock tests.
+
+A mock test freezes a random set of questions, picked by a type mix, into
+one section per question type. Sections run one after another: a section
+starts when the previous one ends, and ends when all of its questions are
+answered or its time limit runs out. SST sections get the sum of their
+questions' `answer_time_limit`; the other types, which have no time limit of
+their own, get MOCK_TEST['QUESTION_TIME_LIMITS'] seconds per question.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import *
+from .next_question import get_question_ids
+
+MOCK_TEST_DEFAULTS = {
+    'DEFAULT_MIX': {'SST': 1, 'RO': 2, 'RMMCQ': 2},  # Questions per type
+    'MAX_QUESTIONS': 40,  # Largest mock test that can be requested
+    'QUESTION_TIME_LIMITS': {'RO': 150, 'RMMCQ': 120},  # Seconds per question
+    'GRACE_SECONDS': 5,  # Answers this late are still accepted
+}
+
+
+def get_mock_test_setting(name):
+    return getattr(settings, 'MOCK_TEST', {}).get(name, MOCK_TEST_DEFAULTS[name])
+
+
+class MockTestError(Exception):
+    pass
+
+
+def mock_test_queryset():
+    """
+    Mock tests with their sections, items and the full content of every
+    question, loaded with a fixed number of queries.
+    """
+    items = MockTestItem.objects.select_related(
+        'question__sst_details', 'question__reorder_paragraph_details', 'question__rmmcq_details'
+    )
+    return MockTest.objects.prefetch_related(
+        'sections',
+        Prefetch('sections__items', queryset=items),
+        'sections__items__question__sst_details__audio_files',
+        Prefetch(
+            'sections__items__question__reorder_paragraph_details__paragraphs',
+            queryset=ReorderParagraph.objects.order_by('id'),
+        ),
+        'sections__items__question__rmmcq_details__options',
+    )
+
+
+def clean_mix(mix):
+    """
+    Validate a {question_type: count} mix, keeping the types in the order given.
+    """
+    if mix is None:
+        mix = get_mock_test_setting('DEFAULT_MIX')
+    if not isinstance(mix, dict) or not mix:
+        raise MockTestError("mix must be an object of question counts by type.")
+    for question_type, count in mix.items():
+        if question_type not in Question.DETAILS_RELATED_NAMES:
+            raise MockTestError(f"Unknown question type {question_type}.")
+        if type(count) is not int or count < 1:
+            raise MockTestError(f"The number of {question_type} questions must be a positive integer.")
+    max_questions = get_mock_test_setting('MAX_QUESTIONS')
+    if sum(mix.values()) > max_questions:
+        raise MockTestError(f"A mock test has at most {max_questions} questions.")
+    return mix
+
+
+def pick_questions(question_type, count, rng=random):
+    """
+    Return (question_id, answer_time_limit) pairs of `count` random questions
+    of a type that have their details. Ids are sampled from the cached id
+    list of next_question, so only the picked rows are read.
+    """
+    ids = get_question_ids(question_type)
+    if len(ids) < count:
+        raise MockTestError(f"Only {len(ids)} {question_type} questions are available.")
+    picked_ids = rng.sample(ids, count)
+    time_limits = dict(
+        Question.objects.filter(id__in=picked_ids).values_list('id', 'sst_details__answer_time_limit')
+    )
+    return [(question_id, time_limits.get(question_id)) for question_id in picked_ids]
+
+
+def create_mock_test(user, mix=None):
+    """
+    Freeze a new mock test for `user` and start its first section.
+    """
+    mix = clean_mix(mix)
+    picked = {question_type: pick_questions(question_type, count) for question_type, count in mix.items()}
+    question_time_limits = get_mock_test_setting('QUESTION_TIME_LIMITS')
+    now = timezone.now()
+
+    with transaction.atomic():
+        mock_test = MockTest.objects.create(user=user, created_at=now)
+        sections = MockTestSection.objects.bulk_create([
+            MockTestSection(
+                mock_test=mock_test,
+                position=position,
+                question_type=question_type,
+                time_limit=(
+                    sum(time_limit or 0 for _, time_limit in questions) if question_type == 'SST'
+                    else question_time_limits[question_type] * len(questions)
+                ),
+                started_at=now if position == 1 else None,
+            )
+            for position, (question_type, questions) in enumerate(picked.items(), 1)
+        ])
+        MockTestItem.objects.bulk_create([
+            MockTestItem(section=section, question_id=question_id, position=position)
+            for section, questions in zip(sections, picked.values())
+            for position, (question_id, _) in enumerate(questions, 1)
+        ])
+    return mock_test
+
+
+def is_expired(section, now):
+    return now > section.deadline + timedelta(seconds=get_mock_test_setting('GRACE_SECONDS'))
+
+
+def advance(mock_test, now=None):
+    """
+    Close sections that are fully answered or out of time and start the next
+    one. Returns the open section, or None once the test is complete.
+    `mock_test` must come from mock_test_queryset().
+    """
+    now = now or timezone.now()
+    previous_end = None
+    for section in mock_test.sections.all():
+        if section.ended_at is not None:
+            previous_end = section.ended_at
+            continue
+        if section.started_at is None:
+            # Every question is sent up front, so the clock runs from the end
+            # of the previous section, not from the next request
+            section.started_at = previous_end or now
+            section.save(update_fields=['started_at'])
+        if is_expired(section, now) or all(item.answer_id for item in section.items.all()):
+            section.ended_at = min(now, section.deadline)
+            section.save(update_fields=['ended_at'])
+            previous_end = section.ended_at
+            continue
+        return section
+
+    if mock_test.completed_at is None:
+        mock_test.completed_at = now
+        mock_test.save(update_fields=['completed_at'])
+    return None
+
+
+def get_open_item(mock_test, question_id, now=None):
+    """
+    Return the unanswered item of `question_id` in the open section, or raise
+    MockTestError explaining why it cannot be answered now.
+    """
+    now = now or timezone.now()
+    section = advance(mock_test, now)
+    if section is None:
+        raise MockTestError("This mock test is complete.")
+    for item in section.items.all():
+        if item.question_id == question_id:
+            if item.answer_id:
+                raise MockTestError("This question has already been answered.")
+            return item
+
+    for other in mock_test.sections.all():
+        if any(item.question_id == question_id for item in other.items.all()):
+            if other.position < section.position:
+                raise MockTestError("The time limit of this question's section has passed.")
+            raise MockTestError("This question's section has not started yet.")
+    raise MockTestError("This question is not part of the mock test.")
+
+
+def record_answer(mock_test, item, answer, now=None):
+    """
+    Attach a submitted answer to its item and move on once the section is done.
+    Raises MockTestError if a concurrent request answered the item first; call
+    it in the transaction that saved `answer`, so the answer is rolled back.
+    """
+    # Only an unanswered item is claimed, so two submissions never both win
+    claimed = MockTestItem.objects.filter(pk=item.pk, answer__isnull=True).update(answer=answer)
+    if not claimed:
+        raise MockTestError("This question has already been answered.")
+    item.answer = answer
+    advance(mock_test, now)
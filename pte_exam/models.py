@@ -1,8 +1,13 @@
-from django.db import models
+from datetime import timedelta
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
-from random import randint
 from django.utils import timezone
 
+from .scoring import get_sst_scorer
+
 
 class Question(models.Model):
     QUESTION_TYPES = (
@@ -10,9 +15,23 @@ class Question(models.Model):
         ('RO', 'Re-Order Paragraph'),
         ('RMMCQ', 'Reading Multiple Choice (Multiple)'),
     )
+    DETAILS_RELATED_NAMES = {
+        'SST': 'sst_details',
+        'RO': 'reorder_paragraph_details',
+        'RMMCQ': 'rmmcq_details',
+    }
     title = models.CharField(max_length=255)
     question_type = models.CharField(max_length=10, choices=QUESTION_TYPES)
 
+    def get_details(self):
+        """
+        Return the typed details of this question, or None if they are missing.
+        """
+        try:
+            return getattr(self, self.DETAILS_RELATED_NAMES[self.question_type])
+        except (KeyError, ObjectDoesNotExist):
+            return None
+
     def __str__(self):
         return f"{self.get_question_type_display()}: {self.title}"
 
@@ -20,6 +39,7 @@ class Question(models.Model):
 class SummarizeSpokenText(models.Model):
     question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='sst_details')
     answer_time_limit = models.PositiveIntegerField(help_text="Time limit in seconds")
+    transcript = models.TextField(blank=True, help_text="Reference transcript of the audio, used for scoring.")
 
     def __str__(self):
         return self.question.title
@@ -29,6 +49,39 @@ class SSTAudioFile(models.Model):
     sst_question = models.ForeignKey(SummarizeSpokenText, on_delete=models.CASCADE, related_name='audio_files')
     file = models.FileField(upload_to='audio_files/')
     speaker_name = models.CharField(max_length=255)
+    # Computed from the file on upload, see set_metadata()
+    size = models.PositiveBigIntegerField(null=True, blank=True, editable=False, help_text="Size in bytes")
+    duration = models.FloatField(null=True, blank=True, editable=False, help_text="Duration in seconds")
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
+
+    def set_metadata(self):
+        """
+        Compute the size, SHA-256 and duration of the file.
+        """
+        from .audio import inspect_audio  # Import inside to avoid circular imports
+
+        committed = self.file._committed
+        self.file.open('rb')
+        try:
+            metadata = inspect_audio(self.file)
+        finally:
+            # A pending upload must stay open for the storage to save it
+            if committed:
+                self.file.close()
+        self.size = metadata['size']
+        self.sha256 = metadata['sha256']
+        self.duration = metadata['duration']
+
+    def save(self, *args, **kwargs):
+        if self.file and (not self.file._committed or not self.sha256):
+            try:
+                self.set_metadata()
+            except FileNotFoundError:
+                pass
+            else:
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'size', 'sha256', 'duration'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.speaker_name
@@ -68,14 +121,382 @@ class RMMCQOption(models.Model):
 
 
 class Answer(models.Model):    
+    SCORE_STATUSES = (
+        ('pending', 'Pending'),
+        ('scored', 'Scored'),
+    )
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="answers")
     question = models.ForeignKey("Question", on_delete=models.CASCADE, related_name="answers")
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Score summary, kept in sync by the typed answers' calculate_score()
+    question_type = models.CharField(max_length=10, choices=Question.QUESTION_TYPES, blank=True)
+    total_score = models.IntegerField(default=0, help_text="Total score of the typed answer.")
+    max_score = models.IntegerField(default=0, help_text="Maximum score of the typed answer.")
+    score_status = models.CharField(max_length=10, choices=SCORE_STATUSES, default='pending')
+
+    class Meta:
+        indexes = [
+            # Practice history: filter by user, walk created_at in order
+            models.Index(fields=["user", "created_at"], name="answer_user_created_idx"),
+            models.Index(fields=["user", "question_type", "created_at"], name="answer_user_type_created_idx"),
+            # Admin date hierarchy and date filters across all users
+            models.Index(fields=["created_at"], name="answer_created_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.question_type:
+            self.question_type = self.question.question_type
+        super().save(*args, **kwargs)
+
+    def record_score_fields(self, total_score, max_score):
+        self.total_score = total_score
+        self.max_score = max_score
+        self.score_status = 'scored'
+
+    def record_score(self, total_score, max_score):
+        """
+        Store the score summary of the typed answer on this row and fold it
+        into the user's progress statistics and the score histograms.
+        """
+        previous = (self.total_score, self.max_score) if self.score_status == 'scored' else None
+        self.record_score_fields(total_score, max_score)
+        self.save(update_fields=['total_score', 'max_score', 'score_status'])
+
+        if previous is None:
+            UserProgress.add_scores(self.user_id, self.question_type, 1, total_score, max_score, total_score)
+        else:
+            # Rescored: apply the difference without counting the answer twice
+            UserProgress.add_scores(
+                self.user_id, self.question_type, 0, total_score - previous[0], max_score - previous[1], total_score
+            )
+            if total_score < previous[0]:
+                UserProgress.refresh_best_scores({(self.user_id, self.question_type)})
+
+        counts = {}
+        if previous is not None:
+            ScoreHistogramBucket.count_score(counts, self, *previous, -1)
+        ScoreHistogramBucket.count_score(counts, self, total_score, max_score, 1)
+        ScoreHistogramBucket.add_counts(counts)
+
+    @classmethod
+    def refresh_score_fields(cls, answers):
+        """
+        Re-read the score summary of loaded answers, locking their rows where
+        the database supports it. Call it in the transaction that records new
+        scores, so an answer scored by another process since it was loaded is
+        not counted again.
+        """
+        rows = cls.objects.select_for_update().filter(id__in=[answer.id for answer in answers]).values_list(
+            'id', 'total_score', 'max_score', 'score_status'
+        )
+        current = {answer_id: fields for answer_id, *fields in rows}
+        for answer in answers:
+            if answer.id in current:
+                answer.total_score, answer.max_score, answer.score_status = current[answer.id]
+
+    @classmethod
+    def record_scores(cls, scores):
+        """
+        Batch version of record_score() for (answer, total_score, max_score)
+        tuples. Only answers whose summary changes are written, with one
+        UPDATE per distinct score and one progress update per user and
+        question type. Returns the number of answers changed.
+        """
+        changed = {}
+        groups = {}
+        lowered = set()
+        histogram_counts = {}
+        for answer, total_score, max_score in scores:
+            previous = (answer.total_score, answer.max_score) if answer.score_status == 'scored' else None
+            if previous == (total_score, max_score):
+                continue
+            if previous is not None:
+                ScoreHistogramBucket.count_score(histogram_counts, answer, *previous, -1)
+                if total_score < previous[0]:
+                    lowered.add((answer.user_id, answer.question_type))
+            ScoreHistogramBucket.count_score(histogram_counts, answer, total_score, max_score, 1)
+            answer.record_score_fields(total_score, max_score)
+            changed.setdefault((total_score, max_score), []).append(answer.id)
+            # Rescored answers only add their difference, as in record_score()
+            count, score_sum, max_score_sum, best_score = groups.get((answer.user_id, answer.question_type), (0, 0, 0, 0))
+            groups[(answer.user_id, answer.question_type)] = (
+                count + (previous is None),
+                score_sum + total_score - (previous[0] if previous else 0),
+                max_score_sum + max_score - (previous[1] if previous else 0),
+                max(best_score, total_score),
+            )
+        # Scores take few distinct values, so this beats bulk_update's CASE per row
+        for (total_score, max_score), ids in changed.items():
+            cls.objects.filter(id__in=ids).update(total_score=total_score, max_score=max_score, score_status='scored')
+        for (user_id, question_type), totals in groups.items():
+            UserProgress.add_scores(user_id, question_type, *totals)
+        if lowered:
+            UserProgress.refresh_best_scores(lowered)
+        ScoreHistogramBucket.add_counts(histogram_counts)
+        return sum(len(ids) for ids in changed.values())
+
+    def get_score_summary(self):
+        return {
+            "score": self.total_score,
+            "max_score": self.max_score,
+            "status": self.score_status,
+        }
+
     def __str__(self):
         return f"Answer by {self.user} for Question {self.question.title}"
 
 
+class UserProgress(models.Model):
+    """
+    Per-user, per-question-type score statistics, updated incrementally as
+    answers are scored. Rebuild with the `rebuild_progress` command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="progress")
+    question_type = models.CharField(max_length=10, choices=Question.QUESTION_TYPES)
+    answer_count = models.PositiveIntegerField(default=0, help_text="Number of scored answers.")
+    score_sum = models.IntegerField(default=0, help_text="Sum of the answers' total scores.")
+    max_score_sum = models.IntegerField(default=0, help_text="Sum of the answers' maximum scores.")
+    best_score = models.IntegerField(default=0, help_text="Best total score of a single answer.")
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "question_type"], name="unique_user_progress"),
+        ]
+
+    @classmethod
+    def add_scores(cls, user_id, question_type, answer_count, score_sum, max_score_sum, best_score):
+        """
+        Atomically add scored answers to a user's statistics for a question type.
+        """
+        now = timezone.now()
+        updated = cls.objects.filter(user_id=user_id, question_type=question_type).update(
+            answer_count=models.F('answer_count') + answer_count,
+            score_sum=models.F('score_sum') + score_sum,
+            max_score_sum=models.F('max_score_sum') + max_score_sum,
+            best_score=Greatest('best_score', best_score),
+            updated_at=now,
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_id=user_id, question_type=question_type, answer_count=answer_count,
+                    score_sum=score_sum, max_score_sum=max_score_sum, best_score=best_score, updated_at=now,
+                )
+        except IntegrityError:
+            # Another request created the row first; add to it instead
+            cls.add_scores(user_id, question_type, answer_count, score_sum, max_score_sum, best_score)
+
+    @classmethod
+    def refresh_best_scores(cls, keys):
+        """
+        Recompute best_score from the scored answers for a set of (user_id,
+        question_type) keys. add_scores() only ever raises it, so call this
+        once a rescore lowers an answer's score.
+        """
+        rows = Answer.objects.filter(
+            score_status='scored',
+            user_id__in={user_id for user_id, _ in keys},
+            question_type__in={question_type for _, question_type in keys},
+        ).values('user_id', 'question_type').annotate(best_score=models.Max('total_score')).order_by()
+        best_scores = {(row['user_id'], row['question_type']): row['best_score'] for row in rows}
+        # One UPDATE per question type and best score
+        by_best_score = {}
+        for user_id, question_type in keys:
+            best_score = best_scores.get((user_id, question_type), 0)
+            by_best_score.setdefault((question_type, best_score), []).append(user_id)
+        for (question_type, best_score), user_ids in by_best_score.items():
+            cls.objects.filter(user_id__in=user_ids, question_type=question_type).update(best_score=best_score)
+
+    @classmethod
+    def add_answers(cls, answers):
+        """
+        Add newly scored answers, saved without record_score(), to the statistics.
+        """
+        groups = {}
+        for answer in answers:
+            if answer.score_status != 'scored':
+                continue
+            count, score_sum, max_score_sum, best_score = groups.get((answer.user_id, answer.question_type), (0, 0, 0, 0))
+            groups[(answer.user_id, answer.question_type)] = (
+                count + 1, score_sum + answer.total_score, max_score_sum + answer.max_score,
+                max(best_score, answer.total_score),
+            )
+        for (user_id, question_type), totals in groups.items():
+            cls.add_scores(user_id, question_type, *totals)
+
+    @property
+    def average_score(self):
+        return self.score_sum / self.answer_count if self.answer_count else None
+
+    @property
+    def average_percentage(self):
+        return 100 * self.score_sum / self.max_score_sum if self.max_score_sum else None
+
+    def __str__(self):
+        return f"{self.user} progress on {self.get_question_type_display()}"
+
+
+class ScoreHistogramBucket(models.Model):
+    """
+    Number of scored answers per score bucket, for one question or, with no
+    question, for a whole question type. A bucket is the score as a whole
+    percentage of the maximum score, so there are at most 101 per histogram.
+    Updated incrementally as answers are scored; rebuild with the
+    `rebuild_score_histograms` command.
+    """
+    BUCKETS = 101
+    # Keys matched per statement, keeping IN lists well under SQLite's variable limit
+    KEY_BATCH_SIZE = 500
+
+    question_type = models.CharField(max_length=10, choices=Question.QUESTION_TYPES)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name="score_buckets", help_text="Empty for the question type histogram.")
+    bucket = models.PositiveSmallIntegerField(help_text="Score as a percentage of the maximum score, rounded down.")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["question", "bucket"], condition=models.Q(question__isnull=False),
+                                    name="unique_question_score_bucket"),
+            models.UniqueConstraint(fields=["question_type", "bucket"], condition=models.Q(question__isnull=True),
+                                    name="unique_type_score_bucket"),
+        ]
+
+    @staticmethod
+    def get_bucket(total_score, max_score):
+        return 100 * total_score // max_score if max_score > 0 else 0
+
+    @classmethod
+    def add_counts(cls, counts):
+        """
+        Add {(question_type, question_id or None, bucket): delta} to the
+        histograms, with one UPDATE per distinct delta and batch of keys when
+        the rows exist.
+        """
+        by_delta = {}
+        for key, delta in counts.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(key)
+        for delta, keys in by_delta.items():
+            for start in range(0, len(keys), cls.KEY_BATCH_SIZE):
+                cls.add_to_keys(keys[start:start + cls.KEY_BATCH_SIZE], delta)
+
+    @classmethod
+    def add_to_keys(cls, keys, delta):
+        updated = cls.objects.filter(cls.keys_filter(keys)).update(count=models.F('count') + delta)
+        if updated == len(keys):
+            return
+        # Create the missing rows empty, ignoring ones another request just
+        # created, then add to the rows that were not updated
+        existing = set(cls.objects.filter(cls.keys_filter(keys)).values_list('question_type', 'question_id', 'bucket'))
+        missing = [key for key in keys if key not in existing]
+        cls.objects.bulk_create(
+            [cls(question_type=t, question_id=q, bucket=b) for t, q, b in missing], ignore_conflicts=True
+        )
+        cls.objects.filter(cls.keys_filter(missing)).update(count=models.F('count') + delta)
+
+    @staticmethod
+    def keys_filter(keys):
+        """
+        Match the keys with at most two clauses per bucket, grouping their
+        questions and types into IN lists, so the expression stays shallow.
+        """
+        question_ids, question_types = {}, {}
+        for question_type, question_id, bucket in keys:
+            if question_id is None:
+                question_types.setdefault(bucket, set()).add(question_type)
+            else:
+                question_ids.setdefault(bucket, set()).add(question_id)
+        condition = models.Q(pk__in=[])
+        for bucket, ids in question_ids.items():
+            condition |= models.Q(bucket=bucket, question_id__in=ids)
+        for bucket, types in question_types.items():
+            condition |= models.Q(bucket=bucket, question__isnull=True, question_type__in=types)
+        return condition
+
+    @classmethod
+    def count_score(cls, counts, answer, total_score, max_score, delta):
+        bucket = cls.get_bucket(total_score, max_score)
+        for question_id in (answer.question_id, None):
+            key = (answer.question_type, question_id, bucket)
+            counts[key] = counts.get(key, 0) + delta
+
+    @classmethod
+    def add_answers(cls, answers):
+        """
+        Add newly scored answers, saved without record_score(), to the histograms.
+        """
+        counts = {}
+        for answer in answers:
+            if answer.score_status == 'scored':
+                cls.count_score(counts, answer, answer.total_score, answer.max_score, 1)
+        cls.add_counts(counts)
+
+    @classmethod
+    def get_percentiles(cls, answers):
+        """
+        Return {answer_id: {'question': rank, 'question_type': rank}} for the
+        scored answers, where a rank is the percentage of scored answers to
+        the same question or type that scored lower, counting ties as half.
+        Loads every histogram needed in one query.
+        """
+        scored = [answer for answer in answers if answer.score_status == 'scored']
+        if not scored:
+            return {}
+        return cls.rank_answers(scored, cls.histogram_rows(scored))
+
+    @classmethod
+    async def aget_percentiles(cls, answers):
+        scored = [answer for answer in answers if answer.score_status == 'scored']
+        if not scored:
+            return {}
+        return cls.rank_answers(scored, [row async for row in cls.histogram_rows(scored)])
+
+    @classmethod
+    def histogram_rows(cls, answers):
+        return cls.objects.filter(
+            models.Q(question_id__in={answer.question_id for answer in answers})
+            | models.Q(question__isnull=True, question_type__in={answer.question_type for answer in answers})
+        ).values_list('question_type', 'question_id', 'bucket', 'count')
+
+    @classmethod
+    def rank_answers(cls, answers, rows):
+        histograms = {}
+        for question_type, question_id, bucket, count in rows:
+            histogram = histograms.setdefault((question_type, question_id), [0] * cls.BUCKETS)
+            histogram[bucket] = count
+
+        percentiles = {}
+        for answer in answers:
+            bucket = cls.get_bucket(answer.total_score, answer.max_score)
+            percentiles[answer.id] = {
+                scope: cls.percentile_rank(histograms.get((answer.question_type, question_id)), bucket)
+                for scope, question_id in (('question', answer.question_id), ('question_type', None))
+            }
+        return percentiles
+
+    @staticmethod
+    def percentile_rank(histogram, bucket):
+        """
+        Percentile rank of a bucket in a histogram, in one pass over the buckets.
+        """
+        if not histogram:
+            return None
+        below = sum(histogram[:bucket])
+        total = below + sum(histogram[bucket:])
+        if total <= 0:
+            return None
+        return round(100 * (below + histogram[bucket] / 2) / total, 1)
+
+    def __str__(self):
+        scope = f"question {self.question_id}" if self.question_id else self.get_question_type_display()
+        return f"{self.bucket}% bucket of {scope}"
+
+
 class SSTAnswer(models.Model):
     """
     Model for storing answers to Summarize Spoken Text (SST) questions.
@@ -90,21 +511,35 @@ class SSTAnswer(models.Model):
     spelling_score = models.IntegerField(default=0, help_text="Score for spelling (max 2).")
     total_score = models.IntegerField(default=0, help_text="Total score out of 10.")
 
+    def set_scores(self, score):
+        self.content_score = score.content
+        self.form_score = score.form
+        self.grammar_score = score.grammar
+        self.vocabulary_score = score.vocabulary
+        self.spelling_score = score.spelling
+        self.total_score = score.total
+
+    @staticmethod
+    def score_many(sst_answers):
+        """
+        Score SST answers against their questions' transcripts in one batch,
+        setting their component scores without saving them.
+        """
+        scores = get_sst_scorer().score_many([(a.text, a.question.transcript) for a in sst_answers])
+        for sst_answer, score in zip(sst_answers, scores):
+            sst_answer.set_scores(score)
+        return sst_answers
+
     def calculate_score(self):
         """
-        Fake scoring logic for SST. Generate random scores for components.
-        """
-        self.content_score = randint(0, 2)
-        self.form_score = randint(0, 2)
-        self.grammar_score = randint(0, 2)
-        self.vocabulary_score = randint(0, 2)
-        self.spelling_score = randint(0, 2)
-        self.total_score = (
-            self.content_score + self.form_score +
-            self.grammar_score + self.vocabulary_score +
-            self.spelling_score
-        )
-        self.save()
+        Score the summary with the configured SST scoring engine.
+        """
+        self.score_many([self])
+        with transaction.atomic():
+            # A rescore may have scored the answer since it was loaded
+            Answer.refresh_score_fields([self.answer])
+            self.save()
+            self.answer.record_score(self.total_score, 10)
 
     def get_score_components(self):
         return {
@@ -120,6 +555,18 @@ class SSTAnswer(models.Model):
         return f"Answer by {self.answer.user} for SST {self.question.question.title}"
 
 
+def get_answer_key(question_id):
+    """
+    Return the answer key of a question, or raise Question.DoesNotExist if
+    the question is gone (e.g. deleted while its answer was being scored).
+    """
+    from .answer_keys import answer_keys  # Import inside to avoid circular imports
+    answer_key = answer_keys.get(question_id)
+    if answer_key is None:
+        raise Question.DoesNotExist(f"Question {question_id} no longer exists; its answers cannot be scored.")
+    return answer_key
+
+
 class ROAnswer(models.Model):
     """
     Model for storing answers to Re-Order Paragraph (RO) questions.
@@ -133,19 +580,22 @@ class ROAnswer(models.Model):
         """
         Scoring logic for RO. Score based on the number of correct adjacent pairs.
         """
-        next_correct_order = list(
-            self.question.paragraphs.order_by("id").values_list("correct_next_order", flat=True)
-        )
-        submitted_order = self.paragraph_order
-        correct_pairs = 0
+        next_correct_order = get_answer_key(self.question.question_id).next_correct_order
+        self.total_score = self.score_order(next_correct_order, self.paragraph_order)
+        self.save()
+        self.answer.record_score(self.total_score, len(self.paragraph_order) - 1)
 
-        # Count the number of correct adjacent pairs
+    @staticmethod
+    def score_order(next_correct_order, submitted_order):
+        """
+        Count the correct adjacent pairs of a submitted order. `next_correct_order`
+        holds each paragraph's correct_next_order, in paragraph id order.
+        """
+        correct_pairs = 0
         for i in range(len(submitted_order) - 1):
             if (next_correct_order[submitted_order[i] - 1] == submitted_order[i + 1]):
                 correct_pairs += 1
-
-        self.total_score = correct_pairs
-        self.save()
+        return correct_pairs
 
     def get_score_components(self):
         return {
@@ -165,28 +615,131 @@ class RMMCQAnswer(models.Model):
     selected_options = models.ManyToManyField("RMMCQOption", related_name="answers", help_text="Selected options by the user.")
     total_score = models.IntegerField(default=0, help_text="Total score for the question.")
 
-    def calculate_score(self):
+    def calculate_score(self, selected_options=None):
         """
         Scoring logic for RMMCQ. Add 1 for each correct option and subtract 1 for incorrect ones.
+        Pass the ids of `selected_options` when known to skip reading them back.
+        """
+        correct_options = get_answer_key(self.question.question_id).correct_option_ids
+        if selected_options is None:
+            selected_options = self.selected_options.values_list("id", flat=True)
+
+        self.total_score = self.score_selection(correct_options, selected_options)
+        self.save()
+        self.answer.record_score(self.total_score, len(correct_options))
+
+    @staticmethod
+    def score_selection(correct_options, selected_options):
+        """
+        Add 1 for each selected correct option and subtract 1 for each incorrect one.
         """
-        correct_options = self.question.options.filter(is_correct=True).values_list("id", flat=True)
-        selected_options = self.selected_options.values_list("id", flat=True)
-        
         score = 0
         for option in selected_options:
             if option in correct_options:
                 score += 1
             else:
                 score -= 1
-
-        self.total_score = max(0, score)  # Ensure minimum score is 0
-        self.save()
+        return max(0, score)  # Ensure minimum score is 0
 
     def get_score_components(self):
-        correct_count = self.question.options.filter(is_correct=True).count()
+        # Use the correct options prefetched by the history view when available
+        correct_options = getattr(self.question, "correct_options", None)
+        if correct_options is not None:
+            correct_count = len(correct_options)
+        else:
+            from .answer_keys import answer_keys  # Import inside to avoid circular imports
+            correct_count = len(answer_keys.get(self.question.question_id).correct_option_ids)
         return {
             "Choice": {"score": self.total_score, "max_score": correct_count},
         }
 
     def __str__(self):
         return f"Answer by {self.answer.user} for RMMCQ {self.question.question.title}"
+
+
+class ScoringJob(models.Model):
+    """
+    Durable queue entry for scoring an SST answer in the background.
+    Jobs are claimed and run by the `run_scoring_worker` management command.
+    """
+    STATUSES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    sst_answer = models.OneToOneField("SSTAnswer", on_delete=models.CASCADE, related_name="scoring_job")
+    status = models.CharField(max_length=10, choices=STATUSES, default='queued')
+    attempts = models.PositiveIntegerField(default=0, help_text="Number of times the job has been claimed.")
+    run_after = models.DateTimeField(default=timezone.now, help_text="The job is not claimed before this time.")
+    locked_by = models.CharField(max_length=64, blank=True, help_text="Token of the worker that claimed the job.")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="scoringjob_status_run_idx"),
+        ]
+
+    def __str__(self):
+        return f"Scoring job for SST answer {self.sst_answer_id} ({self.status})"
+
+
+class MockTest(models.Model):
+    """
+    A timed exam built from a frozen set of questions, answered section by
+    section. See mock_tests.py.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="mock_tests")
+    created_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Mock test {self.id} of {self.user}"
+
+
+class MockTestSection(models.Model):
+    """
+    The questions of one type in a mock test. A section starts when the
+    previous one ends and must be answered within `time_limit` seconds.
+    """
+    mock_test = models.ForeignKey(MockTest, on_delete=models.CASCADE, related_name="sections")
+    position = models.PositiveIntegerField()
+    question_type = models.CharField(max_length=10, choices=Question.QUESTION_TYPES)
+    time_limit = models.PositiveIntegerField(help_text="Time limit in seconds")
+    started_at = models.DateTimeField(null=True, blank=True)
+    ended_at = models.DateTimeField(null=True, blank=True, help_text="Set when the section was closed.")
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(fields=["mock_test", "position"], name="unique_mock_test_section"),
+        ]
+
+    @property
+    def deadline(self):
+        if self.started_at is None:
+            return None
+        return self.started_at + timedelta(seconds=self.time_limit)
+
+    def __str__(self):
+        return f"{self.get_question_type_display()} section of mock test {self.mock_test_id}"
+
+
+class MockTestItem(models.Model):
+    section = models.ForeignKey(MockTestSection, on_delete=models.CASCADE, related_name="items")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="mock_test_items")
+    position = models.PositiveIntegerField()
+    answer = models.OneToOneField(
+        Answer, on_delete=models.SET_NULL, null=True, blank=True, related_name="mock_test_item"
+    )
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(fields=["section", "question"], name="unique_mock_test_item"),
+        ]
+
+    def __str__(self):
+        return f"Question {self.question_id} of mock test section {self.section_id}"
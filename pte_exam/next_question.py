@@ -0,0 +1,143 @@
+"""
+Random selection of a question a user has not answered yet.
+
+Both sides of the lookup live in the cache: the ids of every answerable
+question of a type, and the ids a user has already answered. A pick samples
+random ids until one is unseen, so it does not scan the Question or Answer
+tables. Only when most questions are seen does it fall back to filtering
+the id list in memory.
+
+Each process also keeps the id list of every type it last loaded, keyed by
+the list's version, so a pick only reads the version from the cache. The
+seen sets are kept up to date at submit time under a short per-user lock,
+so the read-modify-write of one submission never drops another's.
+"""
+import random
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+from .cache import (
+    QUESTION_IDS_CACHE_TIMEOUT,
+    SEEN_QUESTIONS_CACHE_TIMEOUT,
+    SEEN_QUESTIONS_LOCK_TIMEOUT,
+    bump_seen_questions_version,
+    question_ids_cache_key,
+    seen_questions_cache_key,
+    seen_questions_lock_key,
+)
+from .models import Answer, Question
+
+# Random probes before falling back to a scan of the cached id list
+MAX_PROBES = 16
+# Seconds to wait for a user's seen set lock
+SEEN_LOCK_WAIT = 0.5
+
+# {question_type: (versioned cache key, ids)} of this process
+local_question_ids = {}
+
+
+def get_question_ids(question_type):
+    """
+    Return the ids of the questions of a type that have their details.
+    """
+    key = question_ids_cache_key(question_type)
+    local = local_question_ids.get(question_type)
+    if local is not None and local[0] == key:
+        return local[1]
+    ids = cache.get(key)
+    if ids is None:
+        related_name = Question.DETAILS_RELATED_NAMES[question_type]
+        ids = list(
+            Question.objects.filter(question_type=question_type, **{f'{related_name}__isnull': False})
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        cache.set(key, ids, QUESTION_IDS_CACHE_TIMEOUT)
+    local_question_ids[question_type] = (key, ids)
+    return ids
+
+
+@contextmanager
+def seen_questions_lock(user_id, question_type):
+    """
+    Hold a user's seen set lock for a question type. Yields False if it
+    could not be taken within SEEN_LOCK_WAIT seconds.
+    """
+    key = seen_questions_lock_key(user_id, question_type)
+    deadline = time.monotonic() + SEEN_LOCK_WAIT
+    while not cache.add(key, 1, SEEN_QUESTIONS_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            yield False
+            return
+        time.sleep(0.005)
+    try:
+        yield True
+    finally:
+        cache.delete(key)
+
+
+def get_seen_question_ids(user_id, question_type):
+    """
+    Return the set of ids of the questions of a type a user has answered.
+    """
+    key = seen_questions_cache_key(user_id, question_type)
+    seen = cache.get(key)
+    if seen is not None:
+        return seen
+    # Rebuilt under the lock, so a submission committed meanwhile is either
+    # in the query or added by mark_seen() once the set is cached
+    with seen_questions_lock(user_id, question_type) as locked:
+        if locked:
+            seen = cache.get(key)
+        if seen is None:
+            seen = set(
+                Answer.objects.filter(user_id=user_id, question_type=question_type)
+                .values_list('question_id', flat=True)
+                .distinct()
+            )
+            if locked:
+                cache.set(key, seen, SEEN_QUESTIONS_CACHE_TIMEOUT)
+    return seen
+
+
+def mark_seen(answers):
+    """
+    Add newly submitted answers to their users' cached seen sets, once the
+    answers are committed. Sets that are not cached are left alone; they are
+    rebuilt from Answer when needed. A set whose lock cannot be taken is
+    invalidated rather than risking a lost update.
+    """
+    by_user = {}
+    for answer in answers:
+        by_user.setdefault((answer.user_id, answer.question_type), set()).add(answer.question_id)
+
+    for (user_id, question_type), question_ids in by_user.items():
+        with seen_questions_lock(user_id, question_type) as locked:
+            if not locked:
+                bump_seen_questions_version(user_id, question_type)
+                continue
+            key = seen_questions_cache_key(user_id, question_type)
+            seen = cache.get(key)
+            if seen is not None and not question_ids <= seen:
+                cache.set(key, seen | question_ids, SEEN_QUESTIONS_CACHE_TIMEOUT)
+
+
+def pick_unseen_question(user_id, question_type, rng=random):
+    """
+    Return the id of a random question of a type the user has not answered,
+    or None when every question has been answered.
+    """
+    ids = get_question_ids(question_type)
+    seen = get_seen_question_ids(user_id, question_type)
+    if not ids or (len(seen) >= len(ids) and seen.issuperset(ids)):
+        return None
+
+    for _ in range(MAX_PROBES):
+        question_id = rng.choice(ids)
+        if question_id not in seen:
+            return question_id
+
+    unseen = [question_id for question_id in ids if question_id not in seen]
+    return rng.choice(unseen) if unseen else None
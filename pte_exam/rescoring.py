@@ -0,0 +1,228 @@
+"""
+Bulk rescoring of stored answers, used by `python manage.py rescore` after an
+answer key or the SST scoring engine changes.
+
+Typed answers are split into chunks of consecutive ids. Each chunk is scored
+in one pass, spread across a pool of worker processes. Only changed scores
+are written, in one transaction per chunk with one UPDATE per distinct
+score. Rescoring is deterministic and only applies score differences to the
+users' progress, so a chunk can safely be scored twice: an interrupted run
+resumes from its checkpoint file, which records the highest id below which
+every chunk is done.
+"""
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.db import connection, connections, transaction
+
+from .answer_keys import answer_keys
+from .models import *
+
+RESCORE_CHUNK_SIZE = 1000
+
+TYPED_ANSWER_MODELS = {'RO': ROAnswer, 'RMMCQ': RMMCQAnswer, 'SST': SSTAnswer}
+SCORE_FIELDS = {
+    'RO': ['total_score'],
+    'RMMCQ': ['total_score'],
+    'SST': ['content_score', 'form_score', 'grammar_score', 'vocabulary_score', 'spelling_score', 'total_score'],
+}
+
+
+class RescoreError(Exception):
+    pass
+
+
+def score_ro(ro_answers):
+    keys = answer_keys.get_many([ro_answer.question.question_id for ro_answer in ro_answers])
+    scores = []
+    for ro_answer in ro_answers:
+        next_correct_order = keys[ro_answer.question.question_id].next_correct_order
+        ro_answer.total_score = ROAnswer.score_order(next_correct_order, ro_answer.paragraph_order)
+        scores.append((ro_answer.answer, ro_answer.total_score, len(ro_answer.paragraph_order) - 1))
+    return scores
+
+
+def score_rmmcq(rmmcq_answers):
+    keys = answer_keys.get_many([rmmcq_answer.question.question_id for rmmcq_answer in rmmcq_answers])
+    selected = {}
+    for rmmcq_answer_id, option_id in RMMCQAnswer.selected_options.through.objects.filter(
+        rmmcqanswer_id__in=[rmmcq_answer.id for rmmcq_answer in rmmcq_answers]
+    ).values_list('rmmcqanswer_id', 'rmmcqoption_id'):
+        selected.setdefault(rmmcq_answer_id, []).append(option_id)
+
+    scores = []
+    for rmmcq_answer in rmmcq_answers:
+        correct_options = keys[rmmcq_answer.question.question_id].correct_option_ids
+        rmmcq_answer.total_score = RMMCQAnswer.score_selection(correct_options, selected.get(rmmcq_answer.id, ()))
+        scores.append((rmmcq_answer.answer, rmmcq_answer.total_score, len(correct_options)))
+    return scores
+
+
+def score_sst(sst_answers):
+    SSTAnswer.score_many(sst_answers)
+    return [(sst_answer.answer, sst_answer.total_score, 10) for sst_answer in sst_answers]
+
+
+SCORERS = {'RO': score_ro, 'RMMCQ': score_rmmcq, 'SST': score_sst}
+
+
+def get_score_values(typed_answer, fields):
+    return tuple(getattr(typed_answer, field) for field in fields)
+
+
+def rescore_chunk(question_type, ids):
+    """
+    Rescore the typed answers with the given ids in one transaction.
+    Returns (rescored, changed) answer counts.
+    """
+    model, fields = TYPED_ANSWER_MODELS[question_type], SCORE_FIELDS[question_type]
+    typed_answers = list(model.objects.filter(id__in=ids).select_related('answer', 'question'))
+    previous = [get_score_values(typed_answer, fields) for typed_answer in typed_answers]
+    scores = SCORERS[question_type](typed_answers)
+
+    updates = {}
+    for typed_answer, old_values in zip(typed_answers, previous):
+        values = get_score_values(typed_answer, fields)
+        if values != old_values:
+            updates.setdefault(values, []).append(typed_answer.id)
+    # Only writes in the transaction, so workers hold the write lock briefly.
+    # The summaries are re-read under it: a pending SST answer may have been
+    # scored by the scoring worker since the chunk was loaded.
+    with transaction.atomic():
+        Answer.refresh_score_fields([score[0] for score in scores])
+        for values, changed_ids in updates.items():
+            model.objects.filter(id__in=changed_ids).update(**dict(zip(fields, values)))
+        changed = Answer.record_scores(scores)
+    return len(typed_answers), changed
+
+
+def iter_chunks(question_type, chunk_size, after=0, question_ids=None):
+    """
+    Yield lists of consecutive typed answer ids greater than `after`.
+    """
+    answers = TYPED_ANSWER_MODELS[question_type].objects.order_by('id')
+    if question_ids:
+        answers = answers.filter(question__question_id__in=question_ids)
+    while True:
+        ids = list(answers.filter(id__gt=after).values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+
+
+class Checkpoint:
+    """
+    JSON file of the highest typed answer id of each type below which every
+    chunk has been rescored, tied to the selection it was written for.
+    """
+
+    def __init__(self, path, question_types, question_ids):
+        self.path = path
+        self.selection = {'types': list(question_types), 'questions': sorted(question_ids or [])}
+        self.done = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('selection') != self.selection:
+                raise RescoreError(f"Checkpoint {path} was written for another selection; delete it to start over.")
+            self.done = data['done']
+
+    def get(self, question_type):
+        return self.done.get(question_type, 0)
+
+    def save(self, question_type, last_id):
+        self.done[question_type] = last_id
+        if not self.path:
+            return
+        with open(f'{self.path}.tmp', 'w') as f:
+            json.dump({'selection': self.selection, 'done': self.done}, f)
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def delete(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def supports_parallel_rescoring():
+    # Deferred SQLite transactions of concurrent writers deadlock instead of waiting
+    return connection.vendor != 'sqlite' or (
+        connection.settings_dict['OPTIONS'].get('transaction_mode') == 'IMMEDIATE'
+    )
+
+
+def get_default_workers():
+    """
+    One worker per CPU where parallel rescoring is supported, otherwise one.
+    """
+    return (os.cpu_count() or 1) if supports_parallel_rescoring() else 1
+
+
+def rescore(question_types, chunk_size=RESCORE_CHUNK_SIZE, workers=1, checkpoint=None, question_ids=None,
+            report=None):
+    """
+    Rescore every answer of the given types, resuming from the `checkpoint`
+    file if it exists. `report(question_type, rescored, changed, elapsed)`
+    is called after each chunk with the running totals of that type.
+    Returns {question_type: (rescored, changed, seconds)}.
+    """
+    if workers > 1 and not supports_parallel_rescoring():
+        raise RescoreError(
+            "Parallel rescoring on SQLite needs the production profile (ONEPTE_SQLITE_PRODUCTION=1); "
+            "otherwise use --workers 1."
+        )
+    checkpoint = Checkpoint(checkpoint, question_types, question_ids)
+    results = {}
+    if workers > 1:
+        # Workers are spawned rather than forked so they never share the
+        # parent's connections. They set Django up before loading this module.
+        connections.close_all()
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup)
+    else:
+        pool = None
+
+    try:
+        for question_type in question_types:
+            start = time.perf_counter()
+            rescored = changed = 0
+            chunks = iter_chunks(question_type, chunk_size, checkpoint.get(question_type), question_ids)
+            # Submitted chunks in id order, as [last_id, done]
+            submitted = deque()
+            pending = {}
+
+            def finish(chunk, counts):
+                nonlocal rescored, changed
+                chunk[1] = True
+                rescored += counts[0]
+                changed += counts[1]
+                while submitted and submitted[0][1]:
+                    checkpoint.save(question_type, submitted.popleft()[0])
+                if report:
+                    report(question_type, rescored, changed, time.perf_counter() - start)
+
+            for ids in chunks:
+                chunk = [ids[-1], False]
+                submitted.append(chunk)
+                if pool is None:
+                    finish(chunk, rescore_chunk(question_type, ids))
+                    continue
+                pending[pool.submit(rescore_chunk, question_type, ids)] = chunk
+                # Keep every worker busy without queueing the whole table
+                while len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(pending.pop(future), future.result())
+            for future in list(pending):
+                finish(pending.pop(future), future.result())
+            results[question_type] = (rescored, changed, time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    checkpoint.delete()
+    return results
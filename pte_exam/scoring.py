@@ -0,0 +1,230 @@
+"""
+Deterministic scoring of Summarize Spoken Text answers.
+
+The engine is pluggable: SST_SCORING['ENGINE'] names an SSTScorer subclass,
+and get_sst_scorer() returns one shared instance per process. The default
+engine scores each component from 0 to 2:
+
+- Form: the word count must fall within FORM_BOUNDS.
+- Grammar: the summary starts with a capital letter, ends with a full stop
+  and repeats no word twice in a row.
+- Spelling: words missing from the dictionary (SST_SCORING['DICTIONARY'],
+  one word per line) and from the reference transcript. Without a
+  dictionary, only near misses of transcript words are counted.
+- Vocabulary: share of the summary's content words used in the transcript.
+- Content: share of the transcript's key words covered by the summary.
+
+As in the exam, a summary with no form or no content scores 0 overall.
+Content and vocabulary need the question's transcript. Without one they
+score 0, but content cannot be judged, so the summary is not zeroed: it is
+scored on form, grammar and spelling alone, out of 6 in practice. Such
+scores are not comparable with those of questions that have a transcript;
+add it and run `manage.py rescore --type SST --question <id>`.
+
+score_many() scores a batch in one pass. Each distinct transcript is analysed
+once, and each distinct word is looked up in the dictionary once.
+"""
+import logging
+import re
+import threading
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('pte_exam.scoring')
+
+SST_SCORING_DEFAULTS = {
+    'ENGINE': 'pte_exam.scoring.SSTScorer',
+    'DICTIONARY': None,  # Path of a word list, e.g. '/usr/share/dict/words'
+}
+
+WORD = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same she should so some such
+than that the their theirs them themselves then there these they this those through to too under until
+up very was we were what when where which while who whom why will with would you your yours yourself
+yourselves
+""".split())
+
+
+class SSTScore(namedtuple('SSTScore', ['content', 'form', 'grammar', 'vocabulary', 'spelling'])):
+    @property
+    def total(self):
+        return sum(self)
+
+
+Reference = namedtuple('Reference', ['vocabulary', 'keywords', 'words_by_length'])
+
+
+def get_scoring_setting(name):
+    return getattr(settings, 'SST_SCORING', {}).get(name, SST_SCORING_DEFAULTS[name])
+
+
+def tokenize(text):
+    return [word.lower() for word in WORD.findall(text or '')]
+
+
+def content_words(words):
+    return {word for word in words if word not in STOPWORDS}
+
+
+@lru_cache(maxsize=4)
+def load_dictionary(path):
+    """
+    Read a word list once per process. Returns None if it cannot be read.
+    """
+    try:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            return frozenset(line.strip().lower() for line in f if line.strip())
+    except OSError:
+        logger.info("SST dictionary %s not found; spelling only counts near misses of the transcript", path)
+        return None
+
+
+@lru_cache(maxsize=1024)
+def analyze_reference(transcript, keyword_count):
+    """
+    Vocabulary and `keyword_count` most frequent content words of a transcript,
+    cached across answers.
+    """
+    words = tokenize(transcript)
+    counts = Counter(word for word in words if word not in STOPWORDS)
+    keywords = sorted(counts, key=lambda word: (-counts[word], word))[:keyword_count]
+    words_by_length = {}
+    for word in set(words):
+        words_by_length.setdefault(len(word), set()).add(word)
+    return Reference(frozenset(words), frozenset(keywords), words_by_length)
+
+
+def within_one_edit(a, b):
+    """
+    True if `a` and `b` differ by one insertion, deletion, substitution or
+    swap of adjacent letters.
+    """
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (
+            len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+        )
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class SSTScorer:
+    """
+    Default SST scoring engine. Subclass it and set SST_SCORING['ENGINE'] to
+    plug in another one; score_many() is the only method callers use.
+    """
+    FORM_BOUNDS = ((50, 70), (40, 100))  # Word counts for 2 and 1 points
+    KEYWORD_COUNT = 20  # Key words taken from the transcript
+    CONTENT_THRESHOLDS = (0.5, 0.25)  # Key word coverage for 2 and 1 points
+    VOCABULARY_THRESHOLDS = (0.6, 0.3)  # Transcript word share for 2 and 1 points
+    MIN_SPELLING_WORD_LENGTH = 4  # Shorter words are never counted as near misses
+
+    def __init__(self, dictionary_path=None):
+        self.dictionary = load_dictionary(dictionary_path) if dictionary_path else None
+
+    @staticmethod
+    def level(value, thresholds):
+        return 2 if value >= thresholds[0] else 1 if value >= thresholds[1] else 0
+
+    def score_form(self, text, words):
+        letters = [char for char in text if char.isalpha()]
+        if letters and all(char.isupper() for char in letters):
+            return 0
+        (low2, high2), (low1, high1) = self.FORM_BOUNDS
+        count = len(words)
+        return 2 if low2 <= count <= high2 else 1 if low1 <= count <= high1 else 0
+
+    def score_grammar(self, text, words):
+        text = text.strip()
+        if not words:
+            return 0
+        issues = 0
+        first_letter = next((char for char in text if char.isalpha()), '')
+        if not first_letter.isupper():
+            issues += 1
+        if not text.endswith(('.', '!', '?')):
+            issues += 1
+        if any(a == b for a, b in zip(words, words[1:])):
+            issues += 1
+        return max(0, 2 - issues)
+
+    def is_near_miss(self, word, reference):
+        if len(word) < self.MIN_SPELLING_WORD_LENGTH or word in reference.vocabulary:
+            return False
+        return any(
+            within_one_edit(word, candidate)
+            for length in (len(word) - 1, len(word), len(word) + 1)
+            for candidate in reference.words_by_length.get(length, ())
+        )
+
+    def score_many(self, items):
+        """
+        Score a batch of (text, transcript) pairs. Returns a list of SSTScore.
+        """
+        tokens = [tokenize(text) for text, _ in items]
+        references = {
+            transcript: analyze_reference(transcript or '', self.KEYWORD_COUNT) for transcript in {t for _, t in items}
+        }
+
+        # One dictionary lookup per distinct word of the batch
+        batch_words = set().union(*tokens) if tokens else set()
+        unknown = batch_words - self.dictionary if self.dictionary is not None else None
+
+        scores = []
+        for (text, transcript), words in zip(items, tokens):
+            reference = references[transcript]
+            distinct = set(words)
+            if unknown is not None:
+                misspelled = (distinct & unknown) - reference.vocabulary
+            else:
+                misspelled = {word for word in distinct if self.is_near_miss(word, reference)}
+            spelling = max(0, 2 - len(misspelled))
+
+            answer_content = content_words(words)
+            if reference.keywords:
+                content = self.level(len(reference.keywords & answer_content) / len(reference.keywords),
+                                     self.CONTENT_THRESHOLDS)
+                share = len(answer_content & reference.vocabulary) / len(answer_content) if answer_content else 0
+                vocabulary = self.level(share, self.VOCABULARY_THRESHOLDS)
+            else:
+                content = vocabulary = 0
+
+            form = self.score_form(text, words)
+            if form == 0 or (reference.keywords and content == 0):
+                scores.append(SSTScore(0, 0, 0, 0, 0))
+                continue
+            scores.append(SSTScore(content, form, self.score_grammar(text, words), vocabulary, spelling))
+        return scores
+
+    def score(self, text, transcript):
+        return self.score_many([(text, transcript)])[0]
+
+
+_scorers = {}
+_scorers_lock = threading.Lock()
+
+
+def get_sst_scorer():
+    """
+    Return the configured scoring engine, created once per process.
+    """
+    engine, dictionary = get_scoring_setting('ENGINE'), get_scoring_setting('DICTIONARY')
+    with _scorers_lock:
+        scorer = _scorers.get((engine, dictionary))
+        if scorer is None:
+            scorer = _scorers[(engine, dictionary)] = import_string(engine)(dictionary)
+    return scorer
@@ -0,0 +1,155 @@
+"""
+Full-text search over question content with an SQLite FTS5 index.
+
+The pte_exam_question_search table (created by migration 0016) holds one
+row per question, with the question id as its rowid: the title, and the
+content of the question's details (SST transcript, RO paragraphs, RMMCQ
+passage and options). Signals reindex a question once a transaction that
+saved or deleted any of its content commits, once per question; the importer
+indexes each chunk it inserts, and `python manage.py rebuild_search_index`
+rebuilds the table.
+
+Results are ranked with bm25, titles weighing more than content. On other
+databases search falls back to unranked `icontains` lookups.
+"""
+import re
+
+from django.db import connection, connections, router, transaction
+from django.db.models import Prefetch, Q
+
+from .models import *
+
+SEARCH_TABLE = 'pte_exam_question_search'
+TITLE_WEIGHT = 10.0  # bm25 weight of a title match against a content match
+MAX_QUERY_TERMS = 10
+SNIPPET_TOKENS = 12
+SNIPPET_MARKERS = ('<mark>', '</mark>')
+SEARCH_TERM = re.compile(r'\w+')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def to_match_query(text):
+    """
+    Turn user input into an FTS5 query matching every term, the last one as
+    a prefix. Returns None if the input has no searchable term.
+    """
+    terms = SEARCH_TERM.findall(text or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    # Quoted terms cannot be read as FTS5 operators or column filters
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def document_queryset():
+    return Question.objects.select_related(
+        'sst_details', 'reorder_paragraph_details', 'rmmcq_details'
+    ).prefetch_related(
+        Prefetch('reorder_paragraph_details__paragraphs', queryset=ReorderParagraph.objects.order_by('id')),
+        Prefetch('rmmcq_details__options', queryset=RMMCQOption.objects.order_by('id')),
+    )
+
+
+def get_document(question):
+    """
+    Return the (title, content) indexed for a question from document_queryset().
+    """
+    details = question.get_details()
+    parts = []
+    if isinstance(details, SummarizeSpokenText):
+        parts.append(details.transcript)
+    elif isinstance(details, ReorderParagraphQuestion):
+        parts.extend(paragraph.content for paragraph in details.paragraphs.all())
+    elif isinstance(details, ReadingMultipleChoiceQuestion):
+        parts.append(details.passage)
+        parts.extend(option.content for option in details.options.all())
+    return question.title, '\n'.join(part for part in parts if part)
+
+
+def index_questions(question_ids):
+    """
+    (Re)index the given questions, dropping the ones that no longer exist.
+    """
+    question_ids = list(question_ids)
+    if not is_available() or not question_ids:
+        return
+    rows = [
+        (question.id, question.question_type, *get_document(question))
+        for question in document_queryset().filter(id__in=question_ids)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(question_ids))})', question_ids
+        )
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, question_type, title, content) VALUES (%s, %s, %s, %s)', rows
+        )
+
+
+def rebuild_index(chunk_size=1000):
+    """
+    Reindex every question, a chunk at a time, in one transaction so searches
+    never see a partial index. Returns the number indexed.
+    """
+    if not is_available():
+        return 0
+    indexed = 0
+    last_id = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        while True:
+            ids = list(Question.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                return indexed
+            index_questions(ids)
+            indexed += len(ids)
+            last_id = ids[-1]
+
+
+def search_questions(text, question_types=None, limit=10, offset=0):
+    """
+    Return [(question_id, snippet)] of the questions matching `text`, best
+    match first, optionally restricted to some question types. `snippet` is
+    the matching passage with SNIPPET_MARKERS around the matched terms.
+    """
+    match = to_match_query(text)
+    if match is None:
+        return []
+    if not is_available():
+        return search_questions_fallback(text, question_types, limit, offset)
+
+    sql = (
+        f'SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, %s, %s) FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    params = [*SNIPPET_MARKERS, '…', SNIPPET_TOKENS, match]
+    if question_types:
+        sql += f' AND question_type IN ({", ".join(["%s"] * len(question_types))})'
+        params.extend(question_types)
+    # Column weights: question_type (not indexed), title, content
+    sql += f' ORDER BY bm25({SEARCH_TABLE}, 0, {TITLE_WEIGHT}, 1) LIMIT %s OFFSET %s'
+    params.extend([limit, offset])
+    # A read like any other, so it goes to the replica when there is one
+    with connections[router.db_for_read(Question)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_questions_fallback(text, question_types, limit, offset):
+    condition = Q()
+    for term in SEARCH_TERM.findall(text)[:MAX_QUERY_TERMS]:
+        condition &= (
+            Q(title__icontains=term)
+            | Q(sst_details__transcript__icontains=term)
+            | Q(reorder_paragraph_details__paragraphs__content__icontains=term)
+            | Q(rmmcq_details__passage__icontains=term)
+            | Q(rmmcq_details__options__content__icontains=term)
+        )
+    questions = Question.objects.filter(condition)
+    if question_types:
+        questions = questions.filter(question_type__in=question_types)
+    ids = questions.order_by('id').values_list('id', flat=True).distinct()[offset:offset + limit]
+    return [(question_id, '') for question_id in ids]
@@ -1,8 +1,13 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.urls import reverse
 from django.utils import timezone
 from rest_framework import serializers
 from .models import *
 from .models import SSTAnswer, ROAnswer, RMMCQAnswer
-from .tasks import CalculateScoreThread
+from .answer_keys import answer_keys
+from .next_question import mark_seen
+from .tasks import enqueue_sst_scoring
 
 
 class QuestionSerializer(serializers.ModelSerializer):
@@ -14,9 +19,16 @@ class QuestionSerializer(serializers.ModelSerializer):
 
 
 class SSTAudioFileSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
     class Meta:
         model = SSTAudioFile
-        fields = ['id', 'file', 'speaker_name']
+        fields = ['id', 'file', 'url', 'speaker_name', 'size', 'duration', 'sha256']
+
+    def get_url(self, obj):
+        # Streaming endpoint; the hash makes the URL change with the content
+        url = reverse('audio-file', args=[obj.id])
+        return f"{url}?v={obj.sha256[:16]}" if obj.sha256 else url
 
 
 class ReorderParagraphSerializer(serializers.ModelSerializer):
@@ -43,155 +55,305 @@ class QuestionDetailSerializer(serializers.ModelSerializer):
         model = Question
         fields = ['id', 'title', 'question_type', 'question_type_display', 'answer_time_limit', 'audios', 'paragraphs', 'passage', 'options']
 
+    @staticmethod
+    def get_details(obj, related_name):
+        """
+        Return the typed details of a question, using the select_related cache
+        of QuestionDetailView's queryset when it is populated.
+        """
+        try:
+            return getattr(obj, related_name)
+        except ObjectDoesNotExist:
+            return None
+
     def get_answer_time_limit(self, obj):
         if obj.question_type == 'SST':
-            sst = SummarizeSpokenText.objects.filter(question=obj).first()
+            sst = self.get_details(obj, 'sst_details')
             if sst:
                 return sst.answer_time_limit
         return None
     
     def get_audios(self, obj):
         if obj.question_type == 'SST':
-            sst = SummarizeSpokenText.objects.filter(question=obj).first()
+            sst = self.get_details(obj, 'sst_details')
             if sst:
                 return SSTAudioFileSerializer(sst.audio_files.all(), many=True).data
         return None
 
     def get_paragraphs(self, obj):
         if obj.question_type == 'RO':
-            ro = ReorderParagraph.objects.filter(reorder_question__question=obj)
-            return ReorderParagraphSerializer(ro, many=True).data
+            ro = self.get_details(obj, 'reorder_paragraph_details')
+            if ro:
+                return ReorderParagraphSerializer(ro.paragraphs.all(), many=True).data
         return None
 
     def get_passage(self, obj):
         if obj.question_type == 'RMMCQ':
-            rmmcq = ReadingMultipleChoiceQuestion.objects.filter(question=obj).first()
+            rmmcq = self.get_details(obj, 'rmmcq_details')
             if rmmcq:
                 return rmmcq.passage
         return None
 
     def get_options(self, obj):
         if obj.question_type == 'RMMCQ':
-            rmmcq = ReadingMultipleChoiceQuestion.objects.filter(question=obj).first()
+            rmmcq = self.get_details(obj, 'rmmcq_details')
             if rmmcq:
                 return RMMCQOptionSerializer(rmmcq.options.all(), many=True).data
         return None
 
 
 
+def validate_answer(answer_key, answer):
+    """
+    Validate a submitted answer against the answer key of its question.
+    Runs entirely in memory.
+    """
+    question_type = answer_key.question_type
+
+    if question_type == 'SST':
+        if not isinstance(answer, str):
+            raise serializers.ValidationError("Answer for SST must be a text-based summary.")
+
+        # Check the corresponding SummarizeSpokenText exists
+        if not answer_key.has_details:
+            raise serializers.ValidationError("Summarize Spoken Text Question not found.")
+
+    elif question_type == 'RO':
+        if not isinstance(answer, list) or not all(isinstance(x, int) for x in answer):
+            raise serializers.ValidationError("Answer for RO must be a list of paragraph IDs.")
+
+        # Check the corresponding ReorderParagraphQuestion exists
+        if not answer_key.has_details:
+            raise serializers.ValidationError("Reorder Paragraph Question not found.")
+
+        # Get the total number of paragraphs for this question
+        total_paragraphs = answer_key.paragraph_count
+
+        # Check if the length of the answer list matches the total paragraphs
+        if len(answer) != total_paragraphs:
+            raise serializers.ValidationError(f"The answer must contain exactly {total_paragraphs} paragraph IDs.")
+
+        # Check if all integers are in the range [1, total_paragraphs]
+        if not all(1 <= x <= total_paragraphs for x in answer):
+            raise serializers.ValidationError(
+                f"All paragraph IDs must be between 1 and {total_paragraphs}."
+            )
+
+        # Check for duplicate integers
+        if len(answer) != len(set(answer)):
+            raise serializers.ValidationError("Invalid answer.")
+
+    elif question_type == 'RMMCQ':
+        if not isinstance(answer, list) or not all(isinstance(x, int) for x in answer):
+            raise serializers.ValidationError("Answer for RMMCQ must be a list of selected option IDs.")
+
+        # Check the corresponding ReadingMultipleChoiceQuestion exists
+        if not answer_key.has_details:
+            raise serializers.ValidationError("Reading Multiple Choice Question not found.")
+
+        # Check if all selected option IDs exist in this specific RMMCQ question
+        if not all(option_id in answer_key.valid_option_ids for option_id in answer):
+            raise serializers.ValidationError("Invalid answer.")
+
+        # Check for duplicate integers
+        if len(answer) != len(set(answer)):
+            raise serializers.ValidationError("Invalid answer.")
+
+
+def load_questions(question_ids):
+    """
+    Load questions together with their typed details in one joined query.
+    """
+    return Question.objects.filter(id__in=question_ids).select_related(
+        'sst_details', 'reorder_paragraph_details', 'rmmcq_details'
+    )
+
+
+def build_answer(user, question, answer_key, answer_data):
+    """
+    Build the unsaved Answer and typed answer for a validated submission.
+    RO and RMMCQ answers are scored in memory from the answer key; SST
+    answers stay pending until the scoring worker picks them up.
+    """
+    answer = Answer(user=user, question=question, question_type=question.question_type, created_at=timezone.now())
+    details = question.get_details()
+
+    if question.question_type == 'SST':
+        return answer, SSTAnswer(answer=answer, question=details, text=answer_data)
+
+    elif question.question_type == 'RO':
+        score = ROAnswer.score_order(answer_key.next_correct_order, answer_data)
+        answer.record_score_fields(score, len(answer_data) - 1)
+        return answer, ROAnswer(answer=answer, question=details, paragraph_order=answer_data, total_score=score)
+
+    elif question.question_type == 'RMMCQ':
+        score = RMMCQAnswer.score_selection(answer_key.correct_option_ids, answer_data)
+        answer.record_score_fields(score, len(answer_key.correct_option_ids))
+        return answer, RMMCQAnswer(answer=answer, question=details, total_score=score)
+
+
+def selected_option_rows(rmmcq_answer, option_ids):
+    Through = RMMCQAnswer.selected_options.through
+    return [Through(rmmcqanswer_id=rmmcq_answer.id, rmmcqoption_id=option_id) for option_id in option_ids]
+
+
 class SubmitAnswerSerializer(serializers.Serializer):
     question_id = serializers.IntegerField()
     # question_type = serializers.ChoiceField(choices=["SST", "RO", "RMMCQ"])
     answer = serializers.JSONField() 
 
     def validate(self, data):
-        # Validate based on question type
-        if Question.objects.filter(id=data['question_id']).exists() == False:
+        # Resolve the question and its typed details once for validation and creation
+        question = load_questions([data['question_id']]).first()
+        answer_key = answer_keys.get(data['question_id'])
+        if question is None or answer_key is None:
             raise serializers.ValidationError("Question not found.")
 
-        question = Question.objects.get(id=data['question_id'])
-        question_type = question.question_type
-
-        if question_type == 'SST':
-            if not isinstance(data['answer'], str):
-                raise serializers.ValidationError("Answer for SST must be a text-based summary.")
-            
-        elif question_type == 'RO':
-            if not isinstance(data['answer'], list) or not all(isinstance(x, int) for x in data['answer']):
-                raise serializers.ValidationError("Answer for RO must be a list of paragraph IDs.")
-            
-            # Get the corresponding ReorderParagraphQuestion
-            ro_question = ReorderParagraphQuestion.objects.filter(question=question).first()
-            if not ro_question:
-                raise serializers.ValidationError("Reorder Paragraph Question not found.")
-
-            # Get the total number of paragraphs for this question
-            total_paragraphs = ro_question.paragraphs.count()
-
-            # Check if the length of the answer list matches the total paragraphs
-            if len(data['answer']) != total_paragraphs:
-                raise serializers.ValidationError(f"The answer must contain exactly {total_paragraphs} paragraph IDs.")
-
-            # Check if all integers are in the range [1, total_paragraphs]
-            if not all(1 <= x <= total_paragraphs for x in data['answer']):
-                raise serializers.ValidationError(
-                    f"All paragraph IDs must be between 1 and {total_paragraphs}."
-                )
-
-            # Check for duplicate integers
-            if len(data['answer']) != len(set(data['answer'])):
-                raise serializers.ValidationError("Invalid answer.")
-
-        elif question_type == 'RMMCQ':
-            if not isinstance(data['answer'], list) or not all(isinstance(x, int) for x in data['answer']):
-                raise serializers.ValidationError("Answer for RMMCQ must be a list of selected option IDs.")
-            
-            # Get the corresponding ReadingMultipleChoiceQuestion
-            rmmcq_question = ReadingMultipleChoiceQuestion.objects.filter(question=question).first()
-            if not rmmcq_question:
-                raise serializers.ValidationError("Reading Multiple Choice Question not found.")
-
-            # Get all valid option IDs for this RMMCQ question
-            valid_option_ids = list(rmmcq_question.options.values_list('id', flat=True))
-
-            # Check if all selected option IDs exist in this specific RMMCQ question
-            if not all(option_id in valid_option_ids for option_id in data['answer']):
-                raise serializers.ValidationError("Invalid answer.")
-
-            # Check for duplicate integers
-            if len(data['answer']) != len(set(data['answer'])):
-                raise serializers.ValidationError("Invalid answer.")
-            
+        # Validate based on question type
+        validate_answer(answer_key, data['answer'])
+        data['question'] = question
+        data['answer_key'] = answer_key
         return data
 
     def create(self, validated_data):
-        # question_type = validated_data['question_type']
-        question_id = validated_data['question_id']
         answer_data = validated_data['answer']
+        answer, typed_answer = build_answer(
+            self.context['request'].user, validated_data['question'], validated_data['answer_key'], answer_data
+        )
 
-        question = Question.objects.get(id=question_id)
-        question_type = question.question_type
+        with transaction.atomic():
+            answer.save()
+            UserProgress.add_answers([answer])
+            ScoreHistogramBucket.add_answers([answer])
+            typed_answer.save()
+            transaction.on_commit(lambda: mark_seen([answer]))
 
-        answer = Answer.objects.create(
-                user=self.context['request'].user,
-                question=question,
-                created_at = timezone.now()
-            )
+            if isinstance(typed_answer, SSTAnswer):
+                # Scored in the background by the run_scoring_worker command
+                enqueue_sst_scoring(typed_answer)
+            elif isinstance(typed_answer, RMMCQAnswer):
+                RMMCQAnswer.selected_options.through.objects.bulk_create(selected_option_rows(typed_answer, answer_data))
 
-        if question_type == 'SST':
-            sst_question = SummarizeSpokenText.objects.get(question=question)
-            sst_answer = SSTAnswer.objects.create(
-                answer=answer,
-                question=sst_question,
-                text=answer_data,
-            )
+        return typed_answer
 
-            # # Run calculate_score in a background thread
-            thread = CalculateScoreThread(sst_answer.id)
-            thread.start()
-
-            # sst_answer.calculate_score()
-            return sst_answer
-        
-        elif question_type == 'RO':
-            ro_question = ReorderParagraphQuestion.objects.get(question=question)
-            ro_answer = ROAnswer.objects.create(
-                answer=answer,
-                question=ro_question,
-                paragraph_order=answer_data,
-            )
-            ro_answer.calculate_score()
-            return ro_answer
-        
-        elif question_type == 'RMMCQ':
-            rmmcq_question = ReadingMultipleChoiceQuestion.objects.get(question=question)
-            selected_options = RMMCQOption.objects.filter(id__in=answer_data)
-            rmmcq_answer = RMMCQAnswer.objects.create(
-                answer=answer,
-                question=rmmcq_question,
-            )
-            rmmcq_answer.selected_options.set(selected_options)
-            rmmcq_answer.calculate_score()
-            return rmmcq_answer
 
+class BatchAnswerItemSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    answer = serializers.JSONField()
+
+
+class BatchSubmitAnswerSerializer(serializers.Serializer):
+    """
+    Submit many answers at once. All questions are loaded in one pass, answers
+    are validated and scored from the answer key index, and everything is
+    inserted with bulk_create in one transaction.
+    """
+    MAX_ANSWERS = 100
+
+    answers = BatchAnswerItemSerializer(many=True, allow_empty=False, max_length=MAX_ANSWERS)
+
+    def validate(self, data):
+        question_ids = {item['question_id'] for item in data['answers']}
+        self.questions = {question.id: question for question in load_questions(question_ids)}
+        self.answer_keys = answer_keys.get_many(question_ids)
+
+        errors = []
+        for item in data['answers']:
+            answer_key = self.answer_keys.get(item['question_id'])
+            try:
+                if item['question_id'] not in self.questions or answer_key is None:
+                    raise serializers.ValidationError("Question not found.")
+                validate_answer(answer_key, item['answer'])
+            except serializers.ValidationError as e:
+                errors.append({'non_field_errors': e.detail})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError({'answers': errors})
+        return data
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        items = [(item['question_id'], item['answer']) for item in validated_data['answers']]
+        built = [
+            build_answer(user, self.questions[question_id], self.answer_keys[question_id], answer_data)
+            for question_id, answer_data in items
+        ]
+        answers = [answer for answer, _ in built]
+        typed_answers = [typed_answer for _, typed_answer in built]
+
+        with transaction.atomic():
+            Answer.objects.bulk_create(answers)
+            UserProgress.add_answers(answers)
+            ScoreHistogramBucket.add_answers(answers)
+            transaction.on_commit(lambda: mark_seen(answers))
+            for model in (SSTAnswer, ROAnswer, RMMCQAnswer):
+                model.objects.bulk_create([typed for typed in typed_answers if isinstance(typed, model)])
+
+            RMMCQAnswer.selected_options.through.objects.bulk_create([
+                row
+                for typed, (_, answer_data) in zip(typed_answers, items)
+                if isinstance(typed, RMMCQAnswer)
+                for row in selected_option_rows(typed, answer_data)
+            ])
+            ScoringJob.objects.bulk_create([
+                ScoringJob(sst_answer=typed) for typed in typed_answers if isinstance(typed, SSTAnswer)
+            ])
+
+        return typed_answers
+
+
+class UserProgressSerializer(serializers.ModelSerializer):
+    question_type_display = serializers.CharField(source='get_question_type_display', read_only=True)
+    average_score = serializers.FloatField(read_only=True)
+    average_percentage = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = UserProgress
+        fields = ['question_type', 'question_type_display', 'answer_count', 'average_score',
+                  'average_percentage', 'best_score', 'score_sum', 'max_score_sum', 'updated_at']
+
+
+class MockTestItemSerializer(serializers.ModelSerializer):
+    question = QuestionDetailSerializer(read_only=True)
+    answered = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MockTestItem
+        fields = ['position', 'answered', 'answer', 'question']
+
+    def get_answered(self, obj):
+        return obj.answer_id is not None
+
+
+class MockTestSectionSerializer(serializers.ModelSerializer):
+    question_type_display = serializers.CharField(source='get_question_type_display', read_only=True)
+    deadline = serializers.DateTimeField(read_only=True)
+    status = serializers.SerializerMethodField()
+    items = MockTestItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MockTestSection
+        fields = ['position', 'question_type', 'question_type_display', 'time_limit', 'status',
+                  'started_at', 'deadline', 'ended_at', 'items']
+
+    def get_status(self, obj):
+        if obj.ended_at is not None:
+            return 'closed'
+        return 'open' if obj.started_at is not None else 'pending'
+
+
+class MockTestSerializer(serializers.ModelSerializer):
+    """
+    A mock test with the full detail payload of every question. Expects an
+    instance from mock_tests.mock_test_queryset().
+    """
+    status = serializers.SerializerMethodField()
+    sections = MockTestSectionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MockTest
+        fields = ['id', 'status', 'created_at', 'completed_at', 'sections']
 
+    def get_status(self, obj):
+        return 'completed' if obj.completed_at else 'active'
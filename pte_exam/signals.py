@@ -0,0 +1,125 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .answer_keys import answer_keys
+from .cache import bump_question_type_version, bump_question_version
+from .models import *
+from .search import index_questions
+
+# Question sub-models and how to reach the owning Question from them
+QUESTION_CONTENT_MODELS = {
+    Question: None,
+    SummarizeSpokenText: None,
+    ReorderParagraphQuestion: None,
+    ReadingMultipleChoiceQuestion: None,
+    SSTAudioFile: (SummarizeSpokenText, "sst_question_id"),
+    ReorderParagraph: (ReorderParagraphQuestion, "reorder_question_id"),
+    RMMCQOption: (ReadingMultipleChoiceQuestion, "rmmcq_question_id"),
+}
+
+# Typed details models and the question type they belong to
+QUESTION_DETAILS_TYPES = {
+    SummarizeSpokenText: "SST",
+    ReorderParagraphQuestion: "RO",
+    ReadingMultipleChoiceQuestion: "RMMCQ",
+}
+
+
+def get_question_id(instance):
+    """
+    Return the id of the Question that owns a piece of question content, or
+    None when the owner is already gone (e.g. during a cascading delete).
+    """
+    if isinstance(instance, Question):
+        return instance.pk
+    parent = QUESTION_CONTENT_MODELS[type(instance)]
+    if parent is None:
+        return instance.question_id
+    parent_model, parent_field = parent
+    return (
+        parent_model.objects.filter(pk=getattr(instance, parent_field))
+        .values_list("question_id", flat=True)
+        .first()
+    )
+
+
+# Versions are bumped once the change is committed. Bumped earlier, a
+# concurrent read could cache the old content under the new version.
+
+def invalidate_question(question_id):
+    bump_question_version(question_id)
+    answer_keys.invalidate(question_id)
+
+
+def deleted_with_question(instance, origin=None, **kwargs):
+    """
+    True for content deleted in a cascade from its Question, whose own
+    post_delete signal already covers it.
+    """
+    if isinstance(instance, Question) or origin is None:
+        return False
+    return isinstance(origin, Question) or getattr(origin, 'model', None) is Question
+
+
+def invalidate_question_content(sender, instance, **kwargs):
+    if deleted_with_question(instance, **kwargs):
+        return
+    question_id = get_question_id(instance)
+    if question_id is not None:
+        transaction.on_commit(lambda: invalidate_question(question_id))
+
+
+# Ids of the questions to reindex once the current transaction commits, so a
+# transaction touching many rows of a question indexes it once
+pending_reindex = threading.local()
+
+
+def reindex_pending_questions():
+    question_ids = getattr(pending_reindex, 'ids', None)
+    if question_ids:
+        pending_reindex.ids = set()
+        index_questions(question_ids)
+
+
+def reindex_question(sender, instance, **kwargs):
+    if deleted_with_question(instance, **kwargs):
+        return
+    question_id = get_question_id(instance)
+    if question_id is None:
+        return
+    if not hasattr(pending_reindex, 'ids'):
+        pending_reindex.ids = set()
+    pending_reindex.ids.add(question_id)
+    # Later callbacks of the transaction find the set already flushed
+    transaction.on_commit(reindex_pending_questions)
+
+
+def invalidate_question_lists(sender, instance, **kwargs):
+    # The type may just have changed, so every list is invalidated
+    for question_type, _ in Question.QUESTION_TYPES:
+        transaction.on_commit(lambda question_type=question_type: bump_question_type_version(question_type))
+
+
+def invalidate_question_ids(sender, instance, **kwargs):
+    # Adding or removing details changes which questions can be answered
+    question_type = QUESTION_DETAILS_TYPES[sender]
+    transaction.on_commit(lambda: bump_question_type_version(question_type))
+
+
+for model in QUESTION_CONTENT_MODELS:
+    post_save.connect(invalidate_question_content, sender=model)
+    post_delete.connect(invalidate_question_content, sender=model)
+
+# Audio files are not part of the search index
+for model in QUESTION_CONTENT_MODELS.keys() - {SSTAudioFile}:
+    post_save.connect(reindex_question, sender=model)
+    post_delete.connect(reindex_question, sender=model)
+
+post_save.connect(invalidate_question_lists, sender=Question)
+post_delete.connect(invalidate_question_lists, sender=Question)
+
+for model in QUESTION_DETAILS_TYPES:
+    post_save.connect(invalidate_question_ids, sender=model)
+    post_delete.connect(invalidate_question_ids, sender=model)
@@ -44,19 +44,154 @@
 #         return f"SSTAnswer ID {answer_id} does not exist"
 
 
-import threading
+import logging
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
-class CalculateScoreThread(threading.Thread):
-    def __init__(self, sst_answer_id):
-        self.sst_answer_id = sst_answer_id
-        super().__init__()
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, F
+from django.utils import timezone
 
-    def run(self):
-        from .models import SSTAnswer  # Import inside the thread to avoid circular imports
-        # time.sleep(5)  # Delay for 5 seconds
-        # print("the sleep is over")
-        sst_answer = SSTAnswer.objects.get(id=self.sst_answer_id)
+from .models import ScoringJob, SSTAnswer
+
+logger = logging.getLogger(__name__)
+
+SCORING_QUEUE_DEFAULTS = {
+    'WORKERS': 4,  # Size of the worker thread pool
+    'POLL_INTERVAL': 1.0,  # Seconds to wait when the queue is empty
+    'MAX_ATTEMPTS': 5,  # A job fails for good after this many attempts
+    'BACKOFF_SECONDS': 2,  # Retry delay, doubled on every attempt
+    'STALE_AFTER_SECONDS': 300,  # Running jobs older than this are re-queued
+}
+
+
+def get_queue_setting(name):
+    return getattr(settings, 'SCORING_QUEUE', {}).get(name, SCORING_QUEUE_DEFAULTS[name])
+
+
+def enqueue_sst_scoring(sst_answer):
+    """
+    Queue an SST answer for background scoring.
+    """
+    return ScoringJob.objects.create(sst_answer=sst_answer)
+
+
+def claim_jobs(limit, worker_token):
+    """
+    Atomically mark up to `limit` due jobs as running for this worker and return them.
+    """
+    now = timezone.now()
+    candidate_ids = list(
+        ScoringJob.objects.filter(status='queued', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not candidate_ids:
+        return []
+    # Only jobs still queued are taken, so concurrent workers never share a job
+    ScoringJob.objects.filter(id__in=candidate_ids, status='queued').update(
+        status='running', locked_by=worker_token, locked_at=now, attempts=F('attempts') + 1
+    )
+    return list(ScoringJob.objects.filter(id__in=candidate_ids, status='running', locked_by=worker_token))
+
+
+def run_job(job):
+    """
+    Score the job's SST answer, rescheduling it with exponential backoff on failure.
+    """
+    try:
+        sst_answer = SSTAnswer.objects.select_related('answer', 'question').get(id=job.sst_answer_id)
         sst_answer.calculate_score()
+    except Exception as e:
+        logger.exception("Scoring job %s failed (attempt %s)", job.id, job.attempts)
+        job.last_error = str(e)
+        if job.attempts >= get_queue_setting('MAX_ATTEMPTS'):
+            job.status = 'failed'
+        else:
+            job.status = 'queued'
+            delay = get_queue_setting('BACKOFF_SECONDS') * 2 ** (job.attempts - 1)
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+    else:
+        job.status = 'done'
+        job.last_error = ''
+    job.locked_by = ''
+    job.locked_at = None
+    # Not save(): deleting the answer meanwhile cascades to the job, and
+    # updating no row must not stop the worker
+    ScoringJob.objects.filter(pk=job.pk).update(
+        status=job.status, run_after=job.run_after, locked_by='', locked_at=None, last_error=job.last_error
+    )
+    return job
+
+
+def recover_stale_jobs():
+    """
+    Re-queue jobs left running by a worker that died, or fail them once they
+    have used up their attempts, so a job that keeps killing its worker is
+    not retried forever. Returns the number recovered.
+    """
+    cutoff = timezone.now() - timedelta(seconds=get_queue_setting('STALE_AFTER_SECONDS'))
+    stale = ScoringJob.objects.filter(status='running', locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=get_queue_setting('MAX_ATTEMPTS')).update(
+        status='failed', locked_by='', locked_at=None, last_error='The worker stopped while running the job.'
+    )
+    return failed + stale.update(status='queued', locked_by='', locked_at=None, run_after=timezone.now())
+
+
+def get_queue_depth():
+    """
+    Return the number of scoring jobs in each status.
+    """
+    depth = {status: 0 for status, _ in ScoringJob.STATUSES}
+    for row in ScoringJob.objects.exclude(status='done').values('status').annotate(count=Count('id')):
+        depth[row['status']] = row['count']
+    depth.pop('done')
+    return depth
+
+
+class ScoringWorker:
+    """
+    Polls the ScoringJob table and scores jobs on a bounded thread pool.
+    """
+
+    def __init__(self, workers=None, poll_interval=None):
+        self.workers = workers or get_queue_setting('WORKERS')
+        self.poll_interval = poll_interval if poll_interval is not None else get_queue_setting('POLL_INTERVAL')
+        self.token = uuid.uuid4().hex
+        self.stopped = False
+
+    def run_one(self, job):
+        close_old_connections()
+        try:
+            return run_job(job)
+        finally:
+            close_old_connections()
+
+    def run(self, once=False):
+        """
+        Process jobs until stopped. With `once`, return as soon as no job is due.
+        Returns the number of jobs processed.
+        """
+        recovered = recover_stale_jobs()
+        if recovered:
+            logger.info("Recovered %s stale scoring jobs", recovered)
 
+        processed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not self.stopped:
+                jobs = claim_jobs(self.workers, self.token)
+                if not jobs:
+                    if once:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                # Never more than `workers` jobs in flight, each on its own connection
+                list(pool.map(self.run_one, jobs))
+                processed += len(jobs)
+        return processed
 
+    def stop(self):
+        self.stopped = True
@@ -1,3 +1,1930 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from onepte.routers import ReadReplicaRouter
+
+from . import admin as pte_admin
+from . import importer, mock_tests
+from . import rescoring
+from .admission import admission
+from .answer_keys import AnswerKeyIndex, answer_keys
+from .audio import inspect_audio, parse_range
+from .exporter import get_export_queryset, render_export
+from .benchmark import run_benchmarks, seed_dataset
+from .cache import seen_questions_lock_key
+from .middleware import find_duplicate_queries, normalize_sql, serializer_time
+from .models import *
+from .next_question import get_question_ids
+from .scoring import SSTScore, SSTScorer, get_sst_scorer
+from .serializers import QuestionSerializer
+from .tasks import claim_jobs, get_queue_depth, recover_stale_jobs, run_job
+
+
+def create_sst_question(title="SST question"):
+    question = Question.objects.create(title=title, question_type="SST")
+    SummarizeSpokenText.objects.create(question=question, answer_time_limit=600)
+    return question
+
+
+def create_ro_question(title="RO question", paragraphs=4):
+    question = Question.objects.create(title=title, question_type="RO")
+    ro_question = ReorderParagraphQuestion.objects.create(question=question)
+    for order in range(1, paragraphs + 1):
+        ReorderParagraph.objects.create(
+            reorder_question=ro_question,
+            content=f"Paragraph {order}",
+            correct_next_order=order + 1 if order < paragraphs else None,
+        )
+    return question
+
+
+def create_rmmcq_question(title="RMMCQ question", correct=2, incorrect=2):
+    question = Question.objects.create(title=title, question_type="RMMCQ")
+    rmmcq_question = ReadingMultipleChoiceQuestion.objects.create(question=question, passage="Passage")
+    for index in range(correct):
+        RMMCQOption.objects.create(rmmcq_question=rmmcq_question, content=f"Correct {index}", is_correct=True)
+    for index in range(incorrect):
+        RMMCQOption.objects.create(rmmcq_question=rmmcq_question, content=f"Incorrect {index}")
+    return question
+
+
+def create_score_buckets(question):
+    """
+    Create the empty histogram rows of a question and its type, as after earlier answers.
+    """
+    ScoreHistogramBucket.objects.bulk_create([
+        ScoreHistogramBucket(question_type=question.question_type, question=scope, bucket=bucket)
+        for scope in (question, None)
+        for bucket in range(ScoreHistogramBucket.BUCKETS)
+    ], ignore_conflicts=True)
+
+
+def create_answer(user, question):
+    answer = Answer.objects.create(user=user, question=question)
+    if question.question_type == "SST":
+        SSTAnswer.objects.create(answer=answer, question=question.sst_details, text="Summary")
+    elif question.question_type == "RO":
+        paragraphs = question.reorder_paragraph_details.paragraphs.count()
+        ROAnswer.objects.create(
+            answer=answer,
+            question=question.reorder_paragraph_details,
+            paragraph_order=list(range(1, paragraphs + 1)),
+        )
+    elif question.question_type == "RMMCQ":
+        rmmcq_answer = RMMCQAnswer.objects.create(answer=answer, question=question.rmmcq_details)
+        rmmcq_answer.selected_options.set(question.rmmcq_details.options.filter(is_correct=True))
+    return answer
+
+
+# Keeps tests away from the shared file cache a dev server may be using
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pte-exam-tests',
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PTETestCase(TestCase):
+    """
+    Question ids are reused once a test rolls back, and version bumps only
+    run on commit, which never happens inside a test. Every test therefore
+    starts with an empty cache, answer key index and admission state, in a
+    local memory cache of its own.
+    """
+
+    def setUp(self):
+        cache.clear()
+        answer_keys.clear()
+        admission.clear()
+
+
+class PracticeHistoryQueryCountTests(PTETestCase):
+    """
+    The history page must be built with a fixed number of queries, whatever
+    the page size or question type mix.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("practice-history")
+
+    def assert_history_queries(self, question, expected_queries):
+        for size in (1, 20):
+            Answer.objects.filter(user=self.user).delete()
+            for _ in range(size):
+                create_answer(self.user, question)
+            with self.assertNumQueries(expected_queries):
+                response = self.client.get(self.url, {"page_size": 50})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["results"]), size)
+
+    def test_sst_history(self):
+        # COUNT + page
+        self.assert_history_queries(create_sst_question(), 2)
+
+    def test_ro_history(self):
+        self.assert_history_queries(create_ro_question(), 2)
+
+    def test_rmmcq_history(self):
+        # COUNT + page + correct options prefetch
+        self.assert_history_queries(create_rmmcq_question(), 3)
+
+    def test_mixed_history(self):
+        questions = [create_sst_question(), create_ro_question(), create_rmmcq_question()]
+        for _ in range(10):
+            for question in questions:
+                create_answer(self.user, question)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"page_size": 50})
+        self.assertEqual(len(response.data["results"]), 30)
+
+    def test_rmmcq_max_score_uses_correct_options(self):
+        create_answer(self.user, create_rmmcq_question(correct=3, incorrect=1))
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["results"][0]["score"]["Choice"]["max_score"], 3)
+
+
+class PracticeHistoryCursorPaginationTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("practice-history")
+        question = create_ro_question()
+        self.answers = [create_answer(self.user, question) for _ in range(25)]
+
+    def test_cursor_walks_every_answer_once(self):
+        seen = []
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 10})
+        while True:
+            self.assertNotIn("count", response.data)
+            seen.extend(item["id"] for item in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, [answer.id for answer in reversed(self.answers)])
+
+    def test_deep_cursor_page_skips_count(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 10})
+        next_url = self.client.get(response.data["next"]).data["next"]
+        # Page only, no COUNT(*)
+        with self.assertNumQueries(1):
+            response = self.client.get(next_url)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_cursor_with_question_type_filter(self):
+        create_answer(self.user, create_sst_question())
+        response = self.client.get(self.url, {"pagination": "cursor", "question_type": "SST"})
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_cursor_walks_answers_sharing_a_timestamp(self):
+        Answer.objects.filter(id__in=[answer.id for answer in self.answers]).update(created_at=timezone.now())
+        seen = []
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 4})
+        while True:
+            seen.extend(item["id"] for item in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, sorted((answer.id for answer in self.answers), reverse=True))
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get(self.url, {"pagination": "cursor", "page_size": 10})
+        second = self.client.get(first.data["next"])
+        self.assertIsNone(first.data["previous"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+        self.assertIsNone(back.data["previous"])
+        self.assertEqual(back.data["next"], first.data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class AnswerScoreSummaryTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+
+    def test_new_answer_is_pending(self):
+        answer = create_answer(self.user, create_sst_question())
+        self.assertEqual(answer.question_type, "SST")
+        self.assertEqual(answer.score_status, "pending")
+
+    def test_sst_score_is_recorded(self):
+        answer = create_answer(self.user, create_sst_question())
+        answer.sst_answer_details.calculate_score()
+        answer.refresh_from_db()
+        self.assertEqual(answer.score_status, "scored")
+        self.assertEqual(answer.total_score, answer.sst_answer_details.total_score)
+        self.assertEqual(answer.max_score, 10)
+
+    def test_ro_score_is_recorded(self):
+        answer = create_answer(self.user, create_ro_question(paragraphs=4))
+        answer.ro_answer_details.calculate_score()
+        answer.refresh_from_db()
+        self.assertEqual(answer.get_score_summary(), {"score": 3, "max_score": 3, "status": "scored"})
+
+    def test_rmmcq_score_is_recorded(self):
+        answer = create_answer(self.user, create_rmmcq_question(correct=3, incorrect=1))
+        answer.rmmcq_answer_details.calculate_score()
+        answer.refresh_from_db()
+        self.assertEqual(answer.get_score_summary(), {"score": 3, "max_score": 3, "status": "scored"})
+
+
+SST_TRANSCRIPT = (
+    "Climate change is reshaping agriculture across the world. Farmers face droughts, floods and rising "
+    "temperatures, which reduce crop yields and threaten food security. Scientists recommend resilient seeds, "
+    "better irrigation and soil conservation to help farmers adapt."
+)
+SST_SUMMARY = (
+    "The lecture explains that climate change is reshaping agriculture around the world, because farmers now face "
+    "droughts, floods and rising temperatures that reduce crop yields and threaten food security, so scientists "
+    "recommend resilient seeds, better irrigation and careful soil conservation, which together should help "
+    "farmers adapt to these conditions and protect the global food supply for future generations."
+)
+
+
+@override_settings(SST_SCORING={'DICTIONARY': None})
+class SSTScoringTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.scorer = get_sst_scorer()
+
+    def test_good_summary_gets_full_marks(self):
+        self.assertEqual(self.scorer.score(SST_SUMMARY, SST_TRANSCRIPT), (2, 2, 2, 2, 2))
+
+    def test_form_follows_word_count(self):
+        words = SST_SUMMARY.split()
+        self.assertEqual(self.scorer.score(" ".join(words[:45]) + ".", SST_TRANSCRIPT).form, 1)
+        # No form scores nothing at all
+        self.assertEqual(self.scorer.score(" ".join(words[:30]) + ".", SST_TRANSCRIPT).total, 0)
+        self.assertEqual(self.scorer.score(SST_SUMMARY.upper(), SST_TRANSCRIPT).total, 0)
+
+    def test_spelling_and_grammar(self):
+        score = self.scorer.score(SST_SUMMARY.replace("agriculture", "agricultre"), SST_TRANSCRIPT)
+        self.assertEqual(score.spelling, 1)
+        score = self.scorer.score(SST_SUMMARY[0].lower() + SST_SUMMARY[1:-1], SST_TRANSCRIPT)
+        self.assertEqual(score.grammar, 0)
+
+    def test_dictionary_spelling(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("\n".join(word.strip(".,").lower() for word in SST_SUMMARY.split() if word != "careful"))
+        self.addCleanup(os.remove, f.name)
+        with override_settings(SST_SCORING={'DICTIONARY': f.name}):
+            score = get_sst_scorer().score(SST_SUMMARY, SST_TRANSCRIPT)
+        # "careful" is neither in the dictionary nor in the transcript
+        self.assertEqual(score.spelling, 1)
+
+    def test_content_needs_the_transcript(self):
+        score = self.scorer.score(SST_SUMMARY, "")
+        # Content cannot be judged, so only form, grammar and spelling count
+        self.assertEqual(score, (0, 2, 2, 0, 2))
+        off_topic = " ".join(["The speaker talks about modern music and popular bands."] * 6)
+        self.assertEqual(self.scorer.score(off_topic, SST_TRANSCRIPT).total, 0)
+
+    def test_batch_matches_single_scoring(self):
+        texts = [SST_SUMMARY, SST_SUMMARY.replace("floods", "flods"), SST_SUMMARY.lower(), "Too short."]
+        items = [(text, transcript) for text in texts for transcript in (SST_TRANSCRIPT, "")]
+        self.assertEqual(self.scorer.score_many(items), [self.scorer.score(*item) for item in items])
+
+    def test_scorer_is_shared_and_pluggable(self):
+        self.assertIs(get_sst_scorer(), self.scorer)
+        with override_settings(SST_SCORING={'ENGINE': 'pte_exam.tests.ZeroScorer'}):
+            self.assertIsInstance(get_sst_scorer(), ZeroScorer)
+
+    def test_calculate_score_is_deterministic(self):
+        user = User.objects.create_user(username="student", password="password")
+        question = create_sst_question()
+        question.sst_details.transcript = SST_TRANSCRIPT
+        question.sst_details.save()
+        answers = [create_answer(user, question) for _ in range(3)]
+        for answer in answers:
+            answer.sst_answer_details.text = SST_SUMMARY
+            answer.sst_answer_details.calculate_score()
+        self.assertEqual({answer.sst_answer_details.total_score for answer in answers}, {10})
+
+
+class ZeroScorer(SSTScorer):
+
+    def score_many(self, items):
+        return [SSTScore(0, 0, 0, 0, 0) for _ in items]
+
+
+class QuestionDetailCacheTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def get_detail(self, question):
+        return self.client.get(reverse("question-detail", args=[question.id]))
+
+    def test_miss_is_built_in_one_prefetched_pass(self):
+        for question, expected_queries in (
+            (create_sst_question(), 2),
+            (create_ro_question(), 2),
+            (create_rmmcq_question(), 2),
+        ):
+            with self.assertNumQueries(expected_queries):
+                response = self.get_detail(question)
+            self.assertEqual(response.status_code, 200)
+
+    def test_hit_runs_no_queries(self):
+        question = create_rmmcq_question()
+        first = self.get_detail(question)
+        with self.assertNumQueries(0):
+            second = self.get_detail(question)
+        self.assertEqual(first.data, second.data)
+
+    def test_payload_matches_question_content(self):
+        question = create_ro_question(paragraphs=3)
+        data = self.get_detail(question).data
+        self.assertEqual([p["content"] for p in data["paragraphs"]], ["Paragraph 1", "Paragraph 2", "Paragraph 3"])
+        self.assertIsNone(data["options"])
+
+    def test_sub_model_save_invalidates(self):
+        question = create_rmmcq_question(correct=1, incorrect=1)
+        self.get_detail(question)
+        with self.captureOnCommitCallbacks(execute=True):
+            RMMCQOption.objects.create(rmmcq_question=question.rmmcq_details, content="New option")
+        self.assertEqual(len(self.get_detail(question).data["options"]), 3)
+
+    def test_invalidates_on_commit(self):
+        question = create_rmmcq_question(correct=1, incorrect=1)
+        self.get_detail(question)
+        with self.captureOnCommitCallbacks() as callbacks:
+            RMMCQOption.objects.create(rmmcq_question=question.rmmcq_details, content="New option")
+            # Until the change commits, readers keep the committed payload
+            self.assertEqual(len(self.get_detail(question).data["options"]), 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.get_detail(question).data["options"]), 3)
+
+    def test_sub_model_delete_invalidates(self):
+        question = create_ro_question(paragraphs=3)
+        self.get_detail(question)
+        with self.captureOnCommitCallbacks(execute=True):
+            question.reorder_paragraph_details.paragraphs.last().delete()
+        self.assertEqual(len(self.get_detail(question).data["paragraphs"]), 2)
+
+    def test_question_delete_invalidates(self):
+        question = create_sst_question()
+        url = reverse("question-detail", args=[question.id])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            question.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ScoringQueueTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.question = create_sst_question()
+
+    def submit_sst(self):
+        response = self.client.post(
+            reverse("submit-answer"), {"question_id": self.question.id, "answer": "Summary"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        return Answer.objects.get(id=response.data["data"]["id"])
+
+    def test_submission_enqueues_job(self):
+        answer = self.submit_sst()
+        job = answer.sst_answer_details.scoring_job
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(get_queue_depth(), {"queued": 1, "running": 0, "failed": 0})
+
+    def test_claimed_job_is_scored(self):
+        answer = self.submit_sst()
+        jobs = claim_jobs(10, "worker")
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(claim_jobs(10, "other-worker"), [])
+        run_job(jobs[0])
+        answer.refresh_from_db()
+        self.assertEqual(answer.score_status, "scored")
+        self.assertEqual(ScoringJob.objects.get().status, "done")
+
+    def test_failed_job_is_retried_with_backoff(self):
+        self.submit_sst()
+        with self.settings(SCORING_QUEUE={"MAX_ATTEMPTS": 2, "BACKOFF_SECONDS": 60}):
+            with mock.patch.object(SSTAnswer, "calculate_score", side_effect=RuntimeError("boom")), \
+                    self.assertLogs("pte_exam.tasks", level="ERROR"):
+                job = run_job(claim_jobs(1, "worker")[0])
+                self.assertEqual(job.status, "queued")
+                self.assertGreater(job.run_after, timezone.now())
+                self.assertEqual(claim_jobs(1, "worker"), [])
+
+                ScoringJob.objects.update(run_after=timezone.now())
+                job = run_job(claim_jobs(1, "worker")[0])
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.last_error, "boom")
+
+    def test_stale_running_jobs_are_recovered(self):
+        self.submit_sst()
+        claim_jobs(1, "dead-worker")
+        ScoringJob.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(recover_stale_jobs(), 1)
+        self.assertEqual(ScoringJob.objects.get().status, "queued")
+
+        # A job that keeps stopping its worker fails once out of attempts
+        with self.settings(SCORING_QUEUE={"MAX_ATTEMPTS": 2}):
+            claim_jobs(1, "dead-worker")
+            ScoringJob.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(recover_stale_jobs(), 1)
+        job = ScoringJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_answer_deleted_while_scoring(self):
+        answer = self.submit_sst()
+        job = claim_jobs(1, "worker")[0]
+
+        def delete_answer(sst_answer):
+            sst_answer.answer.delete()
+
+        with mock.patch.object(SSTAnswer, "calculate_score", side_effect=delete_answer, autospec=True):
+            self.assertEqual(run_job(job).status, "done")
+        self.assertFalse(ScoringJob.objects.exists())
+
+    def test_queue_depth_endpoint_is_admin_only(self):
+        self.submit_sst()
+        self.assertEqual(self.client.get(reverse("scoring-queue")).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("scoring-queue"))
+        self.assertEqual(response.data["queued"], 1)
+
+
+class BatchSubmitAnswerTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("submit-answers")
+        self.sst = create_sst_question()
+        self.ro = create_ro_question(paragraphs=3)
+        self.rmmcq = create_rmmcq_question(correct=2, incorrect=2)
+
+    def submit(self, items):
+        return self.client.post(self.url, {"answers": items}, format="json")
+
+    def test_batch_is_scored_per_item(self):
+        correct_ids = list(self.rmmcq.rmmcq_details.options.filter(is_correct=True).values_list("id", flat=True))
+        response = self.submit([
+            {"question_id": self.sst.id, "answer": "Summary"},
+            {"question_id": self.ro.id, "answer": [1, 2, 3]},
+            {"question_id": self.rmmcq.id, "answer": correct_ids},
+        ])
+        self.assertEqual(response.status_code, 201)
+        data = response.data["data"]
+        self.assertEqual([item["question_type"] for item in data], ["SST", "RO", "RMMCQ"])
+        self.assertNotIn("score_components", data[0])
+        self.assertEqual(data[1]["score_components"], {"Blank": {"score": 2, "max_score": 2}})
+        self.assertEqual(data[2]["score_components"], {"Choice": {"score": 2, "max_score": 2}})
+
+        rmmcq_answer = RMMCQAnswer.objects.get()
+        self.assertEqual(set(rmmcq_answer.selected_options.values_list("id", flat=True)), set(correct_ids))
+        self.assertEqual(ScoringJob.objects.get().sst_answer.answer_id, data[0]["id"])
+        self.assertEqual(Answer.objects.get(id=data[1]["id"]).score_status, "scored")
+        self.assertEqual(Answer.objects.get(id=data[0]["id"]).score_status, "pending")
+
+    @override_settings(ADMISSION_CONTROL={"USER_BURST": 100})
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def items(count):
+            return [{"question_id": self.ro.id, "answer": [1, 2, 3]} for _ in range(count)] + [
+                {"question_id": self.sst.id, "answer": "Summary"} for _ in range(count)
+            ]
+
+        self.submit(items(1))  # Warm the answer key index
+        with CaptureQueriesContext(connection) as small:
+            self.submit(items(1))
+        with CaptureQueriesContext(connection) as large:
+            self.submit(items(20))
+        self.assertEqual(len(small), len(large))
+
+    def test_invalid_item_rejects_whole_batch(self):
+        response = self.submit([
+            {"question_id": self.ro.id, "answer": [1, 2, 3]},
+            {"question_id": self.ro.id, "answer": [1, 1, 2]},
+            {"question_id": 0, "answer": "Summary"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.data["answers"]
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]["non_field_errors"], ["Invalid answer."])
+        self.assertEqual(errors[2]["non_field_errors"], ["Question not found."])
+        self.assertFalse(Answer.objects.exists())
+
+
+class AnswerKeyIndexTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.index = AnswerKeyIndex(maxsize=2)
+
+    def test_keys_hold_ro_chain_and_rmmcq_option_sets(self):
+        ro = create_ro_question(paragraphs=3)
+        rmmcq = create_rmmcq_question(correct=1, incorrect=2)
+        keys = self.index.get_many([ro.id, rmmcq.id])
+        self.assertEqual(keys[ro.id].next_correct_order, (2, 3, None))
+        options = rmmcq.rmmcq_details.options.all()
+        self.assertEqual(keys[rmmcq.id].valid_option_ids, {o.id for o in options})
+        self.assertEqual(keys[rmmcq.id].correct_option_ids, {o.id for o in options if o.is_correct})
+
+    def test_hit_runs_no_queries(self):
+        question = create_ro_question()
+        self.index.get(question.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.index.get(question.id).has_details)
+
+    def test_least_recently_used_key_is_evicted(self):
+        first, second, third = (create_sst_question(f"SST {i}") for i in range(3))
+        self.index.get(first.id)
+        self.index.get(second.id)
+        self.index.get(first.id)
+        self.index.get(third.id)
+        self.assertEqual(list(self.index.entries), [first.id, third.id])
+
+    def test_scoring_without_answer_key_raises(self):
+        ro_answer = create_answer(self.user, create_ro_question()).ro_answer_details
+        with mock.patch.object(answer_keys, "get", return_value=None):
+            with self.assertRaisesMessage(Question.DoesNotExist, "no longer exists"):
+                ro_answer.calculate_score()
+
+    def test_answer_key_change_invalidates(self):
+        question = create_rmmcq_question(correct=1, incorrect=1)
+        answer_keys.get(question.id)
+        option = question.rmmcq_details.options.get(is_correct=False)
+        option.is_correct = True
+        with self.captureOnCommitCallbacks(execute=True):
+            option.save()
+        self.assertIn(option.id, answer_keys.get(question.id).correct_option_ids)
+
+    def test_ro_scoring_reads_no_answer_key_rows(self):
+        question = create_ro_question(paragraphs=3)
+        answer = create_answer(self.user, question)
+        answer_keys.get(question.id)
+        ro_answer = ROAnswer.objects.select_related("answer", "question").get(answer=answer)
+        UserProgress.objects.create(user=self.user, question_type="RO")
+        create_score_buckets(question)
+        # Only the writes of the typed answer, its score summary, the user's progress and the histograms
+        with self.assertNumQueries(4):
+            ro_answer.calculate_score()
+        self.assertEqual(ro_answer.total_score, 2)
+
+
+class SubmitAnswerQueryCountTests(PTETestCase):
+    """
+    A submission resolves its question once and, with a warm answer key
+    index and SST backlog count, only writes after that. Inside a test the
+    transaction adds a SAVEPOINT and a RELEASE.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        for question_type, _ in Question.QUESTION_TYPES:
+            UserProgress.objects.create(user=self.user, question_type=question_type)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("submit-answer")
+
+    def assert_submit_queries(self, question, answer, expected_queries):
+        answer_keys.get(question.id)
+        admission.get_sst_backlog()
+        create_score_buckets(question)
+        with self.assertNumQueries(expected_queries):
+            response = self.client.post(self.url, {"question_id": question.id, "answer": answer}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_sst_submission(self):
+        # Question, answer, SST answer and scoring job
+        self.assert_submit_queries(create_sst_question(), "Summary", 6)
+
+    def test_ro_submission(self):
+        # Question, answer, progress, histograms, RO answer and percentiles
+        response = self.assert_submit_queries(create_ro_question(paragraphs=3), [1, 2, 3], 8)
+        self.assertEqual(response.data["data"]["score_components"], {"Blank": {"score": 2, "max_score": 2}})
+
+    def test_rmmcq_submission(self):
+        question = create_rmmcq_question(correct=2, incorrect=1)
+        option_ids = list(question.rmmcq_details.options.values_list("id", flat=True))
+        # Question, answer, progress, histograms, RMMCQ answer, selected options and percentiles
+        response = self.assert_submit_queries(question, option_ids, 9)
+        self.assertEqual(response.data["data"]["score_components"], {"Choice": {"score": 1, "max_score": 2}})
+        self.assertEqual(RMMCQAnswer.objects.get().selected_options.count(), 3)
+
+    def test_unknown_question(self):
+        response = self.client.post(self.url, {"question_id": 0, "answer": "Summary"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["non_field_errors"], ["Question not found."])
+
+
+class UserProgressTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ro = create_ro_question(paragraphs=3)
+
+    def submit(self, question, answer):
+        return self.client.post(reverse("submit-answer"), {"question_id": question.id, "answer": answer}, format="json")
+
+    def get_progress(self):
+        return {row["question_type"]: row for row in self.client.get(reverse("progress")).data}
+
+    def test_scored_answers_update_progress(self):
+        self.submit(self.ro, [1, 2, 3])
+        self.submit(self.ro, [3, 2, 1])
+        progress = self.get_progress()["RO"]
+        self.assertEqual(progress["answer_count"], 2)
+        self.assertEqual(progress["best_score"], 2)
+        self.assertEqual(progress["average_score"], 1.0)
+        self.assertEqual(progress["average_percentage"], 50.0)
+
+    def test_sst_counts_once_scored(self):
+        response = self.submit(create_sst_question(), "Summary")
+        self.assertNotIn("SST", self.get_progress())
+        run_job(claim_jobs(1, "worker")[0])
+        progress = self.get_progress()["SST"]
+        self.assertEqual(progress["answer_count"], 1)
+        self.assertEqual(progress["score_sum"], Answer.objects.get(id=response.data["data"]["id"]).total_score)
+
+    def test_rescoring_does_not_count_twice(self):
+        self.submit(self.ro, [1, 2, 3])
+        ro_answer = ROAnswer.objects.select_related("answer").get()
+        ro_answer.paragraph_order = [3, 2, 1]
+        ro_answer.calculate_score()
+        progress = self.get_progress()["RO"]
+        self.assertEqual(progress["answer_count"], 1)
+        self.assertEqual(progress["score_sum"], 0)
+
+    def test_batch_updates_progress(self):
+        self.client.post(
+            reverse("submit-answers"),
+            {"answers": [{"question_id": self.ro.id, "answer": [1, 2, 3]}] * 3},
+            format="json",
+        )
+        self.assertEqual(self.get_progress()["RO"]["answer_count"], 3)
+
+    def test_rebuild_matches_incremental(self):
+        self.submit(self.ro, [1, 2, 3])
+        self.submit(self.ro, [2, 3, 1])
+        expected = self.get_progress()
+        UserProgress.objects.all().delete()
+        call_command("rebuild_progress", chunk_size=1, stdout=StringIO())
+        rebuilt = self.get_progress()
+        for row in (expected["RO"], rebuilt["RO"]):
+            row.pop("updated_at")
+        self.assertEqual(rebuilt, expected)
+
+    def test_migration_backfills_answers_scored_before_it(self):
+        self.submit(self.ro, [1, 2, 3])
+        self.submit(self.ro, [2, 3, 1])
+        expected = self.get_progress()
+        UserProgress.objects.all().delete()
+        import_module("pte_exam.migrations.0010_userprogress").backfill_progress(apps, None)
+        backfilled = self.get_progress()
+        for row in (expected["RO"], backfilled["RO"]):
+            row.pop("updated_at")
+        self.assertEqual(backfilled, expected)
+
+
+class BenchmarkTests(PTETestCase):
+
+    def test_benchmark_reports_every_endpoint(self):
+        dataset = seed_dataset(questions=6, users=1, answers_per_user=12)
+        self.assertEqual(Answer.objects.count(), 12)
+        results = run_benchmarks(dataset, requests=3)
+        self.assertEqual(
+            set(results),
+            {
+                "question_list", "question_list_by_type", "question_detail", "question_detail_cold",
+                "submit_answer", "practice_history", "practice_history_deep_page", "practice_history_cursor_deep",
+            },
+        )
+        for result in results.values():
+            self.assertEqual(result["requests"], 3)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+
+class QuestionConditionalGetTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.question = create_rmmcq_question()
+        self.detail_url = reverse("question-detail", args=[self.question.id])
+        self.list_url = reverse("question-list")
+
+    def test_detail_revalidation_runs_no_queries(self):
+        response = self.client.get(self.detail_url)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_changes_with_content(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            RMMCQOption.objects.create(rmmcq_question=self.question.rmmcq_details, content="New option")
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_revalidation_runs_no_queries(self):
+        etag = self.client.get(self.list_url, {"question_type": "RMMCQ"})["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, {"question_type": "RMMCQ"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_depends_on_query_and_questions(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        self.assertNotEqual(self.client.get(self.list_url, {"page": 1})["ETag"], etag)
+
+        self.question.title = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.save()
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_if_modified_since(self):
+        last_modified = self.client.get(self.list_url)["Last-Modified"]
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class AsyncReadPathTests(PTETestCase):
+    """
+    The async endpoints return the same payloads as their DRF counterparts.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.questions = [create_sst_question(), create_ro_question(), create_rmmcq_question()]
+        for question in self.questions * 5:
+            create_answer(self.user, question)
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    async def test_question_list_matches_sync(self):
+        for params in ({}, {"question_type": "RO"}):
+            response = await self.async_client.get(reverse("async-question-list"), params)
+            self.assertEqual(response.status_code, 200)
+            expected = await sync_to_async(self.sync_client.get)(reverse("question-list"), params)
+            self.assertEqual(response.json(), expected.json())
+
+    async def test_question_detail_matches_sync(self):
+        for question in self.questions:
+            response = await self.async_client.get(reverse("async-question-detail", args=[question.id]))
+            expected = await sync_to_async(self.sync_client.get)(reverse("question-detail", args=[question.id]))
+            self.assertEqual(response.json(), expected.json())
+
+    async def test_question_detail_conditional_get(self):
+        url = reverse("async-question-detail", args=[self.questions[0].id])
+        etag = (await self.async_client.get(url))["ETag"]
+        response = await self.async_client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_question_endpoints_do_not_block_the_event_loop(self):
+        def off_event_loop(method):
+            def check(*args, **kwargs):
+                with self.assertRaises(RuntimeError, msg=f"cache.{method.__name__}() on the event loop"):
+                    asyncio.get_running_loop()
+                return method(*args, **kwargs)
+            return check
+
+        await sync_to_async(cache.clear)()
+        urls = [
+            (reverse("async-question-list"), reverse("question-list")),
+            (reverse("async-question-detail", args=[self.questions[0].id]),
+             reverse("question-detail", args=[self.questions[0].id])),
+        ]
+        # The async cache API runs these in a thread; a direct call fails
+        with mock.patch.object(cache, "get", off_event_loop(cache.get)), \
+                mock.patch.object(cache, "add", off_event_loop(cache.add)), \
+                mock.patch.object(cache, "set", off_event_loop(cache.set)):
+            for url, sync_url in urls:
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(self.sync_client.get)(sync_url)
+                self.assertEqual(response["ETag"], expected["ETag"])
+                self.assertEqual(response["Last-Modified"], expected["Last-Modified"])
+
+    async def test_question_detail_not_found(self):
+        response = await self.async_client.get(reverse("async-question-detail", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_practice_history_matches_sync(self):
+        params = {"page": 2, "page_size": 5}
+        response = await self.async_client.get(
+            reverse("async-practice-history"), params, headers={"Authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        expected = await sync_to_async(self.sync_client.get)(reverse("practice-history"), params)
+        actual = response.json()
+        expected = expected.json()
+        for payload in (actual, expected):
+            payload["next"] = payload["next"].split("?")[1]
+            payload["previous"] = payload["previous"].split("?")[1]
+        self.assertEqual(actual, expected)
+
+    async def test_practice_history_cursor_matches_sync(self):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        first = await self.async_client.get(
+            reverse("async-practice-history"), {"pagination": "cursor", "page_size": 4}, headers=headers
+        )
+        # Follow the async next link on both paths
+        query = first.json()["next"].split("?")[1]
+        response = await self.async_client.get(f'{reverse("async-practice-history")}?{query}', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        expected = await sync_to_async(self.sync_client.get)(f'{reverse("practice-history")}?{query}')
+        actual = response.json()
+        expected = expected.json()
+        self.assertNotIn("count", actual)
+        self.assertEqual(len(actual["results"]), 4)
+        for payload in (actual, expected):
+            payload["next"] = payload["next"].split("?")[1]
+            payload["previous"] = payload["previous"].split("?")[1]
+        self.assertEqual(actual, expected)
+
+        response = await self.async_client.get(
+            reverse("async-practice-history"), {"cursor": "not-a-cursor"}, headers=headers
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_practice_history_requires_authentication(self):
+        response = await self.async_client.get(reverse("async-practice-history"))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(
+            reverse("async-practice-history"), headers={"Authorization": "Bearer invalid"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class SlowMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        time.sleep(0.05)
+        return self.get_response(request)
+
+
+class RequestTimingMiddlewareTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.question = create_rmmcq_question()
+
+    def test_disabled_by_default(self):
+        response = APIClient().get(reverse("question-detail", args=[self.question.id]))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_serializer_time_is_only_recorded_during_requests(self):
+        with self.settings(REQUEST_TIMING_ENABLED=True), self.assertLogs("pte_exam.timing", level="INFO"):
+            APIClient().get(reverse("question-detail", args=[self.question.id]))
+        self.assertIsNone(serializer_time.get())
+        serializer = QuestionSerializer(self.question)
+        self.assertEqual(serializer.data["title"], "RMMCQ question")
+        self.assertIsNone(serializer_time.get())
+
+    def test_server_timing_and_log_line(self):
+        with self.settings(REQUEST_TIMING_ENABLED=True):
+            client = APIClient()
+            with self.assertLogs("pte_exam.timing", level="INFO") as logs:
+                response = client.get(reverse("question-detail", args=[self.question.id]))
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+        self.assertIn("view;dur=", response["Server-Timing"])
+        self.assertIn("render;dur=", response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+        timing = json.loads(logs.records[0].getMessage())
+        self.assertEqual(timing["queries"], 2)
+        self.assertGreater(timing["serializer_ms"], 0)
+        self.assertGreaterEqual(timing["view_ms"], timing["serializer_ms"])
+        self.assertGreater(timing["render_ms"], 0)
+        self.assertGreaterEqual(timing["total_ms"], timing["view_ms"] + timing["render_ms"])
+        self.assertEqual(timing["duplicate_queries"], 0)
+
+    def test_view_time_excludes_other_middleware(self):
+        middleware = [*settings.MIDDLEWARE, "pte_exam.tests.SlowMiddleware"]
+        with self.settings(REQUEST_TIMING_ENABLED=True, MIDDLEWARE=middleware):
+            with self.assertLogs("pte_exam.timing", level="INFO") as logs:
+                APIClient().get(reverse("question-detail", args=[self.question.id]))
+        timing = json.loads(logs.records[0].getMessage())
+        self.assertGreaterEqual(timing["total_ms"] - timing["view_ms"] - timing["render_ms"], 50)
+
+    def test_find_duplicate_queries(self):
+        queries = [
+            ('SELECT * FROM "question" WHERE "id" = %s', (1,), 0.001),
+            ('SELECT * FROM "question" WHERE "id" = %s', (1,), 0.001),
+            ('SELECT * FROM "option" WHERE "question_id" = 1', None, 0.001),
+            ('SELECT * FROM "option" WHERE "question_id" = 2', None, 0.001),
+            ('SELECT * FROM "answer" WHERE "id" IN (%s, %s)', (1, 2), 0.001),
+        ]
+        duplicates, near_duplicates = find_duplicate_queries(queries)
+        self.assertEqual(duplicates, [('SELECT * FROM "question" WHERE "id" = %s', 2)])
+        self.assertEqual(near_duplicates, [('SELECT * FROM "option" WHERE "question_id" = ?', 2)])
+
+    def test_normalize_sql_collapses_in_lists(self):
+        self.assertEqual(
+            normalize_sql("SELECT 1 FROM t WHERE name = 'a' AND id IN (%s, %s, %s)"),
+            "SELECT ? FROM t WHERE name = ? AND id IN (...)",
+        )
+
+
+class SQLiteProductionProfileTests(SimpleTestCase):
+    def open_connection(self, name, options):
+        wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": name, "OPTIONS": dict(options)}, alias="profile")
+        self.addCleanup(wrapper.close)
+        return wrapper.cursor()
+
+    def test_writer_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cursor = self.open_connection(os.path.join(directory, "db.sqlite3"), settings.SQLITE_PRODUCTION_OPTIONS)
+            self.assertEqual(cursor.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(cursor.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(cursor.execute("PRAGMA busy_timeout").fetchone()[0], 20000)
+
+    def test_read_connection_rejects_writes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "db.sqlite3")
+            writer = self.open_connection(path, settings.SQLITE_PRODUCTION_OPTIONS)
+            writer.execute("CREATE TABLE t (id INTEGER)")
+            writer.execute("INSERT INTO t VALUES (1)")
+
+            reader = self.open_connection(f"file:{path}?mode=ro", settings.SQLITE_READ_OPTIONS)
+            self.assertEqual(reader.execute("SELECT id FROM t").fetchall(), [(1,)])
+            with self.assertRaises(OperationalError):
+                reader.execute("INSERT INTO t VALUES (2)")
+
+    def test_router(self):
+        router = ReadReplicaRouter()
+        with mock.patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(router.db_for_read(Question), "replica")
+        # Reads inside a transaction see its writes
+        with mock.patch.object(connection, "in_atomic_block", True):
+            self.assertEqual(router.db_for_read(Question), "default")
+        self.assertEqual(router.db_for_write(Question), "default")
+        self.assertTrue(router.allow_migrate("default", "pte_exam"))
+        self.assertFalse(router.allow_migrate("replica", "pte_exam"))
+
+    def test_concurrent_writers_hit_no_lock_errors(self):
+        # The suite's in-memory database cannot be shared across threads, so
+        # the stress command runs in its own process on a SQLite file
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "stress.json")
+            subprocess.run([
+                sys.executable, "manage.py", "stress_sqlite", "--profile", "production",
+                "--writers", "4", "--readers", "2", "--submissions", "10", "--questions", "30",
+                "--output", output,
+            ], cwd=settings.BASE_DIR, check=True, capture_output=True)
+            with open(output) as f:
+                result = json.load(f)["production"]
+        self.assertEqual(result["errors"], {})
+        self.assertEqual(result["scoring_failures"], 0)
+        self.assertEqual(result["jobs_pending"], 0)
+        self.assertEqual(result["submit"]["requests"], 40)
+
+
+def make_wav(seconds=2, rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(rate)
+        audio.writeframes(bytes(range(256)) * (seconds * rate * 2 // 256))
+    return buffer.getvalue()
+
+
+class AudioStreamingTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+
+        self.content = make_wav()
+        question = create_sst_question()
+        self.audio = SSTAudioFile.objects.create(
+            sst_question=question.sst_details, speaker_name="Speaker",
+            file=ContentFile(self.content, name="lecture.wav"),
+        )
+        self.question = question
+        self.url = reverse("audio-file", args=[self.audio.id])
+
+    def test_metadata_computed_on_upload(self):
+        self.audio.refresh_from_db()
+        self.assertEqual(self.audio.size, len(self.content))
+        self.assertEqual(len(self.audio.sha256), 64)
+        self.assertEqual(self.audio.duration, 2.0)
+        with self.audio.file.open("rb") as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_question_detail_includes_metadata(self):
+        audios = APIClient().get(reverse("question-detail", args=[self.question.id])).data["audios"]
+        self.assertEqual(audios[0]["size"], len(self.content))
+        self.assertEqual(audios[0]["duration"], 2.0)
+        self.assertEqual(audios[0]["sha256"], self.audio.sha256)
+        self.assertEqual(audios[0]["url"], f"{self.url}?v={self.audio.sha256[:16]}")
+
+    def test_full_and_range_responses(self):
+        response = self.client.get(self.url, {"v": self.audio.sha256[:16]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Type"], "audio/x-wav")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.content[100:200])
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.content)}")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(response.streaming_content), self.content[-10:])
+
+        # A range ending before it starts is ignored
+        response = self.client.get(self.url, HTTP_RANGE="bytes=200-100")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_conditional_requests(self):
+        etag = f'"{self.audio.sha256}"'
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # A stale If-Range validator gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_mp3_duration_and_range_parsing(self):
+        # One MPEG-1 Layer III frame header: 128 kbps, 44.1 kHz, no Xing tag
+        mp3 = ContentFile(b"\xff\xfb\x90\x00" + bytes(16000 - 4))
+        self.assertEqual(inspect_audio(mp3)["duration"], 1.0)
+        self.assertIsNone(inspect_audio(ContentFile(b"not audio"))["duration"])
+
+        self.assertEqual(parse_range("bytes=5-", 10), (5, 9))
+        self.assertEqual(parse_range("bytes=2-100", 10), (2, 9))
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 10))
+        self.assertIsNone(parse_range("bytes=5-2", 10))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=10-", 10)
+
+        # A Xing tag cut off by the end of the file falls back to the bitrate
+        truncated = ContentFile(b"\xff\xfb\x90\x00" + bytes(32) + b"Xing\x00")
+        self.assertEqual(inspect_audio(truncated)["duration"], round(41 * 8 / 128000, 3))
+
+        # Reserved bitrate index 15, and an ID3 tag header cut short
+        self.assertIsNone(inspect_audio(ContentFile(b"\xff\xfb\xf0\x00" + bytes(100)))["duration"])
+        self.assertIsNone(inspect_audio(ContentFile(b"ID3\x04\x00"))["duration"])
+
+
+class ImportQuestionsTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enterContext(self.settings(MEDIA_ROOT=os.path.join(self.directory, "media")))
+        os.makedirs(os.path.join(self.directory, "media", "audio_files"))
+        with open(os.path.join(self.directory, "media", "audio_files", "lecture.wav"), "wb") as f:
+            f.write(make_wav())
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def import_file(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_questions", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import_rejects_bad_rows(self):
+        rows = [
+            {"type": "SST", "title": "Lecture", "answer_time_limit": 600, "transcript": SST_TRANSCRIPT,
+             "audios": [{"file": "audio_files/lecture.wav", "speaker_name": "Speaker"}]},
+            {"type": "RO", "title": "Order", "paragraphs": [
+                {"content": "B", "correct_next_order": None},
+                {"content": "A", "correct_next_order": 1},
+            ]},
+            {"type": "RMMCQ", "title": "Passage", "passage": "Text", "options": [
+                {"content": "Right", "is_correct": True}, {"content": "Wrong"},
+            ]},
+            {"type": "SST", "title": "Missing audio", "answer_time_limit": 600,
+             "audios": [{"file": "audio_files/missing.wav", "speaker_name": "Speaker"}]},
+            {"type": "RO", "title": "Loop", "paragraphs": [
+                {"content": "A", "correct_next_order": 2}, {"content": "B", "correct_next_order": 1},
+            ]},
+            {"type": "RMMCQ", "title": "String flag", "passage": "Text", "options": [
+                {"content": "Right", "is_correct": True}, {"content": "Wrong", "is_correct": "false"},
+            ]},
+            {"type": "XX", "title": "Unknown type"},
+        ]
+        path = self.write("bank.jsonl", [json.dumps(row) for row in rows] + ["{not json"])
+        rejects = os.path.join(self.directory, "rejects.jsonl")
+        out, err = self.import_file(path, "--chunk-size", "2", "--rejects", rejects)
+
+        self.assertIn("Imported 3 questions in", out)
+        self.assertIn("rejected 5 rows", out)
+        self.assertIn("Line 4: audio file audio_files/missing.wav not found", err)
+        self.assertIn("Line 6: is_correct must be true or false", err)
+        with open(rejects) as f:
+            self.assertEqual([json.loads(line)["line"] for line in f], [4, 5, 6, 7, 8])
+
+        sst = Question.objects.get(title="Lecture").sst_details
+        self.assertEqual(sst.transcript, SST_TRANSCRIPT)
+        audio = sst.audio_files.get()
+        self.assertEqual(audio.duration, 2.0)
+        self.assertEqual(len(audio.sha256), 64)
+        ro = Question.objects.get(title="Order").reorder_paragraph_details
+        self.assertEqual(list(ro.paragraphs.order_by("id").values_list("content", "correct_next_order")),
+                         [("B", None), ("A", 1)])
+        rmmcq = Question.objects.get(title="Passage").rmmcq_details
+        self.assertEqual(list(rmmcq.options.values_list("content", "is_correct")), [("Right", True), ("Wrong", False)])
+
+    def test_csv_import(self):
+        path = self.write("bank.csv", [
+            "type,title,answer_time_limit,audios,speakers,paragraphs,passage,options",
+            "SST,Lecture,600,audio_files/lecture.wav,Speaker,,,",
+            "RO,Order,,,,First|Second|Third,,",
+            'RMMCQ,Passage,,,,,"A passage, with a comma",*Right|Wrong|*Also right',
+            "RMMCQ,No correct option,,,,,Text,Wrong|Also wrong",
+        ])
+        out, err = self.import_file(path)
+        self.assertIn("Imported 3 questions in", out)
+        self.assertIn("at least one option must be correct", err)
+        ro = Question.objects.get(title="Order").reorder_paragraph_details
+        self.assertEqual(list(ro.paragraphs.order_by("id").values_list("correct_next_order", flat=True)), [2, 3, None])
+        rmmcq = Question.objects.get(title="Passage").rmmcq_details
+        self.assertEqual(rmmcq.passage, "A passage, with a comma")
+        self.assertEqual(rmmcq.options.filter(is_correct=True).count(), 2)
+
+    def test_unreadable_audio_rejects_only_its_row(self):
+        with open(os.path.join(self.directory, "media", "audio_files", "corrupt.mp3"), "wb") as f:
+            f.write(b"\xff\xfb\xf0\x00" + bytes(100))
+
+        def sst_row(title, path):
+            return json.dumps({"type": "SST", "title": title, "answer_time_limit": 600,
+                               "audios": [{"file": path, "speaker_name": "Speaker"}]})
+
+        path = self.write("bank.jsonl", [
+            sst_row("Corrupt", "audio_files/corrupt.mp3"),
+            sst_row("Outside", "../outside.mp3"),
+            sst_row("Lecture", "audio_files/lecture.wav"),
+        ])
+        inspect = importer.inspect_audio
+
+        def inspect_audio(f):
+            if f.name.endswith("lecture.wav"):
+                raise IndexError("tuple index out of range")
+            return inspect(f)
+
+        with mock.patch("pte_exam.importer.inspect_audio", inspect_audio):
+            out, err = self.import_file(path)
+        self.assertIn("Imported 1 questions in", out)
+        self.assertIn("Line 2: cannot read audio file ../outside.mp3", err)
+        self.assertIn("Line 3: cannot read audio file audio_files/lecture.wav: IndexError", err)
+        # A corrupt MP3 header is imported without a duration
+        self.assertIsNone(SSTAudioFile.objects.get(sst_question__question__title="Corrupt").duration)
+
+    def test_header_and_insert_errors_are_told_apart(self):
+        with self.assertRaisesMessage(CommandError, "CSV header is missing the columns type"):
+            self.import_file(self.write("bank.csv", ["title", "Lecture"]))
+
+        path = self.write("bank.jsonl", [json.dumps({"type": "RO", "title": "Order", "paragraphs": ["A", "B"]})])
+        with mock.patch("pte_exam.management.commands.import_questions.insert_questions",
+                        side_effect=ValueError("bad value")):
+            with self.assertRaisesMessage(ValueError, "bad value"):
+                self.import_file(path)
+
+    def test_queries_per_chunk_do_not_grow_with_rows(self):
+        def count_queries(rows):
+            path = self.write(f"bank-{rows}.jsonl", [
+                json.dumps({"type": "RO", "title": f"RO {i}", "paragraphs": ["A", "B", "C"]}) for i in range(rows)
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                self.import_file(path, "--chunk-size", "100")
+            return len(queries)
+
+        self.assertEqual(count_queries(5), count_queries(50))
+        self.assertEqual(ReorderParagraph.objects.count(), 55 * 3)
+
+
+class ExportAnswersTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.other = User.objects.create_user(username="other", password="password")
+        self.sst = create_sst_question()
+        self.ro = create_ro_question()
+        self.sst_answer = create_answer(self.user, self.sst)
+        SSTAnswer.objects.filter(answer=self.sst_answer).update(content_score=2, total_score=7)
+        self.sst_answer.record_score(7, 10)
+        self.ro_answer = create_answer(self.user, self.ro)
+        self.other_answer = create_answer(self.other, self.ro)
+        Answer.objects.filter(id=self.other_answer.id).update(created_at=timezone.now() - timedelta(days=10))
+
+    def export(self, *args):
+        out, err = StringIO(), StringIO()
+        with mock.patch("sys.stdout", out):
+            call_command("export_answers", *args, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_command_jsonl_with_filters(self):
+        out, err = self.export("--user", str(self.user.id), "--question-type", "SST")
+        rows = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["answer_id"], self.sst_answer.id)
+        self.assertEqual(rows[0]["username"], "student")
+        self.assertEqual(rows[0]["total_score"], 7)
+        self.assertEqual(rows[0]["sst_content_score"], 2)
+        self.assertIn("Exported 1 answers", err)
+
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        out, _ = self.export("--start", since)
+        self.assertEqual({json.loads(line)["answer_id"] for line in out.splitlines()}, {self.sst_answer.id, self.ro_answer.id})
+        out, _ = self.export("--end", (timezone.now() - timedelta(days=5)).date().isoformat())
+        self.assertEqual([json.loads(line)["answer_id"] for line in out.splitlines()], [self.other_answer.id])
+
+    def test_single_query_for_any_number_of_rows(self):
+        with self.assertNumQueries(1):
+            lines = list(render_export(get_export_queryset(), "csv", chunk_size=2))
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("answer_id,user_id,username"))
+
+    def test_endpoint_is_admin_only_and_streams_csv(self):
+        url = reverse("export-answers")
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        admin = User.objects.create_superuser(username="admin", password="password")
+        client.force_authenticate(admin)
+        response = client.get(url, {"export_format": "csv", "question_type": "RO"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+        self.assertEqual(client.get(url, {"start": "yesterday"}).status_code, 400)
+        self.assertEqual(client.get(url, {"export_format": "xml"}).status_code, 400)
+
+
+class AdminScalingTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username="admin", password="password")
+        self.client.force_login(self.admin)
+        self.sst = create_sst_question()
+        self.rmmcq = create_rmmcq_question()
+
+    def add_answers(self, count):
+        for i in range(count):
+            user = User.objects.create(username=f"student-{User.objects.count()}")
+            create_answer(user, self.sst)
+            create_answer(user, self.rmmcq)
+
+    def changelist_queries(self, model):
+        url = reverse(f"admin:pte_exam_{model._meta.model_name}_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_answers(2)
+        counts = [self.changelist_queries(model) for model in (Answer, SSTAnswer, ROAnswer, RMMCQAnswer)]
+        self.add_answers(6)
+        self.assertEqual([self.changelist_queries(model) for model in (Answer, SSTAnswer, ROAnswer, RMMCQAnswer)], counts)
+
+    def test_estimated_and_bounded_counts(self):
+        self.add_answers(4)
+        with mock.patch.object(pte_admin, "ADMIN_COUNT_LIMIT", 2):
+            paginator = pte_admin.EstimatedCountPaginator(Answer.objects.order_by("-id"), 100)
+            self.assertEqual(paginator.count, Answer.objects.latest("id").id)
+            paginator = pte_admin.EstimatedCountPaginator(Answer.objects.filter(question_type="SST").order_by("-id"), 100)
+            self.assertEqual(paginator.count, 2)
+        paginator = pte_admin.EstimatedCountPaginator(Answer.objects.filter(question_type="SST").order_by("-id"), 100)
+        self.assertEqual(paginator.count, 4)
+
+    def test_rmmcq_answer_form_uses_autocomplete(self):
+        self.add_answers(1)
+        rmmcq_answer = RMMCQAnswer.objects.get()
+        response = self.client.get(reverse("admin:pte_exam_rmmcqanswer_change", args=[rmmcq_answer.id]))
+        self.assertContains(response, "admin-autocomplete")
+        self.assertNotContains(response, "selectfilter")
+
+
+class MockTestTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            question = create_sst_question(f"SST {i}")
+            SSTAudioFile.objects.create(sst_question=question.sst_details, file=f"audio_files/{i}.mp3", speaker_name="Speaker")
+            create_ro_question(f"RO {i}")
+            create_rmmcq_question(f"RMMCQ {i}")
+
+    def start(self, mix):
+        response = self.client.post(reverse("mock-test-create"), {"mix": mix}, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def answer(self, mock_test, question):
+        if question["question_type"] == "SST":
+            answer = "A summary."
+        elif question["question_type"] == "RO":
+            answer = list(range(1, len(question["paragraphs"]) + 1))
+        else:
+            answer = [question["options"][0]["id"]]
+        return self.client.post(
+            reverse("mock-test-answer", args=[mock_test["id"]]),
+            {"question_id": question["id"], "answer": answer}, format="json",
+        )
+
+    def test_create_freezes_questions_with_full_payloads(self):
+        data = self.start({"SST": 2, "RO": 1, "RMMCQ": 1})
+        sections = data["sections"]
+        self.assertEqual([section["question_type"] for section in sections], ["SST", "RO", "RMMCQ"])
+        self.assertEqual([section["status"] for section in sections], ["open", "pending", "pending"])
+        self.assertEqual(sections[0]["time_limit"], 1200)  # Two SST questions of 600 seconds
+        self.assertEqual(sections[1]["time_limit"], 150)
+        self.assertEqual(len(sections[0]["items"][0]["question"]["audios"]), 1)
+        self.assertEqual(len(sections[1]["items"][0]["question"]["paragraphs"]), 4)
+        self.assertNotIn("is_correct", sections[2]["items"][0]["question"]["options"][0])
+
+    def test_detail_query_count_does_not_grow_with_questions(self):
+        def detail_queries(mix):
+            mock_test = self.start(mix)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse("mock-test-detail", args=[mock_test["id"]]))
+            return len(queries)
+
+        self.assertEqual(detail_queries({"SST": 1, "RO": 1, "RMMCQ": 1}), detail_queries({"SST": 3, "RO": 3, "RMMCQ": 3}))
+
+    def test_sections_run_in_order(self):
+        data = self.start({"RO": 2, "RMMCQ": 1})
+        ro_items = data["sections"][0]["items"]
+        rmmcq_question = data["sections"][1]["items"][0]["question"]
+
+        response = self.answer(data, rmmcq_question)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("not started", str(response.data))
+
+        self.assertEqual(self.answer(data, ro_items[0]["question"]).status_code, 201)
+        self.assertIn("already been answered", str(self.answer(data, ro_items[0]["question"]).data))
+        self.assertEqual(self.answer(data, ro_items[1]["question"]).status_code, 201)
+
+        # Answering every question of a section opens the next one
+        data = self.client.get(reverse("mock-test-detail", args=[data["id"]])).data
+        self.assertEqual([section["status"] for section in data["sections"]], ["closed", "open"])
+        self.assertTrue(all(item["answered"] for item in data["sections"][0]["items"]))
+
+        self.assertEqual(self.answer(data, rmmcq_question).status_code, 201)
+        data = self.client.get(reverse("mock-test-detail", args=[data["id"]])).data
+        self.assertEqual(data["status"], "completed")
+        self.assertEqual(MockTestItem.objects.filter(answer__isnull=False).count(), 3)
+
+    def test_concurrent_answer_to_the_same_item_is_rejected(self):
+        data = self.start({"RO": 2})
+        question = data["sections"][0]["items"][0]["question"]
+        other_answer = create_answer(self.user, Question.objects.get(id=question["id"]))
+        get_open_item = mock_tests.get_open_item
+
+        def answered_meanwhile(mock_test, question_id):
+            # Another request claims the item after this one found it open
+            item = get_open_item(mock_test, question_id)
+            MockTestItem.objects.filter(pk=item.pk).update(answer=other_answer)
+            return item
+
+        with mock.patch("pte_exam.views.get_open_item", answered_meanwhile):
+            response = self.answer(data, question)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already been answered", str(response.data))
+        # The losing submission's answer is rolled back
+        self.assertEqual(list(Answer.objects.filter(user=self.user)), [other_answer])
+
+    def test_questions_are_picked_from_the_cached_ids(self):
+        self.start({"RO": 1})
+        with CaptureQueriesContext(connection) as queries:
+            mock_test = mock_tests.create_mock_test(self.user, {"RO": 2, "SST": 1})
+        self.assertFalse(any("ORDER BY RAND" in query["sql"].upper() for query in queries.captured_queries))
+        self.assertEqual(MockTestItem.objects.filter(section__mock_test=mock_test).values("question").distinct().count(), 3)
+
+    def test_deadline_is_enforced(self):
+        data = self.start({"SST": 1, "RO": 1})
+        MockTestSection.objects.filter(mock_test_id=data["id"], position=1).update(
+            started_at=timezone.now() - timedelta(seconds=601 + 5)
+        )
+        response = self.answer(data, data["sections"][0]["items"][0]["question"])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("time limit", str(response.data))
+
+        data = self.client.get(reverse("mock-test-detail", args=[data["id"]])).data
+        self.assertEqual([section["status"] for section in data["sections"]], ["closed", "open"])
+        self.assertEqual(self.answer(data, data["sections"][1]["items"][0]["question"]).status_code, 201)
+
+    def test_next_section_starts_when_previous_ends(self):
+        data = self.start({"SST": 1, "RO": 1, "RMMCQ": 1})
+        started_at = timezone.now() - timedelta(seconds=600 + 100)
+        MockTestSection.objects.filter(mock_test_id=data["id"], position=1).update(started_at=started_at)
+        self.client.get(reverse("mock-test-detail", args=[data["id"]]))
+        sections = list(MockTestSection.objects.filter(mock_test_id=data["id"]).order_by("position"))
+        # The RO section started at the SST deadline, not at this request
+        self.assertEqual(sections[0].ended_at, started_at + timedelta(seconds=600))
+        self.assertEqual(sections[1].started_at, sections[0].ended_at)
+
+        # A section whose whole time passed before the next request is closed too
+        MockTestSection.objects.filter(id=sections[0].id).update(
+            started_at=started_at - timedelta(seconds=150), ended_at=started_at + timedelta(seconds=450)
+        )
+        MockTestSection.objects.filter(id=sections[1].id).update(started_at=None)
+        data = self.client.get(reverse("mock-test-detail", args=[data["id"]])).data
+        self.assertEqual([section["status"] for section in data["sections"]], ["closed", "closed", "open"])
+
+    def test_invalid_requests(self):
+        response = self.client.post(reverse("mock-test-create"), {"mix": {"RO": 4}}, format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse("mock-test-create"), {"mix": {"XX": 1}}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        data = self.start({"RO": 1})
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="password"))
+        self.assertEqual(other.get(reverse("mock-test-detail", args=[data["id"]])).status_code, 404)
+
+
+class NextQuestionTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.questions = [create_ro_question(f"RO {i}") for i in range(3)]
+        create_rmmcq_question()
+        self.url = reverse("next-question")
+
+    def next_question(self):
+        return self.client.get(self.url, {"question_type": "RO"})
+
+    def submit(self, question):
+        response = self.client.post(reverse("submit-answer"), {"question_id": question.id, "answer": [1, 2, 3, 4]}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_returns_only_unseen_questions(self):
+        create_answer(self.user, self.questions[0])
+        create_answer(self.user, self.questions[1])
+        for _ in range(10):
+            response = self.next_question()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["id"], self.questions[2].id)
+            self.assertEqual(len(response.data["paragraphs"]), 4)
+
+    def test_submission_updates_seen_set(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(self.questions[0])
+        self.assertIn(self.next_question().data["id"], {q.id for q in self.questions[1:]})
+
+        # Seen set and id index are now cached; new submissions update the set
+        for question in self.questions[1:]:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.submit(question)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.next_question().status_code, 404)
+
+    def test_seen_set_is_invalidated_when_its_lock_is_held(self):
+        self.next_question()
+        lock_key = seen_questions_lock_key(self.user.id, "RO")
+        cache.add(lock_key, 1)
+        with mock.patch("pte_exam.next_question.SEEN_LOCK_WAIT", 0), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.submit(self.questions[0])
+        cache.delete(lock_key)
+        # Rebuilt from Answer, so the submission is not lost
+        for _ in range(10):
+            self.assertNotEqual(self.next_question().data["id"], self.questions[0].id)
+
+    def test_cached_pick_runs_no_queries(self):
+        self.next_question()
+        self.next_question()
+        self.next_question()
+        # Every question's payload is cached after a few picks
+        for question in self.questions:
+            self.client.get(reverse("question-detail", args=[question.id]))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.next_question().status_code, 200)
+        # The id list is kept unpickled while its version holds
+        self.assertIs(get_question_ids("RO"), get_question_ids("RO"))
+
+    def test_new_questions_join_the_index(self):
+        for question in self.questions:
+            create_answer(self.user, question)
+        self.assertEqual(self.next_question().status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            question = create_ro_question("New RO")
+        self.assertEqual(self.next_question().data["id"], question.id)
+
+    def test_question_type_is_required(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+
+class RescoreTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.ro = create_ro_question(paragraphs=4)
+        self.rmmcq = create_rmmcq_question(correct=2, incorrect=2)
+        self.answers = [create_answer(self.user, self.ro) for _ in range(3)] + [create_answer(self.user, self.rmmcq)]
+        for answer in self.answers[:3]:
+            answer.ro_answer_details.calculate_score()
+        self.answers[3].rmmcq_answer_details.calculate_score()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, "rescore.json")
+
+    def rescore(self, *args):
+        out = StringIO()
+        call_command("rescore", "--workers", "1", "--checkpoint", self.checkpoint, *args, stdout=out)
+        return out.getvalue()
+
+    def test_answer_scored_during_rescore_counts_once(self):
+        answer = create_answer(self.user, create_sst_question())
+        score_sst = rescoring.SCORERS["SST"]
+
+        def score_while_worker_scores(sst_answers):
+            # The scoring worker scores the pending answer after the chunk was loaded
+            SSTAnswer.objects.select_related("answer", "question").get(id=sst_answers[0].id).calculate_score()
+            return score_sst(sst_answers)
+
+        with mock.patch.dict(rescoring.SCORERS, {"SST": score_while_worker_scores}):
+            self.rescore("--type", "SST")
+        progress = UserProgress.objects.get(user=self.user, question_type="SST")
+        self.assertEqual(progress.answer_count, 1)
+        bucket = ScoreHistogramBucket.get_bucket(Answer.objects.get(id=answer.id).total_score, 10)
+        self.assertEqual(ScoreHistogramBucket.objects.get(question=answer.question, bucket=bucket).count, 1)
+
+    def test_default_workers_follow_the_database(self):
+        out = StringIO()
+        # The default SQLite profile cannot take parallel writers, so one worker is used
+        with mock.patch("pte_exam.rescoring.os.cpu_count", return_value=4):
+            call_command("rescore", "--checkpoint", self.checkpoint, stdout=out)
+        self.assertIn("RO: rescored 3 answers", out.getvalue())
+
+    def test_corrected_answer_keys_are_rescored(self):
+        # The correct order becomes 1, 2, 4, 3
+        paragraphs = list(self.ro.reorder_paragraph_details.paragraphs.order_by("id"))
+        with self.captureOnCommitCallbacks(execute=True):
+            for paragraph, next_order in zip(paragraphs, [2, 4, None, 3]):
+                paragraph.correct_next_order = next_order
+                paragraph.save()
+            option = self.rmmcq.rmmcq_details.options.get(content="Correct 0")
+            option.is_correct = False
+            option.save()
+
+        out = self.rescore("--chunk-size", "2")
+        self.assertIn("RO: rescored 3 answers", out)
+        self.assertIn("3 scores changed", out)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        self.assertEqual({answer.total_score for answer in Answer.objects.filter(question=self.ro)}, {1})
+        self.assertEqual(ROAnswer.objects.filter(total_score=1).count(), 3)
+        # One correct and one now incorrect option selected
+        self.assertEqual(Answer.objects.get(question=self.rmmcq).get_score_summary(),
+                         {"score": 0, "max_score": 1, "status": "scored"})
+        progress = {row.question_type: row for row in UserProgress.objects.filter(user=self.user)}
+        self.assertEqual((progress["RO"].answer_count, progress["RO"].score_sum), (3, 3))
+        self.assertEqual((progress["RMMCQ"].answer_count, progress["RMMCQ"].score_sum), (1, 0))
+        # Best scores follow the lowered scores
+        self.assertEqual((progress["RO"].best_score, progress["RMMCQ"].best_score), (1, 0))
+
+        # Rescoring again changes nothing
+        self.assertIn("0 scores changed", self.rescore("--type", "RO"))
+
+    def test_sst_answers_are_scored(self):
+        question = create_sst_question()
+        question.sst_details.transcript = SST_TRANSCRIPT
+        question.sst_details.save()
+        answer = create_answer(self.user, question)
+        SSTAnswer.objects.filter(answer=answer).update(text=SST_SUMMARY)
+        self.rescore("--type", "SST", "--question", str(question.id))
+        answer.refresh_from_db()
+        self.assertEqual(answer.get_score_summary(), {"score": 10, "max_score": 10, "status": "scored"})
+        self.assertEqual(answer.sst_answer_details.content_score, 2)
+
+    def test_resumes_from_checkpoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for paragraph in ReorderParagraph.objects.filter(reorder_question__question=self.ro):
+                paragraph.correct_next_order = None
+                paragraph.save()
+        first, *rest = ROAnswer.objects.order_by("id").values_list("id", flat=True)
+        with open(self.checkpoint, "w") as f:
+            json.dump({"selection": {"types": ["RO"], "questions": []}, "done": {"RO": first}}, f)
+        self.rescore("--type", "RO")
+        # The chunk before the checkpoint is not scored again
+        self.assertEqual(ROAnswer.objects.get(id=first).total_score, 3)
+        self.assertEqual(set(ROAnswer.objects.filter(id__in=rest).values_list("total_score", flat=True)), {0})
+
+        with open(self.checkpoint, "w") as f:
+            json.dump({"selection": {"types": ["SST"], "questions": []}, "done": {}}, f)
+        with self.assertRaises(CommandError):
+            self.rescore("--type", "RO")
+
+
+class ScoreHistogramTests(PTETestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ro = create_ro_question(paragraphs=3)
+        self.other_ro = create_ro_question(title="Other RO", paragraphs=5)
+        self.users = [User.objects.create_user(username=f"student{i}", password="password") for i in range(4)]
+        self.client = APIClient()
+
+    def submit(self, user, question, answer):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse("submit-answer"), {"question_id": question.id, "answer": answer}, format="json")
+
+    def test_percentiles_in_submit_response_and_history(self):
+        # Scores 0, 1 and 2 out of 2 on the first question, 4 out of 4 on the other
+        self.submit(self.users[0], self.ro, [3, 2, 1])
+        self.submit(self.users[1], self.ro, [2, 3, 1])
+        self.submit(self.users[2], self.other_ro, [1, 2, 3, 4, 5])
+        response = self.submit(self.users[3], self.ro, [1, 2, 3])
+        # Above two of three answers to the question, and two of four RO answers plus a tie
+        self.assertEqual(response.data["data"]["percentile"], {"question": 83.3, "question_type": 75.0})
+
+        self.client.force_authenticate(self.users[0])
+        entry = self.client.get(reverse("practice-history")).data["results"][0]
+        self.assertEqual(entry["percentile"], {"question": 16.7, "question_type": 12.5})
+
+    def test_pending_answers_have_no_percentile(self):
+        response = self.submit(self.users[0], create_sst_question(), "Summary")
+        self.assertIsNone(response.data["data"]["percentile"])
+
+    def test_rescoring_moves_the_answer_between_buckets(self):
+        answer = create_answer(self.users[0], self.ro)
+        answer.ro_answer_details.calculate_score()
+        answer.record_score(0, 2)
+        counts = dict(ScoreHistogramBucket.objects.filter(question=self.ro).values_list("bucket", "count"))
+        self.assertEqual(counts, {0: 1, 100: 0})
+
+    def test_rebuild_matches_incremental_histograms(self):
+        for user, order in zip(self.users, ([3, 2, 1], [2, 3, 1], [1, 2, 3], [1, 2, 3])):
+            self.submit(user, self.ro, order)
+        self.submit(self.users[0], self.other_ro, [1, 2, 4, 3, 5])
+        self.submit(self.users[0], create_rmmcq_question(correct=3, incorrect=1), [])
+
+        def histograms():
+            return set(ScoreHistogramBucket.objects.filter(count__gt=0).values_list(
+                "question_type", "question_id", "bucket", "count"))
+
+        incremental = histograms()
+        call_command("rebuild_score_histograms", stdout=StringIO())
+        self.assertEqual(histograms(), incremental)
+        # Migrating builds the same buckets for answers scored before 0015
+        ScoreHistogramBucket.objects.all().delete()
+        import_module("pte_exam.migrations.0015_scorehistogrambucket").backfill_histograms(apps, None)
+        self.assertEqual(histograms(), incremental)
+        self.assertIn(("RO", None, 100, 2), incremental)
+        # 1 of 4 correct pairs
+        self.assertIn(("RO", self.other_ro.id, 25, 1), incremental)
+
+    def test_counts_for_many_questions(self):
+        questions = Question.objects.bulk_create(
+            [Question(title=f"RO {index}", question_type="RO") for index in range(1100)])
+        counts = {("RO", question.id, index % 3 * 50): 1 for index, question in enumerate(questions)}
+        counts[("RO", None, 50)] = 2
+        ScoreHistogramBucket.add_counts(counts)
+        # The second pass only updates the rows the first one created
+        ScoreHistogramBucket.add_counts(counts)
+        rows = ScoreHistogramBucket.objects.filter(question__in=questions)
+        self.assertEqual(rows.count(), 1100)
+        self.assertEqual(set(rows.values_list("count", flat=True)), {2})
+        self.assertEqual(ScoreHistogramBucket.objects.get(question=None, question_type="RO", bucket=50).count, 4)
+
+    def test_percentile_rank(self):
+        histogram = [0] * ScoreHistogramBucket.BUCKETS
+        histogram[0], histogram[50], histogram[100] = 1, 2, 1
+        self.assertEqual(ScoreHistogramBucket.percentile_rank(histogram, 50), 50.0)
+        self.assertEqual(ScoreHistogramBucket.percentile_rank(histogram, 100), 87.5)
+        self.assertIsNone(ScoreHistogramBucket.percentile_rank(None, 0))
+
+
+class QuestionSearchTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("question-search")
+        # Questions are reindexed once their transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ro = create_ro_question("Volcano eruptions")
+            self.rmmcq = create_rmmcq_question("Ocean currents")
+            option = self.rmmcq.rmmcq_details.options.first()
+            option.content = "Volcanic islands are formed by eruptions"
+            option.save()
+            self.sst = create_sst_question("Climate lecture")
+            self.sst.sst_details.transcript = SST_TRANSCRIPT
+            self.sst.sst_details.save()
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ranks_title_matches_first(self):
+        data = self.search(q="eruption")
+        # Stemming matches both, but the title weighs more than the option
+        self.assertEqual([result["id"] for result in data["results"]], [self.ro.id, self.rmmcq.id])
+        self.assertIn("<mark>eruptions</mark>", data["results"][1]["snippet"])
+        self.assertIsNone(data["next"])
+
+    def test_filters_by_type_and_matches_prefixes(self):
+        data = self.search(q="volc", question_type="RMMCQ,SST")
+        self.assertEqual([result["id"] for result in data["results"]], [self.rmmcq.id])
+        self.assertEqual(self.client.get(self.url, {"q": "volcano", "question_type": "XYZ"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"q": "  \"*"}).status_code, 400)
+
+    def test_index_follows_content_changes(self):
+        self.assertEqual(self.search(q="paragraph")["results"][0]["id"], self.ro.id)
+        paragraph = ReorderParagraph.objects.filter(reorder_question__question=self.ro).first()
+        paragraph.content = "Magma chambers"
+        with self.captureOnCommitCallbacks(execute=True):
+            paragraph.save()
+        self.assertEqual(len(self.search(q="magma")["results"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rmmcq.delete()
+        self.assertEqual([result["id"] for result in self.search(q="volcano")["results"]], [self.ro.id])
+
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.search(q="magma")["results"][0]["id"], self.ro.id)
+
+    def test_pagination(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                create_ro_question(f"Glacier {index}")
+        data = self.search(q="glacier", page_size=2)
+        self.assertEqual(len(data["results"]), 2)
+        data = self.client.get(data["next"]).data
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNone(data["next"])
+        self.assertIsNotNone(data["previous"])
+
+    def test_deleting_a_question_reindexes_it_once(self):
+        question_id = self.ro.id
+        with mock.patch("pte_exam.signals.index_questions") as index_questions:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.ro.delete()
+        # Cascaded paragraph and details deletes leave it to the Question
+        index_questions.assert_called_once_with({question_id})
+
+        with mock.patch("pte_exam.signals.index_questions") as index_questions:
+            with self.captureOnCommitCallbacks(execute=True):
+                for option in self.rmmcq.rmmcq_details.options.all():
+                    option.content = "Glacier"
+                    option.save()
+        # Four option saves in one transaction index the question once
+        index_questions.assert_called_once_with({self.rmmcq.id})
+
+    def test_admin_search_lists_matches_by_relevance(self):
+        client = Client()
+        client.force_login(User.objects.create_superuser(username="admin", password="password"))
+        url = reverse("admin:pte_exam_question_changelist")
+        response = client.get(url, {"q": "eruption"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.ro, self.rmmcq])
+        self.assertNotContains(response, "best matches are listed")
+
+        with mock.patch.object(pte_admin, "ADMIN_SEARCH_LIMIT", 1):
+            response = client.get(url, {"q": "eruption"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.ro])
+        self.assertContains(response, "Only the 1 best matches are listed")
+
+
+class AdmissionControlTests(PTETestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="student", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("submit-answer")
+        self.ro = create_ro_question(paragraphs=3)
+        self.sst = create_sst_question()
+
+    def submit(self, question, answer):
+        return self.client.post(self.url, {"question_id": question.id, "answer": answer}, format="json")
+
+    @override_settings(ADMISSION_CONTROL={"USER_RATE": 0.1, "USER_BURST": 2})
+    def test_user_bucket_returns_429(self):
+        for _ in range(2):
+            self.assertEqual(self.submit(self.ro, [1, 2, 3]).status_code, 201)
+        response = self.submit(self.ro, [1, 2, 3])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "10")
+
+        # Another user has a bucket of their own
+        self.client.force_authenticate(User.objects.create_user(username="other", password="password"))
+        self.assertEqual(self.submit(self.ro, [1, 2, 3]).status_code, 201)
+
+    @override_settings(ADMISSION_CONTROL={"GLOBAL_RATE": 1, "GLOBAL_BURST": 1})
+    def test_global_bucket_returns_503(self):
+        self.assertEqual(self.submit(self.ro, [1, 2, 3]).status_code, 201)
+        response = self.submit(self.ro, [1, 2, 3])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    @override_settings(ADMISSION_CONTROL={"USER_IN_FLIGHT": 1})
+    def test_in_flight_limit(self):
+        with admission.admit(self.user.id):
+            response = self.submit(self.ro, [1, 2, 3])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.submit(self.ro, [1, 2, 3]).status_code, 201)
+
+    @override_settings(ADMISSION_CONTROL={"MAX_SST_BACKLOG": 1, "BACKLOG_RETRY_AFTER": 30, "BACKLOG_CHECK_INTERVAL": 0})
+    def test_sst_is_shed_while_scoring_is_behind(self):
+        for _ in range(2):
+            self.assertEqual(self.submit(self.sst, "Summary").status_code, 201)
+        response = self.submit(self.sst, "Summary")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(ScoringJob.objects.count(), 2)
+        # Other question types are still accepted
+        self.assertEqual(self.submit(self.ro, [1, 2, 3]).status_code, 201)
+
+        ScoringJob.objects.update(status="done")
+        self.assertEqual(self.submit(self.sst, "Summary").status_code, 201)
+
+    @override_settings(ADMISSION_CONTROL={"MAX_SST_BACKLOG": 0, "BACKLOG_RETRY_AFTER": 30, "BACKLOG_CHECK_INTERVAL": 0})
+    def test_mock_test_answers_are_admitted(self):
+        create_answer(self.user, self.sst)
+        ScoringJob.objects.create(sst_answer=SSTAnswer.objects.get())
+        response = self.client.post(reverse("mock-test-create"), {"mix": {"SST": 1}}, format="json")
+        url = reverse("mock-test-answer", args=[response.data["id"]])
+        response = self.client.post(url, {"question_id": self.sst.id, "answer": "Summary"}, format="json")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertFalse(MockTestItem.objects.filter(answer__isnull=False).exists())
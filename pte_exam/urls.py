@@ -1,12 +1,28 @@
 from django.urls import path
 from . import views  # import views from your app
+from . import async_views
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
     path('questions/', views.QuestionListView.as_view(), name='question-list'),
+    path('questions/next/', views.NextQuestionView.as_view(), name='next-question'),
+    path('questions/search/', views.QuestionSearchView.as_view(), name='question-search'),
     path('questions/<int:pk>/', views.QuestionDetailView.as_view(), name='question-detail'),
     path('submit-answer/', views.SubmitAnswerView.as_view(), name='submit-answer'),
+    path('submit-answers/', views.BatchSubmitAnswerView.as_view(), name='submit-answers'),
     path("practice-history/", views.PracticeHistoryView.as_view(), name="practice-history"),
+    path("progress/", views.ProgressView.as_view(), name="progress"),
+    path('mock-tests/', views.MockTestCreateView.as_view(), name='mock-test-create'),
+    path('mock-tests/<int:pk>/', views.MockTestDetailView.as_view(), name='mock-test-detail'),
+    path('mock-tests/<int:pk>/answers/', views.MockTestAnswerView.as_view(), name='mock-test-answer'),
+    path("scoring-queue/", views.ScoringQueueView.as_view(), name="scoring-queue"),
+    path('audio/<int:pk>/', views.stream_audio_file, name='audio-file'),
+    path('export/answers/', views.AnswerExportView.as_view(), name='export-answers'),
+
+    # Async read path for ASGI deployments
+    path('async/questions/', async_views.question_list, name='async-question-list'),
+    path('async/questions/<int:pk>/', async_views.question_detail, name='async-question-detail'),
+    path('async/practice-history/', async_views.practice_history, name='async-practice-history'),
 
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -1,17 +1,92 @@
+import hashlib
+import mimetypes
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition, require_http_methods
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from rest_framework import generics, status
 from .models import Question
 from .serializers import *
-from rest_framework.exceptions import NotFound
+from .cache import (
+    QUESTION_DETAIL_CACHE_TIMEOUT,
+    get_question_type_version,
+    get_question_version,
+    question_detail_cache_key,
+    version_to_datetime,
+)
+from .tasks import get_queue_depth
+from .admission import admission
+from .audio import parse_range, read_range
+from .exporter import EXPORT_FORMATS, get_export_queryset, render_export
+from .next_question import pick_unseen_question
+from .search import search_questions, to_match_query
+from .mock_tests import MockTestError, advance, create_mock_test, get_open_item, mock_test_queryset, record_answer
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 # from .tasks import add
 
+def get_renderer_format(request):
+    # Plain Django (async) views always render JSON
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer.format if renderer else 'json'
+
+
+def question_list_types(request):
+    question_type = request.GET.get('question_type', None)
+    if question_type is not None:
+        return [question_type]
+    return [question_type for question_type, _ in Question.QUESTION_TYPES]
+
+
+def question_list_versions(request):
+    return [get_question_type_version(question_type) for question_type in question_list_types(request)]
+
+
+def make_question_list_etag(request, versions):
+    """
+    Strong ETag of a question list page, built from the per-type versions and
+    the query string without touching the database.
+    """
+    query = request.GET.urlencode()
+    renderer = get_renderer_format(request)
+    return hashlib.sha256(f"list:{renderer}:{query}:{versions}".encode()).hexdigest()[:32]
+
+
+def make_question_detail_etag(request, pk, version):
+    return f"question-{pk}-{get_renderer_format(request)}-{version}"
+
+
+def question_list_etag(request, *args, **kwargs):
+    return make_question_list_etag(request, question_list_versions(request))
+
+
+def question_list_last_modified(request, *args, **kwargs):
+    return version_to_datetime(max(question_list_versions(request)))
+
+
+def question_detail_etag(request, pk, *args, **kwargs):
+    return make_question_detail_etag(request, pk, get_question_version(pk))
+
+
+def question_detail_last_modified(request, pk, *args, **kwargs):
+    return version_to_datetime(get_question_version(pk))
+
+
+@method_decorator(condition(etag_func=question_list_etag, last_modified_func=question_list_last_modified), name='get')
 class QuestionListView(generics.ListAPIView):
     # print(add.delay(3, 5))
 
-    queryset = Question.objects.all()
+    queryset = Question.objects.order_by('id')
     serializer_class = QuestionSerializer
 
     def get_queryset(self):
@@ -26,37 +101,216 @@ class QuestionListView(generics.ListAPIView):
         return queryset
     
 
+@method_decorator(condition(etag_func=question_detail_etag, last_modified_func=question_detail_last_modified), name='get')
 class QuestionDetailView(generics.RetrieveAPIView):
-    queryset = Question.objects.all()
+    # Load a question and all of its typed content in one prefetched pass
+    queryset = Question.objects.select_related(
+        'sst_details', 'reorder_paragraph_details', 'rmmcq_details'
+    ).prefetch_related(
+        'sst_details__audio_files',
+        Prefetch('reorder_paragraph_details__paragraphs', queryset=ReorderParagraph.objects.order_by('id')),
+        'rmmcq_details__options',
+    )
     serializer_class = QuestionDetailSerializer
 
     def get_object(self):
         question_id = self.kwargs.get('pk')
         try:
-            return Question.objects.get(id=question_id)
+            return self.get_queryset().get(id=question_id)
         except Question.DoesNotExist:
             raise NotFound("Question not found")
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the serialized question from the cache, building it on a miss.
+        """
+        cache_key = question_detail_cache_key(self.kwargs.get('pk'))
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
+            cache.set(cache_key, data, QUESTION_DETAIL_CACHE_TIMEOUT)
+        return Response(data)
+
+    @classmethod
+    def get_cached_data(cls, request, question_id):
+        """
+        Return the detail payload of a question, or raise NotFound.
+        """
+        view = cls(request=request, args=(), kwargs={'pk': question_id}, format_kwarg=None)
+        return view.retrieve(request).data
+
+
+class NextQuestionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Return a random question of `question_type` the user has not answered
+        yet, in the question detail format.
+        """
+        question_type = request.query_params.get('question_type')
+        if question_type not in Question.DETAILS_RELATED_NAMES:
+            raise ValidationError({"question_type": f"Must be one of {', '.join(Question.DETAILS_RELATED_NAMES)}."})
+
+        question_id = pick_unseen_question(request.user.id, question_type)
+        if question_id is None:
+            raise NotFound("No unanswered questions of this type are left.")
+        return Response(QuestionDetailView.get_cached_data(request, question_id))
+
+
+class QuestionSearchView(APIView):
+    page_size = 10
+    max_page_size = 50
+
+    def get(self, request):
+        """
+        Rank the questions matching every word of `q` by relevance, optionally
+        restricted to `question_type` (repeated or comma separated). Each
+        result carries a snippet of the match with the terms in <mark> tags.
+        """
+        text = request.query_params.get('q', '')
+        if to_match_query(text) is None:
+            raise ValidationError({"q": "Enter at least one word to search for."})
+        question_types = [
+            question_type
+            for value in request.query_params.getlist('question_type')
+            for question_type in value.split(',') if question_type
+        ]
+        if set(question_types) - set(Question.DETAILS_RELATED_NAMES):
+            raise ValidationError({"question_type": f"Must be one of {', '.join(Question.DETAILS_RELATED_NAMES)}."})
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            raise ValidationError({"page": "page and page_size must be integers."})
+        if page < 1 or page_size < 1:
+            raise ValidationError({"page": "page and page_size must be positive."})
+
+        # One extra row tells whether there is a next page without a COUNT(*)
+        matches = search_questions(text, question_types, limit=page_size + 1, offset=(page - 1) * page_size)
+        questions = Question.objects.in_bulk([question_id for question_id, _ in matches[:page_size]])
+        results = []
+        for question_id, snippet in matches[:page_size]:
+            if question_id in questions:
+                results.append({**QuestionSerializer(questions[question_id]).data, "snippet": snippet})
+
+        url = request.build_absolute_uri()
+        if page == 1:
+            previous_url = None
+        elif page == 2:
+            previous_url = remove_query_param(url, 'page')
+        else:
+            previous_url = replace_query_param(url, 'page', page - 1)
+        return Response({
+            "next": replace_query_param(url, 'page', page + 1) if len(matches) > page_size else None,
+            "previous": previous_url,
+            "results": results,
+        })
+
+
+# Audio URLs carry the file's hash (see SSTAudioFileSerializer), so a response
+# for the current hash never changes. Other requests must revalidate.
+AUDIO_IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+AUDIO_CACHE_CONTROL = 'public, no-cache'
+
+
+@require_http_methods(['GET', 'HEAD'])
+def stream_audio_file(request, pk):
+    """
+    Stream an SST audio file in chunks, honouring single `Range` requests.
+    """
+    audio_file = SSTAudioFile.objects.filter(id=pk).only('file', 'size', 'sha256').first()
+    if audio_file is None or not audio_file.file:
+        raise Http404("Audio file not found")
+
+    etag = f'"{audio_file.sha256}"' if audio_file.sha256 else None
+    immutable = bool(audio_file.sha256) and request.GET.get('v') == audio_file.sha256[:16]
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': AUDIO_IMMUTABLE_CACHE_CONTROL if immutable else AUDIO_CACHE_CONTROL,
+    }
+    if etag:
+        headers['ETag'] = etag
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            for header, value in headers.items():
+                response[header] = value
+            return response
+
+    storage = audio_file.file.storage
+    try:
+        f = storage.open(audio_file.file.name, 'rb')
+    except FileNotFoundError:
+        raise Http404("Audio file not found")
+    size = audio_file.size if audio_file.size is not None else storage.size(audio_file.file.name)
+
+    # A Range whose If-Range validator no longer matches gets the whole file
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or (etag and if_range == etag):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            f.close()
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    headers['Content-Type'] = mimetypes.guess_type(audio_file.file.name)[0] or 'application/octet-stream'
+    headers['Content-Length'] = str(end - start + 1)
+    if byte_range:
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    status_code = 206 if byte_range else 200
+
+    if request.method == 'HEAD':
+        f.close()
+        return HttpResponse(status=status_code, headers=headers)
+    return StreamingHttpResponse(read_range(f, start, end), status=status_code, headers=headers)
+
+
+def get_submission_data(answer, percentiles):
+    """
+    Build the response entry for a submitted typed answer. `percentiles`
+    comes from ScoreHistogramBucket.get_percentiles().
+    """
+    data = {
+        "id": answer.answer.id,
+        "question_id": answer.question.question.id,
+        "question_type": answer.question.question.question_type,
+        "question_type_display": answer.question.question.get_question_type_display(),
+    }
+    if answer.question.question.question_type != "SST":
+        data["score_components"] = answer.get_score_components()
+    data["percentile"] = percentiles.get(answer.answer.id)
+    return data
+
+
+def get_submissions_data(answers):
+    percentiles = ScoreHistogramBucket.get_percentiles([answer.answer for answer in answers])
+    return [get_submission_data(answer, percentiles) for answer in answers]
+
 
 class SubmitAnswerView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        # Over its limits, a submission is turned away before touching the database
+        with admission.admit(request.user.id):
+            return self.submit(request)
+
+    def submit(self, request):
         # Create the serializer with the request data
         serializer = SubmitAnswerSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
+            if serializer.validated_data['question'].question_type == "SST":
+                admission.check_sst_backlog()
             # If the data is valid, save the answer and return the response
             answer = serializer.save()
             message = ""
-            data = {
-                "id": answer.answer.id,
-                "question_id": answer.question.question.id,
-                "question_type": answer.question.question.question_type,
-                "question_type_display": answer.question.question.get_question_type_display(),
-            }
+            data = get_submissions_data([answer])[0]
             if answer.question.question.question_type != "SST":
-                data["score_components"] = answer.get_score_components()
                 message =  "Answer submitted successfully."
             else:
                 message =  "Answer submitted successfully. Your score will be available soon."
@@ -67,7 +321,318 @@ class SubmitAnswerView(APIView):
             }, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
+
+
+class BatchSubmitAnswerView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Submit a list of `{question_id, answer}` items in one request. Either
+        every answer is saved or none is.
+        """
+        items = request.data.get('answers') if isinstance(request.data, dict) else None
+        with admission.admit(request.user.id, cost=len(items) if isinstance(items, list) else 1):
+            return self.submit(request)
+
+    def submit(self, request):
+        serializer = BatchSubmitAnswerSerializer(data=request.data, context={'request': request})
+
+        if serializer.is_valid():
+            if any(question.question_type == "SST" for question in serializer.questions.values()):
+                admission.check_sst_backlog()
+            answers = serializer.save()
+            message = "Answers submitted successfully."
+            if any(answer.question.question.question_type == "SST" for answer in answers):
+                message += " SST scores will be available soon."
+
+            return Response({
+                "message": message,
+                "data": get_submissions_data(answers)
+            }, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MockTestCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Start a mock test with `mix` questions of each type, e.g.
+        {"mix": {"SST": 1, "RO": 2, "RMMCQ": 2}}, and return every question.
+        """
+        try:
+            mock_test = create_mock_test(request.user, request.data.get('mix'))
+        except MockTestError as e:
+            raise ValidationError({"mix": str(e)})
+        mock_test = mock_test_queryset().get(id=mock_test.id)
+        return Response(MockTestSerializer(mock_test).data, status=status.HTTP_201_CREATED)
+
+
+class MockTestDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_mock_test(self, request, pk):
+        mock_test = mock_test_queryset().filter(id=pk, user=request.user).first()
+        if mock_test is None:
+            raise NotFound("Mock test not found")
+        return mock_test
+
+    def get(self, request, pk):
+        mock_test = self.get_mock_test(request, pk)
+        # Close out sections whose time ran out since the last request
+        advance(mock_test)
+        return Response(MockTestSerializer(mock_test).data)
+
+
+class MockTestAnswerView(MockTestDetailView):
+    def post(self, request, pk):
+        """
+        Submit `{question_id, answer}` for a question of the open section.
+        """
+        # Mock tests are the exam-day spike, so they are admitted like any submission
+        with admission.admit(request.user.id):
+            return self.submit(request, pk)
+
+    def submit(self, request, pk):
+        with transaction.atomic():
+            mock_test = self.get_mock_test(request, pk)
+            serializer = SubmitAnswerSerializer(data=request.data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            if serializer.validated_data['question'].question_type == "SST":
+                admission.check_sst_backlog()
+            try:
+                item = get_open_item(mock_test, serializer.validated_data['question_id'])
+                typed_answer = serializer.save()
+                # Rolls the answer back if another submission took the item
+                record_answer(mock_test, item, typed_answer.answer)
+            except MockTestError as e:
+                raise ValidationError({"detail": str(e)})
+
+        return Response({
+            "message": "Answer submitted successfully.",
+            "data": get_submissions_data([typed_answer])[0],
+        }, status=status.HTTP_201_CREATED)
+
+
+class ProgressView(generics.ListAPIView):
+    """
+    Totals, averages and best scores of the current user, per question type.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = UserProgressSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return UserProgress.objects.filter(user=self.request.user).order_by('question_type')
+
+
+class ScoringQueueView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Report how many SST scoring jobs are queued, running and failed.
+        """
+        return Response(get_queue_depth())
+
+
+class AnswerExportView(APIView):
+    permission_classes = [IsAdminUser]
+    content_types = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    def get(self, request):
+        """
+        Stream answers and their scores as JSONL or CSV. Filters: start, end,
+        question_type and user (id). `export_format` is jsonl or csv.
+        """
+        export_format = request.query_params.get('export_format', 'jsonl')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({"export_format": f"Must be one of {', '.join(EXPORT_FORMATS)}."})
+        try:
+            answers = get_export_queryset(
+                start=request.query_params.get('start'),
+                end=request.query_params.get('end'),
+                question_type=request.query_params.get('question_type'),
+                user_id=request.query_params.get('user'),
+            )
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+
+        response = StreamingHttpResponse(render_export(answers, export_format), content_type=self.content_types[export_format])
+        response['Content-Disposition'] = f'attachment; filename="answers.{export_format}"'
+        return response
+
+
+def get_history_queryset(user, question_type=None):
+    """
+    Answers of a user, newest first, joining the question and every typed
+    answer row so a page is built with a fixed number of queries.
+    """
+    answers = Answer.objects.filter(user=user).select_related(
+        "question",
+        "sst_answer_details",
+        "ro_answer_details",
+        "rmmcq_answer_details__question",
+    ).prefetch_related(
+        Prefetch(
+            "rmmcq_answer_details__question__options",
+            queryset=RMMCQOption.objects.filter(is_correct=True),
+            to_attr="correct_options",
+        )
+    )
+    if question_type is not None:
+        answers = answers.filter(question_type=question_type)
+    return answers.order_by("-created_at", "-id")
+
+
+def get_history_entry(answer, percentiles):
+    """
+    Build the practice history entry of an answer from get_history_queryset().
+    `percentiles` comes from ScoreHistogramBucket.get_percentiles().
+    """
+    answer_details = {
+        "id": answer.id,
+        "question_id": answer.question.id,
+        "question_title": answer.question.title,
+        "question_type": answer.question.question_type,
+        "question_type_display": answer.question.get_question_type_display(),
+        "submitted_at": answer.created_at,
+        "score_summary": answer.get_score_summary(),
+        "percentile": percentiles.get(answer.id),
+    }
+
+    if answer.question.question_type == "SST":
+        answer_details["score"] = answer.sst_answer_details.get_score_components()
+        # sst_answer = SSTAnswer.objects.filter(answer=answer).first()
+        # if sst_answer:
+            # answer_details["submitted_answer"] = sst_answer.text
+
+    elif answer.question.question_type == "RO":
+        answer_details["score"] = answer.ro_answer_details.get_score_components()
+
+    elif answer.question.question_type == "RMMCQ":                
+        answer_details["score"] = answer.rmmcq_answer_details.get_score_components()
+        # rmmcq_answer = RMMCQAnswer.objects.filter(answer=answer).first()
+        # if rmmcq_answer:
+        #     selected_options = rmmcq_answer.selected_options.values_list("id", flat=True)
+        #     answer_details["submitted_answer"] = list(selected_options)
+        #     answer_details["score"] = rmmcq_answer.get_score_components()
+
+    return answer_details
+
+
+def get_history_entries(answers):
+    """
+    Build the history entries of a page of answers, with their percentiles
+    from one query.
+    """
+    percentiles = ScoreHistogramBucket.get_percentiles(answers)
+    return [get_history_entry(answer, percentiles) for answer in answers]
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset pagination on (created_at, id), newest first. A cursor holds the
+    (created_at, id) of the row a page continues from, so every page seeks
+    with the (user, created_at) index, whose entries end with the row id,
+    instead of an OFFSET, and no COUNT(*) is run.
+
+    filter_queryset() and paginate_rows() split paginate_queryset() around
+    the query so the async views can run it with the async ORM.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """
+        Return the (created_at, id, reverse) position of the request's cursor, or None.
+        """
+        encoded = request.GET.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created_at, pk, reverse = b64decode(encoded.encode(), altchars=b'-_').decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk), reverse == '1'
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, created_at, pk, reverse):
+        cursor = b64encode(f"{created_at.isoformat()}|{pk}|{int(reverse)}".encode(), altchars=b'-_').decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def filter_queryset(self, queryset, request):
+        """
+        Return the query of the requested page, with one extra row telling
+        whether there are more rows past it.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position = self.decode_cursor(request)
+        if self.position is None:
+            return queryset.order_by('-created_at', '-id')[:self.page_size + 1]
+        created_at, pk, reverse = self.position
+        if reverse:
+            # Towards newer rows, walked oldest first and flipped in paginate_rows()
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by('created_at', 'id')
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            ).order_by('-created_at', '-id')
+        return queryset[:self.page_size + 1]
+
+    def paginate_rows(self, rows):
+        """
+        Return the page, newest first, from the rows of filter_queryset(),
+        and set its next and previous links.
+        """
+        has_more = len(rows) > self.page_size
+        rows = list(rows[:self.page_size])
+        reverse = self.position is not None and self.position[2]
+        if reverse:
+            rows.reverse()
+
+        # An empty page links back to where it started
+        if rows:
+            first = (rows[0].created_at, rows[0].id)
+            last = (rows[-1].created_at, rows[-1].id)
+        else:
+            first = last = self.position and self.position[:2]
+
+        self.next = self.previous = None
+        if reverse:
+            if has_more:
+                self.previous = self.encode_cursor(*first, True)
+            self.next = self.encode_cursor(*last, False)
+        else:
+            if has_more:
+                self.next = self.encode_cursor(*last, False)
+            if self.position is not None:
+                self.previous = self.encode_cursor(*first, True)
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(list(self.filter_queryset(queryset, request)))
+
+    def get_paginated_data(self, data):
+        return {'next': self.next, 'previous': self.previous, 'results': data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
 
 class PracticeHistoryView(APIView):
 
@@ -76,6 +641,16 @@ class PracticeHistoryView(APIView):
         page_size_query_param = 'page_size'  # Optional: Allow the client to set the page size
         max_page_size = 50  # Optional: Limit the max page size for large queries
 
+    CustomCursorPagination = KeysetCursorPagination
+
+    def get_paginator(self, request):
+        """
+        Use cursor pagination when the client asks for it with
+        `?pagination=cursor` or is following a `cursor` link.
+        """
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            return self.CustomCursorPagination()
+        return self.CustomPagination()
 
     def get(self, request):
         """
@@ -83,47 +658,14 @@ class PracticeHistoryView(APIView):
         """
 
         # Retrieve all answers submitted by the user
-        answers = Answer.objects.filter(user=request.user)
-        question_type = request.query_params.get('question_type', None)
-        if question_type is not None:
-            answers = answers.filter(question__question_type=question_type)
-        answers = answers.order_by("-created_at")
+        answers = get_history_queryset(request.user, request.query_params.get('question_type', None))
 
         # Apply pagination
-        paginator = self.CustomPagination()
+        paginator = self.get_paginator(request)
         answers = paginator.paginate_queryset(answers, request)
 
-        history = []
-
-        # Iterate through each answer to build the response
-        for answer in answers:
-            answer_details = {
-                "id": answer.id,
-                "question_id": answer.question.id,
-                "question_title": answer.question.title,
-                "question_type": answer.question.question_type,
-                "question_type_display": answer.question.get_question_type_display(),
-                "submitted_at": answer.created_at,
-            }
-
-            if answer.question.question_type == "SST":
-                answer_details["score"] = answer.sst_answer_details.get_score_components()
-                # sst_answer = SSTAnswer.objects.filter(answer=answer).first()
-                # if sst_answer:
-                    # answer_details["submitted_answer"] = sst_answer.text
-
-            elif answer.question.question_type == "RO":
-                answer_details["score"] = answer.ro_answer_details.get_score_components()
-
-            elif answer.question.question_type == "RMMCQ":                
-                answer_details["score"] = answer.rmmcq_answer_details.get_score_components()
-                # rmmcq_answer = RMMCQAnswer.objects.filter(answer=answer).first()
-                # if rmmcq_answer:
-                #     selected_options = rmmcq_answer.selected_options.values_list("id", flat=True)
-                #     answer_details["submitted_answer"] = list(selected_options)
-                #     answer_details["score"] = rmmcq_answer.get_score_components()
-
-            history.append(answer_details)
+        # Build the response entry of each answer
+        history = get_history_entries(answers)
 
         history = paginator.get_paginated_response(history)
 